@@ -1,10 +1,10 @@
 from django.contrib import admin
-from app.account.models import User, Profile, OptCode, Relation
+from app.account.models import User, Profile, OptCode, Relation, UserStats
 from .forms import UserChangeForm, ProfileForm
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
 
 """ 
-Django admin configuration for managing User, Profile, Relation, and OptCode models.
+Django admin configuration for managing User, Profile, Relation, UserStats, and OptCode models.
 Defines custom admin interfaces, inline options, and fieldsets for each model.
 """
 
@@ -58,6 +58,17 @@ class ProfileAdmin(admin.ModelAdmin):
     row_id_fields = ('user',)
 
 
+@admin.register(UserStats)
+class UserStatsAdmin(admin.ModelAdmin):
+    """
+    Defines admin options for the UserStats model (read-only, repaired with `manage.py backfill_user_stats`).
+    """
+    model = UserStats
+    list_display = ('user', 'post_count', 'followers_count', 'following_count')
+    readonly_fields = ('post_count', 'followers_count', 'following_count')
+    search_fields = ('user__username',)
+
+
 @admin.register(User)
 class UserAdmin(BaseUserAdmin):
     """
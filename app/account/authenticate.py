@@ -1,6 +1,16 @@
+from django.contrib.auth.backends import ModelBackend
+from .identity import get_cached_user
 from .models import User
 
 
+class CachedModelBackend(ModelBackend):
+    """Django's username / password backend, resolving the session user through the identity cache."""
+    def get_user(self, user_id):
+        """Retrieve an active user by user ID from app.account.identity.get_cached_user."""
+        user = get_cached_user(user_id)
+        return user if user is not None and self.user_can_authenticate(user) else None
+
+
 class EmailAuthBackend:
     """Custom authentication backend for authenticating users via email."""
     def authenticate(self, request, phone_number=None, password=None):  # noqa
@@ -17,7 +27,7 @@ class EmailAuthBackend:
 
     def get_user(self, user_id):  # noqa
         """
-        Retrieve a user by user ID.
+        Retrieve a user by user ID (from app.account.identity.get_cached_user).
 
         Args:
             user_id (int): The ID of the user to retrieve.
@@ -25,7 +35,4 @@ class EmailAuthBackend:
         Returns:
             User: The user object if found, None otherwise.
         """
-        try:
-            return User.objects.get(pk=user_id)
-        except User.DoesNotExist:
-            return None
+        return get_cached_user(user_id)
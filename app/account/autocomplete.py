@@ -0,0 +1,55 @@
+from django.conf import settings
+from django.db.models.functions import Lower
+from app.account.models import User, Profile
+from app.core.text import normalize_text, normalized
+
+"""
+Username and profile name typeahead.
+
+Each keystroke runs at most three LIMITed queries:
+- LOWER(username) LIKE 'prefix%' on users, served by `index_username_prefix` (migration account 0005,
+  text_pattern_ops, active users only),
+- search_normalize(full_name) LIKE 'prefix%' on profiles, served by `index_full_name_prefix` (text_pattern_ops,
+  active profiles only), only when the usernames did not fill the limit,
+- one lookup by primary key of the matched users, which reads their usernames and full names together and drops the
+  full-name matches of inactive users.
+The two prefix queries read a single table each, so their plans are a range scan of the partial index; joining the
+other table into them would let the planner drive the scan from it instead. Inactive and soft-deleted rows are
+excluded by the DeleteManagerMixin managers (User.soft_delete, Profile.objects), whose is_active / is_deleted filter
+is also the condition of the partial indexes.
+There is no ORDER BY: the index scan returns matches in key order and the LIMIT stops it after a few rows, whatever
+the number of users sharing a short prefix.
+"""
+
+
+def username_matches(prefix, limit):
+    """Return the ids of up to limit active users whose lower-cased username starts with prefix."""
+    return User.soft_delete.alias(username_lower=Lower('username')).filter(
+        username_lower__startswith=prefix).order_by().values_list('id', flat=True)[:limit]
+
+
+def full_name_matches(prefix, limit):
+    """Return the user ids of up to limit active profiles whose normalized full name starts with prefix."""
+    return Profile.objects.alias(full_name_normalized=normalized('full_name')).filter(
+        full_name_normalized__startswith=prefix).order_by().values_list('user_id', flat=True)[:limit]
+
+
+def autocomplete_users(query, limit=None):
+    """
+    Return up to `limit` (default settings.AUTOCOMPLETE_LIMIT) users whose username or full name starts with query,
+    as dicts {id, username, full_name}; username matches come first.
+    """
+    limit = min(limit or settings.AUTOCOMPLETE_LIMIT, settings.AUTOCOMPLETE_LIMIT)
+    prefix = normalize_text(query)[:settings.AUTOCOMPLETE_MAX_QUERY_LENGTH]
+    if not prefix:
+        return []
+
+    user_ids = list(username_matches(prefix, limit))
+    if len(user_ids) < limit:
+        user_ids += [user_id for user_id in full_name_matches(prefix, limit) if user_id not in user_ids]
+    if not user_ids:
+        return []
+    users = {user_id: {'id': user_id, 'username': username, 'full_name': full_name}
+             for user_id, username, full_name in User.soft_delete.filter(pk__in=user_ids).order_by().values_list(
+                 'id', 'username', 'user_profile__full_name')}
+    return [users[user_id] for user_id in user_ids if user_id in users][:limit]
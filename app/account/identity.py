@@ -0,0 +1,68 @@
+import logging
+
+from django.conf import settings
+from django.core.cache import cache
+from redis.exceptions import RedisError
+
+from app.account.models import User
+
+"""
+Cached resolution of the authenticated user.
+
+Both authentication backends (app.account.authenticate) resolve the session user with get_cached_user: the User is
+loaded together with its Profile (one query, select_related on the one-to-one) and kept in the default cache under
+`identity:user:<id>` for settings.IDENTITY_CACHE_TIMEOUT seconds. AuthenticationMiddleware resolves request.user once
+per request, so a request whose user is cached runs no query for it, and request.user.profile is read from the same
+entry (get_active_profile) instead of a second lookup. The `identity:` keys are also kept in the in-process tier of
+the cache (CACHES OPTIONS LOCAL_KEY_PREFIXES, see app.core.tiered_cache).
+
+Saving or deleting a User or a Profile drops the entry (receivers in app.account.signals), right away and again once
+the transaction commits, so a request reading the old row meanwhile cannot cache it for long. Writes that bypass the
+signals (QuerySet.update) show up within IDENTITY_CACHE_TIMEOUT. The counters of UserStats change too often to be
+cached here and are still read from the database.
+
+Cache errors are logged and the user is read from the database: a Redis outage must not log everyone out or fail
+every authenticated request.
+"""
+
+logger = logging.getLogger(__name__)
+
+
+def user_key(user_id):
+    """Return the cache key of the cached user of user_id."""
+    return f'identity:user:{user_id}'
+
+
+def get_cached_user(user_id):
+    """Return the user of user_id (inactive ones included) with its profile loaded, or None if there is none."""
+    key = user_key(user_id)
+    try:
+        user = cache.get(key)
+    except RedisError as e:
+        logger.error(f"Failed to read the cached user {user_id}: {e}")
+        return User.objects.select_related('user_profile').filter(pk=user_id).first()
+    if user is None:
+        user = User.objects.select_related('user_profile').filter(pk=user_id).first()
+        if user is None:
+            return None
+        try:
+            cache.set(key, user, settings.IDENTITY_CACHE_TIMEOUT)
+        except RedisError as e:
+            logger.error(f"Failed to cache the user {user_id}: {e}")
+    return user
+
+
+def invalidate_cached_user(user_id):
+    """Drop the cached user of user_id."""
+    try:
+        cache.delete(user_key(user_id))
+    except RedisError as e:
+        logger.error(f"Failed to drop the cached user {user_id}: {e}")
+
+
+def get_active_profile(user):
+    """Return the active, not deleted profile of user (loaded with the user, no query), or None."""
+    profile = getattr(user, 'profile', None)
+    if profile is None or not profile.is_active or profile.is_deleted:
+        return None
+    return profile
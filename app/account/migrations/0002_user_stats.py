@@ -0,0 +1,62 @@
+# Generated by Django 5.2.18 on 2026-10-17 01:26
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+BATCH_SIZE = 1000
+
+
+def count_of(queryset, field):
+    counts = queryset.filter(**{field: OuterRef('pk')}).order_by().values(field).annotate(
+        total=Count('*')).values('total')
+    return Coalesce(Subquery(counts, output_field=IntegerField()), Value(0))
+
+
+def backfill_user_stats(apps, schema_editor):
+    """
+    Create the UserStats row of every existing user, counting its active posts, its followers and its followings,
+    in primary key batches (the same counts as app.post.counters.COUNTERS).
+    """
+    User = apps.get_model('account', 'User')
+    UserStats = apps.get_model('account', 'UserStats')
+    Post = apps.get_model('post', 'Post')
+    Relation = apps.get_model('account', 'Relation')
+    follows = Relation.objects.filter(is_follow=True)
+    last_pk = User.objects.aggregate(last_pk=models.Max('pk'))['last_pk'] or 0
+    for start_pk in range(1, last_pk + 1, BATCH_SIZE):
+        rows = User.objects.filter(pk__gte=start_pk, pk__lt=start_pk + BATCH_SIZE).annotate(
+            posts=count_of(Post.objects.filter(is_active=True, is_deleted=False), 'owner__user'),
+            followers=count_of(follows, 'following'),
+            following=count_of(follows, 'followers'),
+        ).values_list('pk', 'posts', 'followers', 'following')
+        UserStats.objects.bulk_create([
+            UserStats(user_id=pk, post_count=posts, followers_count=followers, following_count=following)
+            for pk, posts, followers, following in rows], ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('account', '0001_initial'),
+        ('post', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserStats',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('post_count', models.PositiveIntegerField(default=0, editable=False)),
+                ('followers_count', models.PositiveIntegerField(default=0, editable=False)),
+                ('following_count', models.PositiveIntegerField(default=0, editable=False)),
+            ],
+            options={
+                'verbose_name': 'UserStats',
+                'verbose_name_plural': 'UserStats',
+            },
+        ),
+        migrations.RunPython(backfill_user_stats, migrations.RunPython.noop),
+    ]
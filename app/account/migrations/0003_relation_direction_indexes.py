@@ -0,0 +1,21 @@
+# Generated by Django 5.2.18 on 2026-10-17 01:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('account', '0002_user_stats'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='relation',
+            index=models.Index(fields=['following', '-create_time_follow', '-id'], name='index_following_create_time'),
+        ),
+        migrations.AddIndex(
+            model_name='relation',
+            index=models.Index(fields=['followers', '-create_time_follow', '-id'], name='index_followers_create_time'),
+        ),
+    ]
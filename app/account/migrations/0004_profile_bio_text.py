@@ -0,0 +1,55 @@
+# Generated by Django 5.2.18 on 2026-10-17 01:35
+
+import html
+import re
+
+from django.db import migrations, models
+
+BATCH_SIZE = 1000
+
+# Frozen copy of app.core.text.html_to_text at the time of this migration.
+DROPPED = re.compile(r'<(script|style)\b.*?</\1\s*>|<!--.*?-->', re.IGNORECASE | re.DOTALL)
+BLOCK_TAG = re.compile(r'</?(?:p|br|div|li|ul|ol|h[1-6]|tr|td|th|table|blockquote|pre|hr)\b[^>]*>', re.IGNORECASE)
+TAG = re.compile(r'<[^>]*>')
+WHITESPACE = re.compile(r'\s+')
+
+
+def html_to_text(value):
+    if not value:
+        return ''
+    value = DROPPED.sub(' ', value)
+    value = BLOCK_TAG.sub(' ', value)
+    value = TAG.sub('', value)
+    return WHITESPACE.sub(' ', html.unescape(value)).strip()
+
+
+def backfill(model, source, shadow):
+    """Fill model.shadow with the text of model.source on every row, in primary key batches."""
+    manager = model._base_manager
+    last_pk = manager.aggregate(last_pk=models.Max('pk'))['last_pk'] or 0
+    for start_pk in range(1, last_pk + 1, BATCH_SIZE):
+        rows = list(manager.filter(pk__gte=start_pk, pk__lt=start_pk + BATCH_SIZE).only('pk', source))
+        for row in rows:
+            setattr(row, shadow, html_to_text(getattr(row, source)))
+        manager.bulk_update(rows, [shadow])
+
+
+def backfill_bio_text(apps, schema_editor):
+    """Fill Profile.bio_text of the existing profiles."""
+    backfill(apps.get_model('account', 'Profile'), 'bio', 'bio_text')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('account', '0003_relation_direction_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='profile',
+            name='bio_text',
+            field=models.TextField(default='', editable=False),
+        ),
+        migrations.RunPython(backfill_bio_text, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-17 05:40
+
+import django.contrib.postgres.indexes
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('account', '0004_profile_bio_text'),
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('post', '0009_persian_search'),  # creates the search_normalize() function
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='profile',
+            index=models.Index(
+                django.contrib.postgres.indexes.OpClass(
+                    models.Func(models.F('full_name'), function='search_normalize', output_field=models.TextField()),
+                    name='text_pattern_ops'),
+                condition=models.Q(('is_active', True), ('is_deleted', False)), name='index_full_name_prefix'),
+        ),
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(
+                django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Lower('username'),
+                                                        name='text_pattern_ops'),
+                condition=models.Q(('is_active', True), ('is_deleted', False)), name='index_username_prefix'),
+        ),
+    ]
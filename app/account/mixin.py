@@ -1,6 +1,8 @@
 from django.contrib.auth.models import AbstractBaseUser, PermissionsMixin
 from app.account.managers import UserManager
+from django.contrib.postgres.indexes import OpClass
 from django.db import models
+from django.db.models.functions import Lower
 from app.core.mixin import DeleteManagerMixin
 
 
@@ -30,7 +32,8 @@ class BaseModelUserMixin(AbstractBaseUser, PermissionsMixin):
     - verbose_name: Specifies a human-readable name for the model in singular form.
     - verbose_name_plural: Specifies a human-readable name for the model in plural form.
     - constraints: Defines constraints on fields, such as uniqueness constraints on 'username' and 'email'.
-    - indexes: Defines indexes for optimizing database queries.
+    - indexes: Defines indexes for optimizing database queries, including the prefix index on the lower-cased username
+        of active users used by the autocomplete.
     """
     create_time = models.DateTimeField(auto_now_add=True, editable=False)
     update_time = models.DateTimeField(auto_now=True, editable=False)
@@ -53,5 +56,7 @@ class BaseModelUserMixin(AbstractBaseUser, PermissionsMixin):
             models.UniqueConstraint(fields=['username', 'email'], name='unique_username_email')
         ]
         indexes = [
-            models.Index(fields=['username', 'email'], name='index_username_email')
+            models.Index(fields=['username', 'email'], name='index_username_email'),
+            models.Index(OpClass(Lower('username'), name='text_pattern_ops'), name='index_username_prefix',
+                         condition=models.Q(is_active=True, is_deleted=False)),
         ]
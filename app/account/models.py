@@ -1,5 +1,7 @@
+from django.contrib.postgres.indexes import OpClass
 from django.db import models
-from app.core.mixin import DeleteManagerMixin
+from app.core.mixin import DeleteManagerMixin, PlainTextMixin
+from app.core.text import normalized
 from .mixin import BaseModelUserMixin
 from ckeditor.fields import RichTextField
 from django.core.validators import RegexValidator
@@ -41,15 +43,15 @@ class User(BaseModelUserMixin):
         return self.username
 
     def followers_count(self):
-        """Method to return the number of followers for a given user."""
-        return self.user_followers.count()
+        """Method to return the number of followers for a given user (read from the UserStats row)."""
+        return self.stats.followers_count
 
     def following_count(self):
-        """Method to return the number of following for a given user."""
-        return self.user_following.count()
+        """Method to return the number of following for a given user (read from the UserStats row)."""
+        return self.stats.following_count
 
 
-class Profile(models.Model):
+class Profile(PlainTextMixin, models.Model):
     """
     Represents the Profile model.
 
@@ -61,6 +63,7 @@ class Profile(models.Model):
     - gender (CharField): Specifies the gender of the profile.
     - age (PositiveSmallIntegerField): Specifies the age of the profile.
     - bio (RichTextField): Specifies the biography of the profile.
+    - bio_text (TextField): Plain-text, whitespace-normalized copy of bio, refreshed on save.
     - profile_picture (ImageField): Specifies the profile picture of the profile.
     - is_deleted (BooleanField): Indicates if the profile is deleted.
     - is_active (BooleanField): Indicates if the profile is active.
@@ -79,12 +82,14 @@ class Profile(models.Model):
     gender = models.CharField(max_length=20)
     age = models.PositiveSmallIntegerField(default=0)
     bio = RichTextField()
+    bio_text = models.TextField(default='', editable=False)
     profile_picture = models.ImageField(upload_to='profile_picture/%Y/%m/%d/')
     is_deleted = models.BooleanField(default=False)
     is_active = models.BooleanField(default=True)
     create_time = models.DateTimeField(auto_now_add=True, editable=False)
     update_time = models.DateTimeField(auto_now=True, editable=False)
     objects = DeleteManagerMixin()  # Assuming UserManager is a custom manager < soft delete >
+    plain_text_fields = {'bio': 'bio_text'}
 
     class Meta:
         ordering = ('-update_time', '-create_time')
@@ -95,7 +100,9 @@ class Profile(models.Model):
             models.UniqueConstraint(fields=['user', 'full_name'], name='unique_user_full_name')
         ]
         indexes = [
-            models.Index(fields=['user', 'full_name'], name='index_user_full_name')
+            models.Index(fields=['user', 'full_name'], name='index_user_full_name'),
+            models.Index(OpClass(normalized('full_name'), name='text_pattern_ops'), name='index_full_name_prefix',
+                         condition=models.Q(is_active=True, is_deleted=False)),
         ]
 
     def __str__(self):
@@ -104,9 +111,9 @@ class Profile(models.Model):
 
     def post_count(self):
         """
-        Method to return the count of posts associated with the profile.
+        Method to return the count of posts associated with the profile (read from the UserStats row of the user).
         """
-        return self.posts.count()
+        return self.user.stats.post_count
 
     @property
     def capitalize(self):
@@ -146,10 +153,39 @@ class Relation(models.Model):
             models.UniqueConstraint(fields=['followers', 'following'], name='unique_followers_following')
         ]
         indexes = [
-            models.Index(fields=['followers', 'following'], name='index_followers_following')
+            models.Index(fields=['followers', 'following'], name='index_followers_following'),
+            # Per-direction indexes for the cursor-paginated follower / following lists (newest first).
+            models.Index(fields=['following', '-create_time_follow', '-id'], name='index_following_create_time'),
+            models.Index(fields=['followers', '-create_time_follow', '-id'], name='index_followers_create_time'),
         ]
 
 
+class UserStats(models.Model):
+    """
+    Represents the UserStats model, the denormalized counters shown on a profile.
+
+    Attributes:
+    - user (OneToOneField): Specifies the user the counters belong to (also the primary key).
+    - post_count (PositiveIntegerField): Number of active posts of the user.
+    - followers_count (PositiveIntegerField): Number of users following the user.
+    - following_count (PositiveIntegerField): Number of users the user follows.
+
+    The counters are kept in sync by the Relation and Post signals and repaired by `manage.py backfill_user_stats`.
+    """
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='stats')
+    post_count = models.PositiveIntegerField(default=0, editable=False)
+    followers_count = models.PositiveIntegerField(default=0, editable=False)
+    following_count = models.PositiveIntegerField(default=0, editable=False)
+
+    class Meta:
+        verbose_name = 'UserStats'
+        verbose_name_plural = 'UserStats'
+
+    def __str__(self):
+        """Method to return a string representation of the UserStats object."""
+        return f"{self.user} - {self.post_count} posts"
+
+
 class OptCode(models.Model):
     """
     Represents the OptCode model.
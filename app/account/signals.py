@@ -1,6 +1,9 @@
 from django.contrib.auth.models import User
-from django.db.models.signals import post_save
-from app.account.models import Profile
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from app.account.identity import invalidate_cached_user
+from app.account.models import Profile, Relation, User as UserModel, UserStats
+from app.post.counters import adjust_counter
 from django.dispatch import receiver
 
 
@@ -9,3 +12,37 @@ def create_profile(sender, **kwargs):  # pylint: disable=unused-argument
     """Function to create a profile for a new user."""
     if kwargs["created"]:
         Profile.objects.create(user=kwargs["instance"])
+
+
+@receiver(post_save, sender=UserModel)
+def create_user_stats(sender, instance, created, **kwargs):
+    """Function to create the UserStats row of a new user."""
+    if created:
+        UserStats.objects.get_or_create(user=instance)
+
+
+@receiver(post_save, sender=Relation)
+def increment_follow_counts(sender, instance, created, **kwargs):
+    """Function to count a new follow in the UserStats of both users."""
+    if created and instance.is_follow:
+        adjust_counter(UserStats, instance.following_id, 'followers_count', 1)
+        adjust_counter(UserStats, instance.followers_id, 'following_count', 1)
+
+
+@receiver(post_delete, sender=Relation)
+def decrement_follow_counts(sender, instance, **kwargs):
+    """Function to uncount a removed follow in the UserStats of both users."""
+    if instance.is_follow:
+        adjust_counter(UserStats, instance.following_id, 'followers_count', -1)
+        adjust_counter(UserStats, instance.followers_id, 'following_count', -1)
+
+
+@receiver(post_save, sender=UserModel)
+@receiver(post_delete, sender=UserModel)
+@receiver(post_save, sender=Profile)
+@receiver(post_delete, sender=Profile)
+def invalidate_identity(sender, instance, **kwargs):
+    """Function to drop the cached user of a saved or deleted user or profile, now and after the commit."""
+    user_id = instance.pk if sender is UserModel else instance.user_id
+    invalidate_cached_user(user_id)
+    transaction.on_commit(lambda: invalidate_cached_user(user_id))
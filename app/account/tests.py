@@ -1,6 +1,19 @@
-from django.test import TestCase
+import re
+from io import StringIO
+from unittest import mock, skipUnless
+from redis.exceptions import RedisError
+from django.test import TestCase, override_settings
 from django.contrib.auth import get_user_model
-from .models import Profile, OptCode
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test.utils import CaptureQueriesContext
+from django.db import connection
+from django.urls import reverse
+from app.post.models import Post
+from .models import Profile, OptCode, Relation, UserStats
+from .authenticate import CachedModelBackend, EmailAuthBackend
+from .autocomplete import autocomplete_users, full_name_matches, username_matches
+from .identity import get_active_profile, get_cached_user
 
 User = get_user_model()
 
@@ -39,3 +52,195 @@ class ModelsTestCase(TestCase):
         """Test uniqueness of phone numbers in OptCode."""
         with self.assertRaises(Exception):
             OptCode.objects.create(code=1234, phone_number='09128355747')
+
+
+class UserStatsTestCase(TestCase):
+    """Test case for the denormalized UserStats counters."""
+
+    def setUp(self):
+        """Set up two users, one following the other, and a post."""
+        self.user = User.objects.create(username='pedramkarimi', email='pedram.9060@gmail.com',
+                                        phone_number='09128355747')
+        self.other = User.objects.create(username='rezakarimi', email='reza@gmail.com', phone_number='09128355748')
+        self.profile = Profile.objects.create(user=self.user, full_name='Pedram Karimi', name='pedram',
+                                              last_name='karimi', gender='Female', age=30, bio='Hi',
+                                              profile_picture='profile_picture/test.jpeg')
+        self.relation = Relation.objects.create(followers=self.other, following=self.user, is_follow=True)
+        self.post = Post.objects.create(owner=self.profile, body="Test Body", title="Test Title")
+
+    def test_counters_follow_writes(self):
+        """Test follows and posts are counted and uncounted."""
+        self.user.stats.refresh_from_db()
+        self.other.stats.refresh_from_db()
+        self.assertEqual((self.user.stats.post_count, self.user.followers_count(), self.other.following_count()),
+                         (1, 1, 1))
+        self.relation.delete()
+        self.post.delete()
+        self.user.stats.refresh_from_db()
+        self.assertEqual((self.user.stats.post_count, self.user.stats.followers_count), (0, 0))
+
+    def test_backfill_user_stats(self):
+        """Test the backfill command recreates missing rows with the right counts."""
+        UserStats.objects.all().delete()
+        call_command('backfill_user_stats', batch_size=1, stdout=StringIO())
+        stats = UserStats.objects.get(user=self.user)
+        self.assertEqual((stats.post_count, stats.followers_count, stats.following_count), (1, 1, 0))
+        self.assertEqual(UserStats.objects.get(user=self.other).following_count, 1)
+
+    def test_profile_detail_reads_stats(self):
+        """Test the profile page reads the counters from the UserStats row instead of counting relations."""
+        self.client.force_login(self.other)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('profile_detail', kwargs={'pk': self.user.pk}))
+        self.assertEqual((response.context['followers_count'], response.context['stats'].post_count), (1, 1))
+        self.assertFalse([query for query in queries if 'COUNT(' in query['sql'].upper()])
+
+
+@override_settings(RELATION_LIST_PAGE_SIZE=2)
+class RelationListTestCase(TestCase):
+    """Test case for the cursor-paginated follower and following lists."""
+
+    def setUp(self):
+        """Set up a user followed by five users and following one of them."""
+        self.user = User.objects.create(username='pedramkarimi', email='pedram.9060@gmail.com',
+                                        phone_number='09128355747')
+        self.followers = [User.objects.create(username=f'user{i}', email=f'user{i}@gmail.com',
+                                              phone_number=f'0912000000{i}') for i in range(5)]
+        for follower in self.followers:
+            Relation.objects.create(followers=follower, following=self.user, is_follow=True)
+        Relation.objects.create(followers=self.user, following=self.followers[0], is_follow=True)
+        self.client.force_login(self.user)
+
+    def test_followers_pages(self):
+        """Test walking the follower list with the next cursors returns every follower exactly once."""
+        url = reverse('profile_followers', kwargs={'pk': self.user.pk})
+        usernames = []
+        cursor = ''
+        for _ in range(3):
+            data = self.client.get(url, {'fragment': '1', 'cursor': cursor}).json()
+            usernames += re.findall(r'user\d', data['html'])
+            cursor = data['next_cursor']
+        self.assertIsNone(cursor)
+        self.assertEqual(sorted(usernames), sorted(follower.username for follower in self.followers))
+
+    def test_following_list(self):
+        """Test the following list only contains the users the profile follows."""
+        data = self.client.get(reverse('profile_following', kwargs={'pk': self.user.pk}), {'fragment': '1'}).json()
+        self.assertEqual(re.findall(r'user\d', data['html']), ['user0'])
+        self.assertIsNone(data['next_cursor'])
+
+
+class AutocompleteTestCase(TestCase):
+    def setUp(self):
+        """Setting up users with and without profiles, one of them deactivated"""
+        self.users = [User.objects.create(username=name, email=f'{name}@gmail.com', phone_number=f'0912000000{i}')
+                      for i, name in enumerate(['pedram', 'pedro', 'Peyman', 'sara', 'gone'])]
+        for user, full_name in zip(self.users, ['Pedram Karimi', 'Pedro Lopez', 'پیمان احمدی', 'سارا كريمي', 'Pegah']):
+            Profile.objects.create(user=user, full_name=full_name, name='x', last_name='y', gender='-', bio='')
+        User.soft_delete.filter(pk=self.users[4].pk).delete()
+        self.client.force_login(self.users[0])
+
+    def test_prefix_matches(self):
+        """Test usernames match case-insensitively, full names with Persian normalization"""
+        self.assertEqual({result['username'] for result in autocomplete_users('PE')}, {'pedram', 'pedro', 'Peyman'})
+        self.assertEqual([result['username'] for result in autocomplete_users('پی')], ['Peyman'])
+        self.assertEqual([result['username'] for result in autocomplete_users('سارا کریمی')], ['sara'])
+        self.assertEqual(autocomplete_users('   '), [])
+
+    def test_inactive_users_excluded_and_results_capped(self):
+        """Test soft-deleted users are never suggested and the result count is capped"""
+        self.assertEqual(autocomplete_users('peg'), [])
+        with self.settings(AUTOCOMPLETE_LIMIT=2):
+            self.assertEqual(len(autocomplete_users('pe')), 2)
+
+    def test_endpoint(self):
+        """Test the endpoint answers with JSON results linking to the profiles"""
+        response = self.client.get(reverse('user_autocomplete'), {'q': 'sar'})
+        self.assertEqual(response.json()['results'], [{
+            'id': self.users[3].pk, 'username': 'sara', 'full_name': 'سارا كريمي',
+            'url': reverse('profile_detail', kwargs={'pk': self.users[3].pk})}])
+        with self.assertNumQueries(3):  # usernames, full names, then the matched users by pk
+            autocomplete_users('sar')
+        with self.settings(AUTOCOMPLETE_LIMIT=1), self.assertNumQueries(2):  # the usernames filled the limit
+            autocomplete_users('sar')
+
+    @skipUnless(connection.vendor == 'postgresql', 'The text_pattern_ops partial indexes need PostgreSQL')
+    def test_prefix_queries_scan_the_partial_indexes(self):
+        """Test each prefix query is a scan of its partial prefix index, without joining the other table"""
+        with connection.cursor() as cursor:
+            cursor.execute('SET LOCAL enable_seqscan = off')  # the test tables are too small for the planner to care
+        username_plan = username_matches('pe', 8).explain()
+        full_name_plan = full_name_matches('pe', 8).explain()
+        self.assertIn('index_username_prefix', username_plan)
+        self.assertIn('index_full_name_prefix', full_name_plan)
+        self.assertNotIn('Join', username_plan + full_name_plan)
+        self.assertNotIn('Nested Loop', username_plan + full_name_plan)
+
+
+class IdentityCacheTestCase(TestCase):
+    def setUp(self):
+        """Setting up a user with a profile and an empty cache"""
+        cache.clear()
+        self.user = User.objects.create(username='pedramkarimi', email='pedram.9060@gmail.com',
+                                        phone_number='09128355747')
+        self.profile = Profile.objects.create(user=self.user, full_name='Pedram Karimi', name='pedram',
+                                              last_name='karimi', gender='Female', age=30, bio='Hi',
+                                              profile_picture='profile_picture/test.jpeg')
+
+    def test_user_and_profile_cached(self):
+        """Test the user and its profile are loaded with one query, then served from the cache by both backends"""
+        with self.assertNumQueries(1):
+            self.assertEqual(get_cached_user(self.user.pk), self.user)
+        with self.assertNumQueries(0):
+            for backend in (CachedModelBackend(), EmailAuthBackend()):
+                user = backend.get_user(self.user.pk)
+                self.assertEqual(get_active_profile(user).full_name, 'Pedram Karimi')
+        self.assertIsNone(get_cached_user(0))
+
+    def test_cache_errors_fall_back_to_the_database(self):
+        """Test a failing cache does not fail the lookup of the user"""
+        with mock.patch('app.account.identity.cache') as failing_cache:
+            failing_cache.get.side_effect = failing_cache.set.side_effect = RedisError('down')
+            with self.assertNumQueries(1):
+                self.assertEqual(get_active_profile(get_cached_user(self.user.pk)), self.profile)
+            failing_cache.get.side_effect = None
+            failing_cache.get.return_value = None
+            self.assertEqual(get_cached_user(self.user.pk), self.user)
+            failing_cache.delete.side_effect = RedisError('down')
+            with self.captureOnCommitCallbacks(execute=True):
+                self.profile.save()
+
+    def test_saves_invalidate(self):
+        """Test saving the profile or the user drops the cached user"""
+        get_cached_user(self.user.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.profile.full_name = 'Pedram K'
+            self.profile.save()
+        self.assertEqual(get_cached_user(self.user.pk).profile.full_name, 'Pedram K')
+        self.user.is_active = False
+        self.user.save()
+        self.assertIsNone(CachedModelBackend().get_user(self.user.pk))
+
+    def test_one_user_lookup_per_request(self):
+        """Test a logged-in request reads its user from the cache and a deleted user is logged out"""
+        self.client.force_login(self.user)
+        url = reverse('profile_detail', kwargs={'pk': self.user.pk})
+        self.client.get(url)
+        with mock.patch('app.account.identity.cache', wraps=cache) as identity_cache:
+            self.assertEqual(self.client.get(url).status_code, 200)
+        self.assertEqual(identity_cache.get.call_count, 1)
+        identity_cache.set.assert_not_called()
+        self.client.post(reverse('delete_user', kwargs={'pk': self.user.pk}))
+        self.assertIsNone(CachedModelBackend().get_user(self.user.pk))
+
+    def test_sessions_resolve(self):
+        """Test an OTP login and a session stored with the former default backend stay logged in"""
+        OptCode.objects.create(code=1234, phone_number=self.user.phone_number)
+        session = self.client.session
+        session['user_login_info'] = {'phone_number': self.user.phone_number, 'password': 'x'}
+        session.save()
+        self.client.post(reverse('login_verify_code'), {'code': 1234})
+        self.assertEqual(self.client.get(reverse('home')).wsgi_request.user, self.user)
+        self.client.logout()
+        self.client.force_login(self.user, backend='django.contrib.auth.backends.ModelBackend')
+        self.assertEqual(self.client.get(reverse('home')).wsgi_request.user, self.user)
@@ -2,7 +2,7 @@ from django.urls import path
 from app.account.views import UserLoginView, UserLogoutView, UserRegisterView, UserRegistrationVerifyCodeView, \
     UserChangeView, ChangePasswordView, CreateProfileView, ProfileDetailView, DeleteProfileView, LoginVerifyCodeView, \
     DeleteUserView, SuccessLoginView, UserPasswordResetView, UserPasswordResetDoneView, UserPasswordResetConfirmView, \
-    UserPasswordResetCompleteView, UserLoginEmailView, LoginVerifyCodeEmailView
+    UserPasswordResetCompleteView, UserLoginEmailView, LoginVerifyCodeEmailView, RelationListView, UserAutocompleteView
 
 urlpatterns = [
     # Authentication URLs
@@ -28,8 +28,11 @@ urlpatterns = [
     # Profile Management URLs
     # These URLs handle user profile management, such as creating profiles, viewing profiles, and deleting profiles.
     path("profiles/<int:pk>/", ProfileDetailView.as_view(), name="profile_detail"),
+    path("profiles/<int:pk>/followers/", RelationListView.as_view(direction='followers'), name="profile_followers"),
+    path("profiles/<int:pk>/following/", RelationListView.as_view(direction='following'), name="profile_following"),
     path('profile/<int:pk>/delete/', DeleteProfileView.as_view(), name='delete_profile'),
     path("createprofile/", CreateProfileView.as_view(), name="create_profile"),
+    path("users/autocomplete/", UserAutocompleteView.as_view(), name="user_autocomplete"),
 
     # Password Reset URLs
     # These URLs handle password reset functionality, such as requesting password resets, confirming password resets,
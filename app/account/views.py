@@ -6,17 +6,20 @@ from django.contrib import messages
 from django.contrib.auth import logout, update_session_auth_hash
 from django.contrib.auth import login
 from .forms import UserLoginForm, UserPasswordResetForm, UserLoginEmailForm
+from django.http import JsonResponse
 from django.shortcuts import render, redirect, get_object_or_404
-from django.urls import reverse_lazy
+from django.urls import reverse, reverse_lazy
 from django.utils import timezone
 from django.views.generic import DetailView, DeleteView
 from app.core.mixin import HttpsOptionLoginMixin as MustBeLogoutCustomView, \
-    HttpsOptionNotLogoutMixin as MustBeLogingCustomView
+    HttpsOptionNotLogoutMixin as MustBeLogingCustomView, CursorPaginationMixin
 from .forms import UserRegistrationForm, VerifyCodeForm, ProfileChangeOrCreationForm, CustomUserChangeForm, \
     ChangePasswordForm
 import random
 from app.account.utils import send_otp_code
-from .models import OptCode, User, Profile, Relation
+from app.account.autocomplete import autocomplete_users
+from app.account.identity import invalidate_cached_user
+from .models import OptCode, User, Profile, Relation, UserStats
 from django.contrib.auth.views import LoginView, PasswordResetView, PasswordResetDoneView, PasswordResetConfirmView, \
     PasswordResetCompleteView
 
@@ -195,7 +198,7 @@ class LoginVerifyCodeView(MustBeLogoutCustomView):
             if cd['code'] == code_instance.code and death_time > datetime.now(tz=pytz.timezone('Asia/Tehran')):
                 if code_instance and code_instance.is_used == False:  # noqa
                     user = User.objects.get(phone_number=code_instance.phone_number)
-                    login(request, user, backend='django.contrib.auth.backends.ModelBackend')
+                    login(request, user, backend='app.account.authenticate.CachedModelBackend')
                     code_instance.delete()
                     code_instance.is_used = True
                     messages.success(request, 'Code verified successfully', extra_tags='success')
@@ -438,7 +441,7 @@ class LoginVerifyCodeEmailView(MustBeLogoutCustomView):
             if cd['code'] == code_instance.code and death_time > datetime.now(tz=pytz.timezone('Asia/Tehran')):
                 if code_instance and code_instance.is_used == False:  # noqa
                     user = User.objects.get(email=code_instance.email)
-                    login(request, user, backend='django.contrib.auth.backends.ModelBackend')
+                    login(request, user, backend='app.account.authenticate.CachedModelBackend')
                     code_instance.is_used = True
                     code_instance.delete()
                     messages.success(request, 'Code verified successfully', extra_tags='success')
@@ -616,8 +619,9 @@ class ProfileDetailView(DetailView, MustBeLogingCustomView):
     Retrieves the profile object based on the user ID passed in the URL kwargs.
 
     get_context_data method:
-    Adds additional context data to be passed to the template, including counts of followers and following users,
-     as well as lists of followers' and following users' usernames.
+    Adds additional context data to be passed to the template, including the post, followers and following counts
+     read from the UserStats row loaded with the profile. The follower and following lists themselves are
+     lazy-loaded from RelationListView.
     """
 
     http_method_names = ['get']
@@ -630,26 +634,78 @@ class ProfileDetailView(DetailView, MustBeLogingCustomView):
 
     def get_object(self, queryset=None):
         user_id = self.kwargs.get('pk')
-        return get_object_or_404(Profile, user_id=user_id)
+        return get_object_or_404(Profile.objects.select_related('user__stats'), user_id=user_id)
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        profile = self.get_object()
+        profile = self.object
 
-        followers_count = Relation.objects.filter(following=profile.user).count()
-        following_count = Relation.objects.filter(followers=profile.user).count()
-        context['followers_count'] = followers_count
-        context['following_count'] = following_count
+        try:
+            stats = profile.user.stats  # fetched with the profile, see get_object
+        except UserStats.DoesNotExist:
+            stats = UserStats(user=profile.user)  # not backfilled yet, see `manage.py backfill_user_stats`
+        context['stats'] = stats
+        context['followers_count'] = stats.followers_count
+        context['following_count'] = stats.following_count
 
-        followers_usernames = Relation.objects.filter(following=profile.user).values_list('followers__id',
-                                                                                          'followers__username')
-        following_usernames = Relation.objects.filter(followers=profile.user).values_list('following__id',
-                                                                                          'following__username')
+        return context
 
-        context['followers_usernames'] = followers_usernames
-        context['following_usernames'] = following_usernames
 
-        return context
+class RelationListView(MustBeLogingCustomView, CursorPaginationMixin):
+    """
+    Cursor-paginated list of the followers or the followings of a user, lazy-loaded by the profile page.
+
+    Attributes:
+    - direction (str): 'followers' lists the users following the profile, 'following' the users it follows.
+    - page_size_setting (str): The setting holding the number of users rendered per page.
+
+    Pages are keyed on (create_time_follow, id), newest first, and served by the per-direction Relation indexes.
+    """
+    http_method_names = ['get']
+    page_size_setting = 'RELATION_LIST_PAGE_SIZE'
+    direction = 'followers'
+
+    def setup(self, request, *args, **kwargs):
+        """
+        Initializes template_relations and the queryset of relations of the requested user.
+        """
+        self.template_relations = 'accounts/relation_list.html'  # noqa
+        # Relation.followers is the user who follows, Relation.following the user who is followed.
+        if self.direction == 'followers':
+            lookup, self.user_field = 'following', 'followers'  # noqa
+        else:
+            lookup, self.user_field = 'followers', 'following'  # noqa
+        self.relations = Relation.objects.filter(**{lookup: kwargs['pk']}, is_follow=True).select_related(  # noqa
+            self.user_field).only('id', 'create_time_follow', f'{self.user_field}__id', f'{self.user_field}__username')
+        return super().setup(request, *args, **kwargs)
+
+    def get(self, request, *args, **kwargs):
+        """
+        Renders one page of users; `?fragment=1` returns the rendered page and the next cursor as JSON.
+        """
+        page = self.paginate(self.relations, ('-create_time_follow', '-id'))
+        users = [getattr(relation, self.user_field) for relation in page]
+        return self.render_page(request, self.template_relations, self.template_relations, page, {'users': users})
+
+
+class UserAutocompleteView(MustBeLogingCustomView):
+    """
+    Typeahead over usernames and profile full names, called on every keystroke of the user search box.
+    `?q=` is the typed prefix; the response is {"results": [{id, username, full_name, url}, ...]} with at most
+    settings.AUTOCOMPLETE_LIMIT users. Browsers may reuse a response for a repeated prefix for a short while.
+    """
+    http_method_names = ['get']
+
+    def get(self, request, *args, **kwargs):
+        """
+        Returns the users whose username or full name starts with the query.
+        """
+        results = autocomplete_users(request.GET.get('q', ''))
+        for result in results:
+            result['url'] = reverse('profile_detail', kwargs={'pk': result['id']})
+        response = JsonResponse({'results': results})
+        response['Cache-Control'] = 'private, max-age=30'
+        return response
 
 
 class DeleteProfileView(DeleteView, MustBeLogingCustomView):
@@ -701,5 +757,6 @@ class DeleteUserView(DeleteView, MustBeLogingCustomView):
         self.object = self.get_object()  # noqa
         success_url = self.get_success_url()
         self.object.soft_delete.filter(pk=self.object.pk).delete()
+        invalidate_cached_user(self.object.pk)  # the soft delete is an UPDATE, no signal drops the cached user
         messages.success(request, 'User has been successfully deleted.')
         return redirect(success_url)
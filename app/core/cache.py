@@ -0,0 +1,31 @@
+import logging
+
+from django.core.cache import caches
+
+"""
+Helpers for talking to the Redis server behind the Django CACHES backend.
+Features that need native Redis data structures (sorted sets, lists, hashes) go through these helpers so they
+share the connection pool and key prefix configured in settings.CACHES.
+"""
+
+logger = logging.getLogger(__name__)
+
+
+def get_redis_client(alias='default', write=True):
+    """
+    Return the redis-py client used by the given cache alias.
+
+    Returns None when the cache alias is not backed by django.core.cache.backends.redis.RedisCache
+    (for example the local-memory cache used in tests), so callers can fall back to the database.
+    """
+    cache_client = getattr(caches[alias], '_cache', None)
+    if not hasattr(cache_client, 'get_client'):
+        return None
+    return cache_client.get_client(write=write)
+
+
+def make_redis_key(key, alias='default'):
+    """
+    Build a Redis key with the same prefix and version that the cache alias applies to its own keys.
+    """
+    return caches[alias].make_key(key)
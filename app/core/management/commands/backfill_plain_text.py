@@ -0,0 +1,47 @@
+from django.apps import apps
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Max
+from app.core.mixin import PlainTextMixin
+from app.core.text import html_to_text
+
+
+class Command(BaseCommand):
+    """
+    Defines a management command to fill the plain-text shadow fields (Post.body_text, Comment.comments_text,
+    Profile.bio_text and any other PlainTextMixin field) from their rich text fields.
+    Walks every model by primary key ranges, soft-deleted rows included; each batch reads only the primary key and
+    the rich text columns, and updates the rows whose shadow is out of date in its own transaction.
+    Safe to run again at any time.
+    """
+    help = "Fill the plain-text shadow fields of the rich text fields"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Number of rows processed per batch')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        for model in apps.get_models():
+            if not issubclass(model, PlainTextMixin):
+                continue
+            fields = model.plain_text_fields
+            manager = model._base_manager
+            last_pk = manager.aggregate(last_pk=Max('pk'))['last_pk'] or 0
+            updated = 0
+            for start_pk in range(1, last_pk + 1, batch_size):
+                with transaction.atomic():
+                    rows = []
+                    for row in manager.filter(pk__gte=start_pk, pk__lt=start_pk + batch_size).only(
+                            'pk', *fields, *fields.values()):
+                        changed = False
+                        for source, shadow in fields.items():
+                            text = html_to_text(getattr(row, source))
+                            if getattr(row, shadow) != text:
+                                setattr(row, shadow, text)
+                                changed = True
+                        if changed:
+                            rows.append(row)
+                    manager.bulk_update(rows, list(fields.values()))
+                    updated += len(rows)
+            self.stdout.write(self.style.SUCCESS(
+                f'{model._meta.verbose_name_plural}: updated {updated} rows up to id {last_pk}.'))
@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Max
+from app.account.models import User, UserStats
+from app.post.counters import reconcile_counters
+
+
+class Command(BaseCommand):
+    """
+    Defines a management command to create and fill the UserStats row of every user.
+    Walks the users by primary key ranges; for each batch it creates the missing UserStats rows and recomputes
+    post_count, followers_count and following_count from the Post and Relation tables, in its own transaction.
+    Safe to run again at any time: only rows whose counters drifted are updated.
+    """
+    help = "Create missing UserStats rows and recompute the post, follower and following counts"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Number of users processed per batch')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        last_pk = User.objects.aggregate(last_pk=Max('pk'))['last_pk'] or 0
+        created = repaired = 0
+        for start_pk in range(1, last_pk + 1, batch_size):
+            end_pk = start_pk + batch_size
+            with transaction.atomic():
+                user_ids = User.objects.filter(pk__gte=start_pk, pk__lt=end_pk, stats__isnull=True).values_list(
+                    'pk', flat=True)
+                created += len(UserStats.objects.bulk_create(
+                    [UserStats(user_id=user_id) for user_id in user_ids], ignore_conflicts=True))
+                repaired += reconcile_counters(UserStats, start_pk, end_pk)
+        self.stdout.write(self.style.SUCCESS(
+            f'Created {created} and repaired {repaired} UserStats rows up to user id {last_pk}.'))
@@ -0,0 +1,105 @@
+import statistics
+import time
+import uuid
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from app.account.models import User, Profile, Relation
+from app.core.cache import get_redis_client
+from app.post.feed import fan_out_post, get_timeline_posts, rebuild_timeline, timeline_key, author_posts_key, \
+    high_follower_key
+from app.post.models import Post
+
+
+class Command(BaseCommand):
+    """
+    Defines a management command to compare the push (fan-out-on-write) and hybrid push/pull feed strategies.
+    For every requested follower count it builds a synthetic Relation graph (one author, N followers) inside a
+    transaction that is rolled back at the end, then measures:
+    - write cost: time and number of sorted sets touched to distribute the author's posts,
+    - read latency: time to read the first timeline page for a sample of followers.
+    The Redis keys created for the synthetic users are removed afterwards.
+    """
+    help = "Benchmark push vs hybrid push/pull home timelines on synthetic follower graphs"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--followers', type=int, nargs='+', default=[100, 1000, 10000],
+                            help='Follower counts of the synthetic author')
+        parser.add_argument('--posts', type=int, default=20, help='Posts created by the author per strategy')
+        parser.add_argument('--reads', type=int, default=200, help='Timeline reads measured per strategy')
+
+    def handle(self, *args, **options):
+        client = get_redis_client()
+        if client is None:
+            self.stdout.write(self.style.ERROR('The default cache is not backed by Redis.'))
+            return
+
+        self.stdout.write(f"{'followers':>10} {'strategy':>8} {'write ms/post':>14} {'sets/post':>10} "
+                          f"{'read p50 ms':>12} {'read p95 ms':>12}")
+        for followers in options['followers']:
+            for strategy, threshold in (('push', float('inf')), ('hybrid', 0)):
+                result = self.run_strategy(client, followers, threshold, options['posts'], options['reads'])
+                self.stdout.write(f"{followers:>10} {strategy:>8} {result['write_ms']:>14.2f} "
+                                  f"{result['sets']:>10.0f} {result['read_p50']:>12.2f} {result['read_p95']:>12.2f}")
+
+    def run_strategy(self, client, followers, threshold, posts, reads):
+        """
+        Build a synthetic graph, distribute `posts` posts with the given fan-out threshold and time the reads.
+        """
+        user_ids = []
+        try:
+            with transaction.atomic():
+                author, follower_ids = self.build_graph(followers)
+                user_ids = [author.pk, *follower_ids]
+                for follower_id in follower_ids:
+                    rebuild_timeline(follower_id, client)
+
+                write_seconds = 0
+                touched = 0
+                for i in range(posts):
+                    post = Post.objects.create(owner=author.profile, title=f'Benchmark {i}', body='Benchmark')
+                    start = time.perf_counter()
+                    touched += fan_out_post(post, threshold=threshold)
+                    write_seconds += time.perf_counter() - start
+
+                samples = []
+                for i in range(reads):
+                    start = time.perf_counter()
+                    get_timeline_posts(follower_ids[i % len(follower_ids)])
+                    samples.append((time.perf_counter() - start) * 1000)
+                samples.sort()
+                transaction.set_rollback(True)
+        finally:
+            self.cleanup(client, user_ids)
+
+        return {
+            'write_ms': write_seconds * 1000 / posts,
+            'sets': touched / posts,
+            'read_p50': statistics.median(samples),
+            'read_p95': samples[int(len(samples) * 0.95) - 1],
+        }
+
+    def build_graph(self, followers):
+        """Create one author with a profile and `followers` users following it."""
+        token = uuid.uuid4().hex[:8]
+        author = User.objects.create(username=f'bench_{token}', email=f'bench_{token}@gmail.com',
+                                     phone_number=f'07{uuid.uuid4().int % 10 ** 9:09d}')
+        Profile.objects.create(user=author, full_name=f'bench {token}', name='bench', last_name=token,
+                               gender='-', bio='')
+        users = User.objects.bulk_create(
+            User(username=f'bench_{token}_{i}', email=f'bench_{token}_{i}@gmail.com',
+                 phone_number=f'08{(author.pk + i) % 10 ** 9:09d}')
+            for i in range(followers))
+        Relation.objects.bulk_create(
+            Relation(followers=user, following=author, is_follow=True) for user in users)
+        return author, [user.pk for user in users]
+
+    @staticmethod
+    def cleanup(client, user_ids):
+        """Remove the Redis keys of the synthetic users."""
+        if not user_ids:
+            return
+        client.srem(high_follower_key(), *user_ids)
+        keys = [timeline_key(user_id) for user_id in user_ids] + [author_posts_key(user_ids[0])]
+        for start in range(0, len(keys), 1000):
+            client.delete(*keys[start:start + 1000])
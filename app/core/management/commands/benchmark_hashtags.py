@@ -0,0 +1,98 @@
+import random
+import statistics
+import string
+import time
+import uuid
+
+from django.contrib.postgres.search import TrigramSimilarity
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from app.account.models import User, Profile
+from app.core.text import html_to_text
+from app.post.hashtags import hashtag_posts
+from app.post.models import Hashtag, Post, PostHashtag
+
+
+class Command(BaseCommand):
+    """
+    Defines a management command to compare finding the posts of a hashtag with trigram similarity over the post
+    texts and with the hashtag index (PostHashtag).
+    It inserts a synthetic corpus of tagged posts inside a transaction that is rolled back at the end, then looks up
+    the same tags with both strategies and reports:
+    - latency of the first page (p50 / p95),
+    - whether the plan of the query used an index.
+    PostgreSQL only, like benchmark_search.
+    """
+    help = "Benchmark the trigram similarity lookup of a hashtag against the hashtag index on a synthetic corpus"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', type=int, default=200000, help='Number of synthetic posts')
+        parser.add_argument('--tags', type=int, default=5000, help='Number of distinct hashtags')
+        parser.add_argument('--queries', type=int, default=50, help='Tags looked up per strategy')
+        parser.add_argument('--batch-size', type=int, default=10000, help='Posts inserted per batch')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            self.stdout.write(self.style.ERROR('The hashtag benchmark needs PostgreSQL.'))
+            return
+
+        rng = random.Random(0)
+        vocabulary = [''.join(rng.choices(string.ascii_lowercase, k=rng.randint(4, 10))) for _ in range(20000)]
+        tags = [f'tag{word}' for word in rng.sample(vocabulary, options['tags'])]
+        queries = [rng.choice(tags) for _ in range(options['queries'])]
+        with transaction.atomic():
+            hashtags = self.build_corpus(rng, vocabulary, tags, options['posts'], options['batch_size'])
+            self.stdout.write(f"{'strategy':>8} {'p50 ms':>10} {'p95 ms':>10} {'index':>6}")
+            for strategy, lookup in (('trigram', self.trigram_lookup),
+                                     ('hashtag', lambda tag: self.hashtag_lookup(hashtags[tag]))):
+                samples = []
+                for query in queries:
+                    start = time.perf_counter()
+                    list(lookup(query)[:20].values_list('pk', flat=True))
+                    samples.append((time.perf_counter() - start) * 1000)
+                samples.sort()
+                plan = lookup(queries[0]).explain()
+                self.stdout.write(f"{strategy:>8} {statistics.median(samples):>10.2f} "
+                                  f"{samples[int(len(samples) * 0.95) - 1]:>10.2f} "
+                                  f"{'yes' if 'Index' in plan else 'no':>6}")
+            transaction.set_rollback(True)
+
+    def build_corpus(self, rng, vocabulary, tags, posts, batch_size):
+        """
+        Create one author and `posts` posts of random words with one to three hashtags each, index their tags and
+        refresh the planner statistics. Returns {tag name: Hashtag}.
+        """
+        token = uuid.uuid4().hex[:8]
+        author = User.objects.create(username=f'bench_{token}', email=f'bench_{token}@gmail.com',
+                                     phone_number=f'07{uuid.uuid4().int % 10 ** 9:09d}')
+        profile = Profile.objects.create(user=author, full_name=f'bench {token}', name='bench', last_name=token,
+                                         gender='-', bio='')
+        hashtags = {hashtag.name: hashtag for hashtag in Hashtag.objects.bulk_create(
+            Hashtag(name=tag) for tag in tags)}
+        for start in range(0, posts, batch_size):
+            batch = []
+            for _ in range(min(batch_size, posts - start)):
+                post_tags = rng.sample(tags, rng.randint(1, 3))
+                body = (f"<p>{' '.join(rng.choices(vocabulary, k=40))}</p>"
+                        f"<p>{' '.join(f'#{tag}' for tag in post_tags)}</p>")
+                batch.append((Post(owner=profile, title=' '.join(rng.choices(vocabulary, k=4)), body=body,
+                                   body_text=html_to_text(body)), post_tags))
+            Post.objects.bulk_create(post for post, _ in batch)
+            PostHashtag.objects.bulk_create(
+                PostHashtag(hashtag=hashtags[tag], post=post, create_time=post.create_time)
+                for post, post_tags in batch for tag in post_tags)
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE post_post, post_hashtag, post_posthashtag')
+        return hashtags
+
+    @staticmethod
+    def trigram_lookup(tag):
+        """The posts of a tag found by trigram similarity of the tag with the title and the body text."""
+        return Post.objects.annotate(
+            similarity=TrigramSimilarity('title', tag) + TrigramSimilarity('body_text', tag)).filter(
+            similarity__gt=0.1).order_by('-similarity', '-id')
+
+    @staticmethod
+    def hashtag_lookup(hashtag):
+        """The posts of a tag read from the hashtag index, as the tag page does."""
+        return hashtag_posts(hashtag).order_by('-tagged_at', '-id')
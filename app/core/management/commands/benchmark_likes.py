@@ -0,0 +1,83 @@
+import time
+import uuid
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from app.account.models import User, Profile
+from app.core.cache import get_redis_client
+from app.post.like_buffer import (flush_like_buffer, toggle_buffered_like, toggle_direct_like, ops_key, flushing_key,
+                                  delta_key, dirty_key)
+from app.post.models import Post
+
+
+class Command(BaseCommand):
+    """
+    Defines a management command to compare synchronous like toggles with the write-behind like buffer.
+    It creates one post and N users inside a transaction that is rolled back at the end, then every user toggles
+    the like of the post `--rounds` times through each path and the command reports toggles per second.
+    For the buffered path the time of the final flush is reported separately and included in the total throughput.
+    The Redis keys of the synthetic post are removed afterwards.
+    """
+    help = "Benchmark synchronous vs Redis-buffered like toggles on a single hot post"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000, help='Number of synthetic users liking the post')
+        parser.add_argument('--rounds', type=int, default=3, help='Toggles per user and path')
+
+    def handle(self, *args, **options):
+        client = get_redis_client()
+        if client is None:
+            self.stdout.write(self.style.ERROR('The default cache is not backed by Redis.'))
+            return
+
+        post = None
+        try:
+            with transaction.atomic():
+                post, users = self.build_post(options['users'])
+                toggles = len(users) * options['rounds']
+                self.stdout.write(f"{'path':>10} {'toggles':>8} {'toggle s':>9} {'flush s':>8} {'toggles/s':>10}")
+
+                seconds = self.run_toggles(toggle_direct_like, post, users, options['rounds'])
+                self.report('sync', toggles, seconds, 0)
+
+                seconds = self.run_toggles(lambda *args: toggle_buffered_like(client, *args), post, users,
+                                           options['rounds'])
+                start = time.perf_counter()
+                flush_like_buffer()
+                flush_seconds = time.perf_counter() - start
+                self.report('buffered', toggles, seconds, flush_seconds)
+                transaction.set_rollback(True)
+        finally:
+            if post is not None:
+                client.delete(ops_key(post.pk), flushing_key(post.pk))
+                client.hdel(delta_key(), post.pk)
+                client.srem(dirty_key(), post.pk)
+
+    @staticmethod
+    def run_toggles(toggle, post, users, rounds):
+        """Toggle the like of every user `rounds` times with toggle(post, user) and return the elapsed seconds."""
+        start = time.perf_counter()
+        for _ in range(rounds):
+            for user in users:
+                toggle(post, user)
+        return time.perf_counter() - start
+
+    def report(self, path, toggles, seconds, flush_seconds):
+        """Write one line of results."""
+        self.stdout.write(f"{path:>10} {toggles:>8} {seconds:>9.2f} {flush_seconds:>8.2f} "
+                          f"{toggles / (seconds + flush_seconds):>10.0f}")
+
+    @staticmethod
+    def build_post(users):
+        """Create one post and `users` users."""
+        token = uuid.uuid4().hex[:8]
+        author = User.objects.create(username=f'bench_{token}', email=f'bench_{token}@gmail.com',
+                                     phone_number=f'07{uuid.uuid4().int % 10 ** 9:09d}')
+        profile = Profile.objects.create(user=author, full_name=f'bench {token}', name='bench', last_name=token,
+                                         gender='-', bio='')
+        post = Post.objects.create(owner=profile, title='Benchmark', body='Benchmark')
+        likers = User.objects.bulk_create(
+            User(username=f'bench_{token}_{i}', email=f'bench_{token}_{i}@gmail.com',
+                 phone_number=f'08{(author.pk + i) % 10 ** 9:09d}')
+            for i in range(users))
+        return post, likers
@@ -0,0 +1,67 @@
+import statistics
+import time
+import uuid
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.template.loader import render_to_string
+from app.account.models import User, Profile
+from app.post.fragments import bump_card_versions
+from app.post.loaders import post_card_queryset
+from app.post.models import Image, Post
+
+
+class Command(BaseCommand):
+    """
+    Defines a management command to measure the render time of a page of post cards with a cold and a warm fragment
+    cache (see app.post.fragments).
+    It creates `--cards` posts with images inside a transaction that is rolled back at the end, loads them once with
+    post_card_queryset and renders the explorer and posts card lists `--rounds` times each:
+    - cold: every card version is bumped before the render, so every card is rendered and stored,
+    - warm: the cards rendered by the previous round are reused.
+    Reports p50 / p95 in milliseconds. The posts are loaded before the clock starts, so only the template and cache
+    work is measured.
+    """
+    help = "Benchmark rendering a page of post cards with a cold and a warm fragment cache"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--cards', type=int, default=50, help='Number of post cards on the page')
+        parser.add_argument('--rounds', type=int, default=50, help='Renders measured per cache state')
+
+    def handle(self, *args, **options):
+        templates = (('explorer', 'explorer/explorer_cards.html', 'post_search'),
+                     ('posts', 'post/post_cards.html', 'posts'))
+        with transaction.atomic():
+            user, posts = self.build_page(options['cards'])
+            post_ids = [post.pk for post in posts]
+            self.stdout.write(f"{'page':>8} {'cache':>6} {'p50 ms':>10} {'p95 ms':>10}")
+            for name, template_name, variable in templates:
+                context = {variable: posts, 'user': user, 'request': None, 'csrf_token': 'benchmark'}
+                for state in ('cold', 'warm'):
+                    samples = []
+                    render_to_string(template_name, context)
+                    for _ in range(options['rounds']):
+                        if state == 'cold':
+                            bump_card_versions(post_ids)
+                        start = time.perf_counter()
+                        render_to_string(template_name, context)
+                        samples.append((time.perf_counter() - start) * 1000)
+                    samples.sort()
+                    self.stdout.write(f"{name:>8} {state:>6} {statistics.median(samples):>10.2f} "
+                                      f"{samples[max(int(len(samples) * 0.95) - 1, 0)]:>10.2f}")
+            transaction.set_rollback(True)
+
+    @staticmethod
+    def build_page(cards):
+        """Create one author with `cards` posts of three images each and return the author and the loaded posts."""
+        token = uuid.uuid4().hex[:8]
+        author = User.objects.create(username=f'bench_{token}', email=f'bench_{token}@gmail.com',
+                                     phone_number=f'07{uuid.uuid4().int % 10 ** 9:09d}')
+        Profile.objects.create(user=author, full_name=f'bench {token}', name='bench', last_name=token, gender='-',
+                               bio='', profile_picture='profile_picture/bench.jpeg')
+        posts = Post.objects.bulk_create(
+            Post(owner=author.profile, title=f'Post {i}', body=f'<p>Body of post {i}</p>',
+                 body_text=f'Body of post {i}') for i in range(cards))
+        Image.objects.bulk_create(Image(post_image=post, images=f'bench/{post.pk}_{i}.jpg')
+                                  for post in posts for i in range(3))
+        return author, list(post_card_queryset(Post.objects.filter(pk__in=[post.pk for post in posts])))
@@ -0,0 +1,81 @@
+import random
+import statistics
+import string
+import time
+import uuid
+
+from django.contrib.postgres.search import TrigramSimilarity
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from app.account.models import User, Profile
+from app.post.models import Post
+from app.post.search import search_posts
+
+
+class Command(BaseCommand):
+    """
+    Defines a management command to compare the legacy sequential trigram search with the index-backed search.
+    It inserts a synthetic corpus of posts (random words wrapped in HTML, like CKEditor bodies) inside a transaction
+    that is rolled back at the end, then runs the same queries with both strategies and reports:
+    - latency of the first page (p50 / p95),
+    - whether the plan of the query used an index.
+    PostgreSQL only: the search relies on the search_vector trigger and the pg_trgm GIN indexes.
+    """
+    help = "Benchmark the legacy trigram scan against the indexed full-text search on a synthetic corpus"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', type=int, default=1000000, help='Number of synthetic posts')
+        parser.add_argument('--queries', type=int, default=50, help='Queries measured per strategy')
+        parser.add_argument('--batch-size', type=int, default=10000, help='Posts inserted per batch')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            self.stdout.write(self.style.ERROR('The search benchmark needs PostgreSQL.'))
+            return
+
+        rng = random.Random(0)
+        vocabulary = [''.join(rng.choices(string.ascii_lowercase, k=rng.randint(4, 10))) for _ in range(20000)]
+        queries = [rng.choice(vocabulary) for _ in range(options['queries'])]
+        with transaction.atomic():
+            self.build_corpus(rng, vocabulary, options['posts'], options['batch_size'])
+            self.stdout.write(f"{'strategy':>8} {'p50 ms':>10} {'p95 ms':>10} {'index':>6}")
+            for strategy, search in (('legacy', self.legacy_search), ('indexed', self.indexed_search)):
+                samples = []
+                for query in queries:
+                    start = time.perf_counter()
+                    list(search(query)[:20].values_list('pk', flat=True))
+                    samples.append((time.perf_counter() - start) * 1000)
+                samples.sort()
+                plan = search(queries[0]).explain()
+                self.stdout.write(f"{strategy:>8} {statistics.median(samples):>10.2f} "
+                                  f"{samples[int(len(samples) * 0.95) - 1]:>10.2f} "
+                                  f"{'yes' if 'Index' in plan else 'no':>6}")
+            transaction.set_rollback(True)
+
+    def build_corpus(self, rng, vocabulary, posts, batch_size):
+        """Create one author and `posts` posts of random words, then refresh the planner statistics."""
+        token = uuid.uuid4().hex[:8]
+        author = User.objects.create(username=f'bench_{token}', email=f'bench_{token}@gmail.com',
+                                     phone_number=f'07{uuid.uuid4().int % 10 ** 9:09d}')
+        profile = Profile.objects.create(user=author, full_name=f'bench {token}', name='bench', last_name=token,
+                                         gender='-', bio='')
+        for start in range(0, posts, batch_size):
+            Post.objects.bulk_create(
+                Post(owner=profile, title=' '.join(rng.choices(vocabulary, k=4)),
+                     body=f"<p>{' '.join(rng.choices(vocabulary, k=40))}</p><p><strong>"
+                          f"{' '.join(rng.choices(vocabulary, k=10))}</strong></p>")
+                for _ in range(min(batch_size, posts - start)))
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE post_post')
+
+    @staticmethod
+    def legacy_search(query):
+        """The search as it used to be: trigram similarity computed for every row."""
+        return Post.objects.annotate(
+            similarity=TrigramSimilarity('title', query) + TrigramSimilarity('body', query)).filter(
+            similarity__gt=0.1).order_by('-similarity', '-id')
+
+    @staticmethod
+    def indexed_search(query):
+        """The index-backed search used by the views."""
+        return search_posts(Post.objects.all(), query).order_by('-rank', '-id')
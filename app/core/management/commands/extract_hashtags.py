@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Max
+from app.post.hashtags import sync_post_hashtags
+from app.post.models import Post
+
+
+class Command(BaseCommand):
+    """
+    Defines a management command to build the hashtag index (Hashtag, PostHashtag) of the existing posts.
+    Walks the posts that are not soft-deleted by primary key ranges, reading only the columns the tags come from, and
+    syncs the tags of each batch in its own transaction; posts whose tags are already indexed are not written.
+    Safe to run again at any time.
+    """
+    help = "Extract the hashtags of the existing posts"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Number of posts processed per batch')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        posts = Post.objects.archive().filter(is_deleted=False)
+        last_pk = posts.aggregate(last_pk=Max('pk'))['last_pk'] or 0
+        added = removed = 0
+        for start_pk in range(1, last_pk + 1, batch_size):
+            with transaction.atomic():
+                for post in posts.filter(pk__gte=start_pk, pk__lt=start_pk + batch_size).only(
+                        'pk', 'title', 'body_text', 'create_time'):
+                    post_added, post_removed = sync_post_hashtags(post)
+                    added += post_added
+                    removed += post_removed
+        self.stdout.write(self.style.SUCCESS(
+            f'Hashtags: added {added} and removed {removed} post tags up to id {last_pk}.'))
@@ -0,0 +1,26 @@
+import time
+
+from django.core.management.base import BaseCommand
+from app.post.like_buffer import flush_like_buffer
+
+
+class Command(BaseCommand):
+    """
+    Defines a management command to write the like toggles buffered in Redis to the database.
+    Run it periodically (cron) or keep it running with --interval. A flush that crashes leaves its toggles in Redis
+    and they are retried by the next run.
+    """
+    help = "Flush the buffered like toggles from Redis into Vote rows and Post.like_count"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=float, default=None,
+                            help='Keep running and flush every N seconds instead of flushing once')
+
+    def handle(self, *args, **options):
+        interval = options['interval']
+        while True:
+            flushed = flush_like_buffer()
+            self.stdout.write(self.style.SUCCESS(f'Flushed the buffered likes of {flushed} posts.'))
+            if interval is None:
+                break
+            time.sleep(interval)
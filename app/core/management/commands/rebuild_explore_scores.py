@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Max
+from app.post.models import Post
+from app.post.ranking import refresh_explore_scores
+
+
+class Command(BaseCommand):
+    """
+    Defines a management command to recompute the explorer score of every post (see app.post.ranking).
+    Run it once after adding the score, after changing the EXPLORE_* weights, or to bring the author follower counts
+    of old posts up to date. Walks the posts by primary key ranges, each batch in its own short transaction.
+    """
+    help = "Recompute the explorer ranking score of every post"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Number of posts rescored per batch')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        last_pk = Post._base_manager.aggregate(last_pk=Max('pk'))['last_pk'] or 0
+        rescored = 0
+        for start_pk in range(1, last_pk + 1, batch_size):
+            with transaction.atomic():
+                rescored += len(refresh_explore_scores(range(start_pk, start_pk + batch_size)))
+        self.stdout.write(self.style.SUCCESS(f'Posts: rescored {rescored} posts up to id {last_pk}.'))
@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand
+from app.account.models import User
+from app.post.feed import rebuild_timeline
+from app.core.cache import get_redis_client
+
+
+class Command(BaseCommand):
+    """
+    Defines a management command to rebuild home timelines from the Relation graph.
+    Rebuilds the timeline of one user (--user) or of every active user, walking users in batches.
+    Useful after a Redis flush or eviction, or when the timeline size setting changes.
+    """
+    help = "Rebuild home timelines stored in Redis"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', type=int, help='Rebuild only the timeline of this user id')
+        parser.add_argument('--batch-size', type=int, default=500, help='Number of users loaded per batch')
+
+    def handle(self, *args, **options):
+        client = get_redis_client()
+        if client is None:
+            self.stdout.write(self.style.ERROR('The default cache is not backed by Redis.'))
+            return
+
+        if options['user']:
+            user_ids = [options['user']]
+        else:
+            user_ids = User.objects.filter(is_active=True).values_list('id', flat=True).order_by('id').iterator(
+                chunk_size=options['batch_size'])
+
+        rebuilt = 0
+        for user_id in user_ids:
+            rebuild_timeline(user_id, client)
+            rebuilt += 1
+            if rebuilt % options['batch_size'] == 0:
+                self.stdout.write(f'Rebuilt {rebuilt} timelines...')
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {rebuilt} timelines.'))
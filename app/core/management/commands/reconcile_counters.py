@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Max
+from app.post.counters import COUNTERS, reconcile_counters
+
+
+class Command(BaseCommand):
+    """
+    Defines a management command to repair drift in the denormalized counters.
+    Walks Post (like_count, comment_count), Comment (like_count), Hashtag (post_count) and UserStats by primary key
+    ranges, recomputes the counters of each batch from the Vote, Comment, CommentLike, PostHashtag, Post and Relation
+    tables and updates only the rows that drifted.
+    Each batch runs in its own short transaction.
+    """
+    help = "Recompute denormalized like and comment counters and repair drift"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Number of rows checked per batch')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        for model in COUNTERS:
+            last_pk = model._base_manager.aggregate(last_pk=Max('pk'))['last_pk'] or 0
+            repaired = 0
+            for start_pk in range(1, last_pk + 1, batch_size):
+                with transaction.atomic():
+                    repaired += reconcile_counters(model, start_pk, start_pk + batch_size)
+            self.stdout.write(self.style.SUCCESS(
+                f'{model._meta.verbose_name_plural}: repaired {repaired} rows up to id {last_pk}.'))
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+from app.post.search_cache import reset_search_cache_metrics, search_cache_metrics
+
+
+class Command(BaseCommand):
+    """
+    Defines a management command to report the search result cache metrics: fresh and stale hits, misses, hit ratio,
+    the database time spent computing search pages and the database time the hits saved.
+    """
+    help = "Show the hit ratio and the database time saved by the search result cache"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reset', action='store_true', help='Reset the counters after reporting them')
+
+    def handle(self, *args, **options):
+        metrics = search_cache_metrics()
+        self.stdout.write(self.style.SUCCESS(
+            f"hits: {metrics['hits']}, stale hits: {metrics['stale_hits']}, misses: {metrics['misses']}, "
+            f"hit ratio: {metrics['hit_ratio']:.1%}, query time: {metrics['query_seconds']:.3f}s, "
+            f"saved: {metrics['saved_seconds']:.3f}s"))
+        if options['reset']:
+            reset_search_cache_metrics()
@@ -1,12 +1,17 @@
 import os
 import uuid
 
+from django.conf import settings
 from django.utils import timezone
 from django.contrib import messages
 from django.db import models
+from django.http import JsonResponse
 from django.shortcuts import render, redirect
+from django.template.loader import render_to_string
 from django.urls import reverse_lazy
 from django.views import View
+from app.core.pagination import CursorPaginator
+from app.core.text import html_to_text
 
 
 class SoftDeleteMixin(models.QuerySet):
@@ -144,6 +149,82 @@ class HttpsOptionLoginMixin(View):
         return render(request, self.template_http_method_not_allowed)
 
 
+class PlainTextMixin:
+    """
+    Mixin for models with rich text (HTML) fields that keep a plain-text shadow field of each of them.
+    `plain_text_fields` maps a rich text field to its shadow field; the shadow is recomputed on save() whenever the
+    rich text field is saved, so readers never have to handle the markup.
+    """
+    plain_text_fields = {}
+
+    def save(self, *args, **kwargs):
+        """Refresh the plain-text shadow of every rich text field being saved, then save."""
+        update_fields = kwargs.get('update_fields')
+        deferred = self.get_deferred_fields()
+        for source, shadow in self.plain_text_fields.items():
+            if source in deferred or (update_fields is not None and source not in update_fields):
+                continue
+            setattr(self, shadow, html_to_text(getattr(self, source)))
+            if update_fields is not None:
+                kwargs['update_fields'] = update_fields = {*update_fields, shadow}
+        return super().save(*args, **kwargs)
+
+
+class CounterFieldsMixin:
+    """
+    Mixin for models with denormalized counter columns, which only UPDATE ... SET col = col + delta statements
+    (app.post.counters) and the reconciliation write. save() of an existing row leaves `counter_fields` out of the
+    UPDATE, so saving an instance loaded earlier in the request cannot overwrite the increments committed since;
+    creating a row still writes them.
+    """
+    counter_fields = ()
+
+    def save(self, *args, **kwargs):
+        """Save, leaving the counter fields out of the UPDATE of an existing row."""
+        if self._state.adding or kwargs.get('force_insert'):
+            return super().save(*args, **kwargs)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None:
+            deferred = self.get_deferred_fields()
+            update_fields = {field.name for field in self._meta.concrete_fields
+                             if not field.primary_key and field.attname not in deferred}
+        kwargs['update_fields'] = set(update_fields) - set(self.counter_fields)
+        return super().save(*args, **kwargs)
+
+
+class CursorPaginationMixin:
+    """
+    Mixin for views that render a cursor-paginated list.
+    - paginate returns the page selected by the `cursor` query parameter, of get_page_size() items: the setting named
+      by page_size_setting, read on every request so that it follows the settings, or page_size without one.
+    - render_page renders the full template, or, when the `fragment` query parameter is set, a JSON response with the
+      rendered fragment template and the next/previous cursors (used by the "load more" buttons).
+    """
+    page_size = 20
+    page_size_setting = None
+
+    def get_page_size(self):
+        """Return the number of items per page."""
+        if self.page_size_setting:
+            return getattr(settings, self.page_size_setting)
+        return self.page_size
+
+    def paginate(self, queryset, ordering):
+        """Return the page of queryset selected by the `cursor` query parameter."""
+        return CursorPaginator(queryset, ordering, self.get_page_size()).page(self.request.GET.get('cursor'))
+
+    def render_page(self, request, template_name, fragment_template_name, page, context):
+        """Render the whole page, or only the fragment of the requested page for "load more" requests."""
+        context = {**context, 'page': page}
+        if request.GET.get('fragment'):
+            return JsonResponse({
+                'html': render_to_string(fragment_template_name, context, request=request),
+                'next_cursor': page.next_cursor,
+                'previous_cursor': page.previous_cursor,
+            })
+        return render(request, template_name, context)
+
+
 def image_upload_path_mixin(instance, filename):
     """Generate file path for image uploads"""
     base_filename, file_extension = os.path.splitext(filename)
@@ -0,0 +1,147 @@
+import base64
+import json
+from datetime import datetime
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import Q
+
+"""
+Keyset (cursor) pagination.
+
+Pages are selected with a WHERE clause on the ordering columns instead of OFFSET, so with a composite index on the
+same columns every page, however deep, costs one index range scan of page_size + 1 rows.
+The ordering must end with a unique column (usually 'id' or '-id') so that the order is total.
+Cursors are opaque URL-safe tokens holding the ordering values of the first or last row of a page.
+"""
+
+
+class InvalidCursor(ValueError):
+    """Raised when a cursor token cannot be decoded or does not match the paginator ordering."""
+
+
+class CursorPage:
+    """
+    One page of results.
+
+    Attributes:
+    - object_list (list): The objects of the page, in the paginator ordering.
+    - next_cursor (str | None): Token of the following page, None on the last page.
+    - previous_cursor (str | None): Token of the preceding page, None on the first page.
+    """
+
+    def __init__(self, object_list, next_cursor, previous_cursor):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+
+class CursorPaginator:
+    """
+    Paginates a queryset by keyset on the given ordering.
+
+    Usage:
+        page = CursorPaginator(Post.objects.all(), ordering=('-update_time', '-id'), page_size=20).page(cursor)
+
+    Ordering fields may be model fields or annotations present on the queryset.
+    """
+
+    def __init__(self, queryset, ordering=('-update_time', '-id'), page_size=20):
+        self.queryset = queryset
+        self.ordering = tuple(ordering)
+        self.page_size = page_size
+        self.fields = [field.lstrip('-') for field in self.ordering]
+
+    def page(self, cursor=None):
+        """
+        Return the page designated by cursor (the first page when cursor is empty or invalid).
+        """
+        try:
+            direction, values = self.decode_cursor(cursor) if cursor else ('next', None)
+        except InvalidCursor:
+            direction, values = 'next', None
+
+        if direction == 'previous':
+            queryset = self.queryset.filter(self.keyset_filter(values, reverse=True))
+            rows = list(queryset.order_by(*self.reversed_ordering())[:self.page_size + 1])
+            has_more = len(rows) > self.page_size
+            object_list = rows[:self.page_size][::-1]
+            next_cursor = self.encode_cursor('next', object_list[-1]) if object_list else None
+            previous_cursor = self.encode_cursor('previous', object_list[0]) if has_more else None
+            return CursorPage(object_list, next_cursor, previous_cursor)
+
+        queryset = self.queryset
+        if values is not None:
+            queryset = queryset.filter(self.keyset_filter(values))
+        rows = list(queryset.order_by(*self.ordering)[:self.page_size + 1])
+        object_list = rows[:self.page_size]
+        next_cursor = self.encode_cursor('next', object_list[-1]) if len(rows) > self.page_size else None
+        previous_cursor = self.encode_cursor('previous', object_list[0]) if values is not None and object_list \
+            else None
+        return CursorPage(object_list, next_cursor, previous_cursor)
+
+    def reversed_ordering(self):
+        return [field[1:] if field.startswith('-') else f'-{field}' for field in self.ordering]
+
+    def keyset_filter(self, values, reverse=False):
+        """
+        Build the row-comparison filter selecting rows strictly after (or before, when reverse) the given values:
+        (a > x) OR (a = x AND b > y) OR ..., with the comparison flipped for descending fields.
+        """
+        condition = Q()
+        for index, ordering_field in enumerate(self.ordering):
+            descending = ordering_field.startswith('-') != reverse
+            lookup = 'lt' if descending else 'gt'
+            term = Q(**{f'{self.fields[index]}__{lookup}': values[index]})
+            for previous_index in range(index):
+                term &= Q(**{self.fields[previous_index]: values[previous_index]})
+            condition |= term
+        return condition
+
+    def encode_cursor(self, direction, obj):
+        """Encode the ordering values of obj as an opaque cursor token."""
+        values = [self.serialize_value(getattr(obj, field)) for field in self.fields]
+        payload = json.dumps({'d': direction[0], 'v': values}, separators=(',', ':'))
+        return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+    def decode_cursor(self, cursor):
+        """Decode a cursor token into (direction, ordering values)."""
+        try:
+            padded = cursor + '=' * (-len(cursor) % 4)
+            payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+            direction = {'n': 'next', 'p': 'previous'}[payload['d']]
+            values = payload['v']
+        except (ValueError, KeyError, TypeError) as e:
+            raise InvalidCursor(f'Invalid cursor: {e}')
+        if not isinstance(values, list) or len(values) != len(self.fields):
+            raise InvalidCursor('Cursor does not match the paginator ordering.')
+        return direction, [self.deserialize_value(field, value) for field, value in zip(self.fields, values)]
+
+    @staticmethod
+    def serialize_value(value):
+        if isinstance(value, datetime):
+            return value.isoformat()
+        return value
+
+    def deserialize_value(self, field_name, value):
+        try:
+            field = self.queryset.model._meta.get_field(field_name)
+        except FieldDoesNotExist:
+            return value  # Annotation: JSON already restored the number.
+        try:
+            return field.to_python(value)
+        except ValidationError as e:
+            raise InvalidCursor(f'Invalid cursor value for {field_name}: {e}')
@@ -0,0 +1,80 @@
+import math
+import random
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+"""
+Stampede protection for expensive cache entries (explorer pages, search results).
+
+get_or_compute(key, compute, timeout, stale_timeout) caches compute() as an entry holding the value, the time it took
+to compute (delta) and the time it stops being fresh. The entry is kept for timeout + stale_timeout seconds, so:
+- single flight: only the request that takes the short `<key>:refresh` lock (cache.add, settings.STAMPEDE_LOCK_TIMEOUT
+  seconds) recomputes an entry. When the entry is missing, the others poll the cache for at most
+  settings.STAMPEDE_WAIT_TIMEOUT seconds for the value being computed, then compute it themselves (the lock holder
+  died or is too slow); when the entry is stale, the others are served the stale value at once;
+- probabilistic early refresh (XFetch): a fresh entry is recomputed before it expires by a request for which
+  now - delta * beta * log(random()) >= fresh until, so the entries that are slow to compute are refreshed earlier and
+  a popular key is usually recomputed by one request while everyone else still reads the fresh value. beta
+  (settings.STAMPEDE_BETA) > 1 favors earlier refreshes, 0 disables them.
+"""
+
+HIT = 'hit'
+STALE = 'stale'
+MISS = 'miss'
+
+
+def lock_key(key):
+    """Return the cache key of the lock taken by the request recomputing key."""
+    return f'{key}:refresh'
+
+
+def should_refresh(entry, beta):
+    """Return True when entry is stale, or randomly before, earlier for entries slow to compute (XFetch)."""
+    return time.time() - entry['delta'] * beta * math.log(1 - random.random()) >= entry['fresh_until']
+
+
+def compute_entry(key, compute, timeout, stale_timeout, locked):
+    """Compute and cache the entry of key, then release the lock if it was taken. Returns (value, MISS, delta)."""
+    try:
+        start = time.perf_counter()
+        value = compute()
+        delta = time.perf_counter() - start
+        cache.set(key, {'value': value, 'delta': delta, 'fresh_until': time.time() + timeout},
+                  timeout + stale_timeout)
+    finally:
+        if locked:
+            cache.delete(lock_key(key))
+    return value, MISS, delta
+
+
+def get_or_compute(key, compute, timeout, stale_timeout, beta=None):
+    """
+    Return the value cached under key, computing it with compute() when needed, as (value, status, seconds):
+    status is HIT (fresh, or computed meanwhile by another request), STALE (served while another request recomputes
+    it) or MISS (computed by this request); seconds is the time compute() took, for this or the cached value.
+    """
+    beta = settings.STAMPEDE_BETA if beta is None else beta
+    entry = cache.get(key)
+    if entry is not None:
+        stale = entry['fresh_until'] <= time.time()
+        if ((stale or should_refresh(entry, beta)) and
+                cache.add(lock_key(key), 1, settings.STAMPEDE_LOCK_TIMEOUT)):
+            return compute_entry(key, compute, timeout, stale_timeout, locked=True)
+        return entry['value'], STALE if stale else HIT, entry['delta']
+
+    deadline = time.monotonic() + settings.STAMPEDE_WAIT_TIMEOUT
+    while not cache.add(lock_key(key), 1, settings.STAMPEDE_LOCK_TIMEOUT):
+        if time.monotonic() >= deadline:
+            return compute_entry(key, compute, timeout, stale_timeout, locked=False)
+        time.sleep(settings.STAMPEDE_WAIT_INTERVAL)
+        entry = cache.get(key)
+        if entry is not None:
+            return entry['value'], HIT, entry['delta']
+    # the previous holder may have cached the entry between our read and the lock
+    entry = cache.get(key)
+    if entry is not None:
+        cache.delete(lock_key(key))
+        return entry['value'], HIT, entry['delta']
+    return compute_entry(key, compute, timeout, stale_timeout, locked=True)
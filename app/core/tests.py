@@ -1,3 +1,219 @@
-from django.test import TestCase
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock, skipUnless
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.cache.backends.redis import RedisCache
+from django.test import TestCase, override_settings
+from .cache import get_redis_client
+from .pagination import CursorPaginator
+from .stampede import HIT, MISS, STALE, get_or_compute, lock_key
+from .text import html_to_text, normalize_text
+from .tiered_cache import GENERATION_BUCKETS, MISSING, LocalTier, TieredRedisCache, get_local_tier
 
-# Create your tests here.
+User = get_user_model()
+
+
+class CursorPaginatorTestCase(TestCase):
+    def setUp(self):
+        """Setting up seven users to paginate, three per page"""
+        self.users = [User.objects.create(username=f'user{i}', email=f'user{i}@gmail.com',
+                                          phone_number=f'0912000000{i}') for i in range(7)]
+        self.paginator = CursorPaginator(User.objects.all(), ordering=('-create_time', '-id'), page_size=3)
+        self.expected = sorted(self.users, key=lambda user: (user.create_time, user.id), reverse=True)
+
+    def test_next_pages(self):
+        """Test walking forward through all pages with the next cursors"""
+        first = self.paginator.page()
+        second = self.paginator.page(first.next_cursor)
+        third = self.paginator.page(second.next_cursor)
+        self.assertEqual(first.object_list + second.object_list + third.object_list, self.expected)
+        self.assertFalse(first.has_previous)
+        self.assertFalse(third.has_next)
+
+    def test_previous_page(self):
+        """Test the previous cursor returns the same page that led to the current one"""
+        first = self.paginator.page()
+        second = self.paginator.page(first.next_cursor)
+        third = self.paginator.page(second.next_cursor)
+        self.assertEqual(self.paginator.page(third.previous_cursor).object_list, second.object_list)
+        back_to_first = self.paginator.page(second.previous_cursor)
+        self.assertEqual(back_to_first.object_list, first.object_list)
+        self.assertFalse(back_to_first.has_previous)
+
+    def test_invalid_cursor(self):
+        """Test an invalid cursor falls back to the first page"""
+        self.assertEqual(self.paginator.page('not-a-cursor').object_list, self.expected[:3])
+
+
+class HtmlToTextTestCase(TestCase):
+    def test_markup_removed(self):
+        """Test tags, scripts and comments are removed, entities decoded and whitespace collapsed"""
+        self.assertEqual(html_to_text('<p>Hello&nbsp;<strong>wor</strong>ld</p>\n<p>Second &amp; last</p>'
+                                      '<script>alert(1)</script><!-- note -->'),
+                         'Hello world Second & last')
+        self.assertEqual(html_to_text('line<br/>break'), 'line break')
+        self.assertEqual(html_to_text(None), '')
+
+
+class NormalizeTextTestCase(TestCase):
+    def test_persian_variants_folded(self):
+        """Test Arabic letters, digits, ZWNJ, diacritics and case fold to one spelling"""
+        self.assertEqual(normalize_text('كتاب  علي‌رضا ٤۵ سَلام Hello'), 'کتاب علی رضا 45 سلام hello')
+        self.assertEqual(normalize_text('مي‌روم'), normalize_text('می روم'))
+        self.assertEqual(normalize_text(None), '')
+
+
+class LocalTierTestCase(TestCase):
+    def test_lru_memory_cap(self):
+        """Test the least recently used entries are evicted to fit the entry and byte caps"""
+        tier = LocalTier(max_entries=3, max_bytes=100, timeout=60)
+        for key in 'abc':
+            tier.put(key, b'x' * 30, tier.generation(key))
+        tier.get('a')
+        tier.put('d', b'x' * 30, tier.generation('d'))
+        self.assertIs(tier.get('b'), MISSING)
+        self.assertEqual(tier.get('a'), b'x' * 30)
+        tier.put('e', b'x' * 50, tier.generation('e'))
+        self.assertLessEqual(tier.size, 100)
+        self.assertEqual(list(tier.entries), ['a', 'e'])
+        self.assertEqual(tier.counters['evictions'], 3)
+
+    def test_stale_read_not_stored(self):
+        """Test a value read before an invalidation is not stored, and expired entries are misses"""
+        tier = LocalTier(max_entries=10, max_bytes=100, timeout=60)
+        generation = tier.generation('a')
+        tier.invalidate(['a'])
+        tier.put('a', b'old', generation)
+        self.assertIs(tier.get('a'), MISSING)
+        generation = tier.generation('a')
+        tier.invalidate(None)
+        tier.put('a', b'old', generation)
+        self.assertIs(tier.get('a'), MISSING)
+        tier.timeout = 0
+        tier.put('a', b'new', tier.generation('a'))
+        self.assertIs(tier.get('a'), MISSING)
+
+    def test_other_invalidations_keep_fills(self):
+        """Test invalidating other keys does not discard a concurrent fill of a key"""
+        tier = LocalTier(max_entries=10, max_bytes=100, timeout=60)
+        bucket = hash('a') % GENERATION_BUCKETS
+        generation = tier.generation('a')
+        tier.invalidate([key for key in (f'key{i}' for i in range(100)) if hash(key) % GENERATION_BUCKETS != bucket])
+        tier.put('a', b'value', generation)
+        self.assertEqual(tier.get('a'), b'value')
+
+
+@skipUnless(get_redis_client(), 'The tiered cache needs the default cache to be backed by Redis')
+class TieredRedisCacheTestCase(TestCase):
+    def setUp(self):
+        """Setting up a tiered cache with its own invalidation channel, so every test has a fresh local tier"""
+        params = settings.CACHES['default']
+        self.options = {**params.get('OPTIONS', {}), 'LOCAL_KEY_PREFIXES': ('local:',),
+                        'INVALIDATION_CHANNEL': f'test:invalidate:{self._testMethodName}'}
+        self.cache = TieredRedisCache(params['LOCATION'], {**params, 'OPTIONS': self.options})
+        self.tier = get_local_tier(self.cache)
+        self.assertTrue(self.tier.listening.wait(5))
+        self.addCleanup(self.cache.delete_many, ['local:a', 'local:b', 'other'])
+
+    def test_local_hits(self):
+        """Test local keys are read from Redis once, then from the local tier as copies"""
+        self.cache.set('local:a', {'value': 1})
+        first = self.cache.get('local:a')
+        first['value'] = 2
+        self.assertEqual(self.cache.get('local:a'), {'value': 1})
+        self.assertEqual(self.cache.get_many(['local:a', 'local:b']), {'local:a': {'value': 1}})
+        metrics = self.cache.metrics()
+        self.assertEqual((metrics['redis_hits'], metrics['local_hits'], metrics['redis_misses']), (1, 2, 1))
+        self.assertEqual(metrics['entries'], 1)
+
+    def test_other_keys_bypass_local_tier(self):
+        """Test keys without a local prefix are only kept in Redis"""
+        self.cache.set('other', 1)
+        self.assertEqual(self.cache.get('other'), 1)
+        self.assertEqual(self.cache.incr('other'), 2)
+        self.assertEqual(self.cache.metrics()['entries'], 0)
+
+    def test_write_evicts_local_copy(self):
+        """Test a write on this node is visible to the next read"""
+        self.cache.set('local:a', 1)
+        self.cache.get('local:a')
+        self.cache.set('local:a', 2)
+        self.assertEqual(self.cache.get('local:a'), 2)
+        self.cache.delete('local:a')
+        self.assertIsNone(self.cache.get('local:a'))
+
+    def test_invalidation_from_other_node(self):
+        """Test a key published by another node is evicted from the local tier"""
+        self.cache.set('local:a', 1)
+        self.assertEqual(self.cache.get('local:a'), 1)
+        # another node writes the key in Redis, then publishes it
+        RedisCache.set(self.cache, 'local:a', 2)
+        self.assertEqual(self.cache.get('local:a'), 1)
+        message = f"other-node\n{self.cache.make_key('local:a')}"
+        get_redis_client().publish(self.options['INVALIDATION_CHANNEL'], message)
+        deadline = time.monotonic() + 5
+        while self.cache.get('local:a') == 1 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(self.cache.get('local:a'), 2)
+        self.assertGreaterEqual(self.cache.metrics()['invalidations'], 1)
+
+    def test_disabled_without_subscription(self):
+        """Test the local tier is bypassed while the invalidation subscription is down"""
+        self.cache.set('local:a', 1)
+        self.cache.get('local:a')
+        self.tier.listening.clear()
+        self.addCleanup(self.tier.listening.set)
+        RedisCache.set(self.cache, 'local:a', 2)
+        self.assertEqual(self.cache.get('local:a'), 2)
+
+
+class StampedeTestCase(TestCase):
+    def setUp(self):
+        """Setting up an empty cache and a slow computation counting its calls"""
+        cache.clear()
+        self.calls = 0
+        self.lock = threading.Lock()
+
+    def compute(self):
+        with self.lock:
+            self.calls += 1
+        time.sleep(0.2)
+        return 'value'
+
+    def test_concurrent_misses_compute_once(self):
+        """Test 200 concurrent misses of one key compute it once and all get the value"""
+        barrier = threading.Barrier(200)
+
+        def read(_):
+            barrier.wait()
+            return get_or_compute('stampede:test', self.compute, 60, 60)
+
+        with ThreadPoolExecutor(max_workers=200) as executor:
+            results = list(executor.map(read, range(200)))
+        self.assertEqual(self.calls, 1)
+        self.assertEqual({value for value, status, seconds in results}, {'value'})
+        self.assertEqual(sorted(status for value, status, seconds in results), [HIT] * 199 + [MISS])
+
+    def test_stale_value_served_while_refreshing(self):
+        """Test a stale entry is served while another request holds the refresh lock, then recomputed"""
+        get_or_compute('stampede:test', self.compute, 0, 60)
+        cache.add(lock_key('stampede:test'), 1)  # another request is refreshing
+        self.assertEqual(get_or_compute('stampede:test', self.compute, 0, 60)[:2], ('value', STALE))
+        self.assertEqual(self.calls, 1)
+        cache.delete(lock_key('stampede:test'))
+        self.assertEqual(get_or_compute('stampede:test', self.compute, 0, 60)[:2], ('value', MISS))
+        self.assertEqual(self.calls, 2)
+
+    @override_settings(STAMPEDE_BETA=1.0)
+    def test_early_refresh(self):
+        """Test a fresh entry is recomputed early when the draw says so (XFetch), never with beta 0"""
+        get_or_compute('stampede:test', self.compute, 1, 60)
+        with mock.patch('app.core.stampede.random.random', return_value=0.999999):  # -log(1 - r) = 13.8
+            self.assertEqual(get_or_compute('stampede:test', self.compute, 1, 60, beta=0)[1], HIT)
+            self.assertEqual(get_or_compute('stampede:test', self.compute, 1, 60)[1], MISS)
+        with mock.patch('app.core.stampede.random.random', return_value=0):
+            self.assertEqual(get_or_compute('stampede:test', self.compute, 1, 60)[1], HIT)
+        self.assertEqual(self.calls, 2)
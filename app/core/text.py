@@ -0,0 +1,70 @@
+import html
+import re
+
+from django.db.models import F, Func, TextField
+
+"""
+Plain-text helpers for the CKEditor (RichTextField) contents and for search.
+
+The rich text fields store HTML. Search, excerpts and length checks only need the text, so it is extracted once when
+the row is saved (see PlainTextMixin in app.core.mixin) instead of on every read.
+
+normalize_text folds the spelling variants of Persian text written with Arabic keyboards or fonts, so that the
+documents and the search queries compare equal. The database applies the same mapping with the search_normalize()
+SQL function (translate(lower(text), NORMALIZE_FROM, NORMALIZE_TO), see post migration 0009); the two must agree.
+"""
+
+# Elements whose content is never text.
+DROPPED = re.compile(r'<(script|style)\b.*?</\1\s*>|<!--.*?-->', re.IGNORECASE | re.DOTALL)
+# Block-level tags separate words; inline tags (<strong>, <a>, <span>, ...) do not.
+BLOCK_TAG = re.compile(r'</?(?:p|br|div|li|ul|ol|h[1-6]|tr|td|th|table|blockquote|pre|hr)\b[^>]*>', re.IGNORECASE)
+TAG = re.compile(r'<[^>]*>')
+WHITESPACE = re.compile(r'\s+')
+
+# Characters mapped by normalize_text: NORMALIZE_FROM[i] becomes NORMALIZE_TO[i], the characters of NORMALIZE_FROM
+# beyond the length of NORMALIZE_TO are removed (the semantics of SQL translate()).
+NORMALIZE_FROM = (
+    '\u0643\u064a\u0649\u0629\u0623\u0625\u0671\u0624'  # Arabic kaf, ya, alef maksura, teh marbuta, hamza forms
+    '\u06f0\u06f1\u06f2\u06f3\u06f4\u06f5\u06f6\u06f7\u06f8\u06f9'  # Persian digits
+    '\u0660\u0661\u0662\u0663\u0664\u0665\u0666\u0667\u0668\u0669'  # Arabic-Indic digits
+    '\u200c\u00a0'  # zero-width non-joiner and no-break space separate words
+    '\u064b\u064c\u064d\u064e\u064f\u0650\u0651\u0652\u0653\u0654\u0655\u0670'  # diacritics
+    '\u0640\u200b\u200d\u200e\u200f\ufeff'  # tatweel and other invisible characters
+)
+NORMALIZE_TO = (
+    '\u06a9\u06cc\u06cc\u0647\u0627\u0627\u0627\u0648'
+    '0123456789'
+    '0123456789'
+    '  '
+)
+NORMALIZE_TABLE = str.maketrans(NORMALIZE_FROM[:len(NORMALIZE_TO)], NORMALIZE_TO, NORMALIZE_FROM[len(NORMALIZE_TO):])
+
+
+def html_to_text(value):
+    """
+    Return the text of an HTML fragment: markup removed, entities decoded and whitespace collapsed to single spaces.
+    A few regular expression passes, much cheaper than a full HTML parser, which is enough for editor output.
+    """
+    if not value:
+        return ''
+    value = DROPPED.sub(' ', value)
+    value = BLOCK_TAG.sub(' ', value)
+    value = TAG.sub('', value)
+    return WHITESPACE.sub(' ', html.unescape(value)).strip()
+
+
+def normalize_text(value):
+    """
+    Return value lower-cased with the Persian/Arabic spelling variants, digits, zero-width characters and diacritics
+    folded (see NORMALIZE_FROM) and whitespace collapsed. Used for search documents and search queries.
+    """
+    if not value:
+        return ''
+    return WHITESPACE.sub(' ', value.lower().translate(NORMALIZE_TABLE)).strip()
+
+
+def normalized(field):
+    """
+    Return the search_normalize() database function applied to field, for index expressions and lookups.
+    """
+    return Func(F(field), function='search_normalize', output_field=TextField())
@@ -0,0 +1,311 @@
+import logging
+import os
+import pickle
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+from django.core.cache.backends.redis import RedisCache
+from redis.exceptions import RedisError
+
+"""
+Two-tier cache backend: a bounded in-process LRU in front of the Redis cache.
+
+TieredRedisCache is a drop-in replacement for django.core.cache.backends.redis.RedisCache (get_redis_client and every
+Redis feature keep working). Keys starting with one of OPTIONS['LOCAL_KEY_PREFIXES'] are also kept in a local tier
+shared by the threads of the process:
+- reads are served from the local tier when possible, otherwise from Redis, and the value is then kept locally for
+  at most OPTIONS['LOCAL_TIMEOUT'] seconds;
+- the local tier is an LRU capped at OPTIONS['LOCAL_MAX_ENTRIES'] entries and OPTIONS['LOCAL_MAX_BYTES'] bytes of
+  pickled values; values are stored pickled, so callers never share (and mutate) the same object;
+- every write of a local key (set, add, incr, delete, ...) is applied to Redis, evicts the key locally and publishes
+  it on the OPTIONS['INVALIDATION_CHANNEL'] pub/sub channel (a message is the id of the sending tier followed by the
+  keys, one per line); every process subscribes to the channel and evicts the keys it receives from the others, so
+  all nodes drop a changed key within the pub/sub latency.
+The local tier is only used while the subscription is up: when the connection drops the tier is cleared and bypassed
+until the subscriber is back, so a missed invalidation can never be served. A value read from Redis is not stored
+locally if an invalidation of its key arrived during the read: invalidations are counted per bucket of key hashes
+(GENERATION_BUCKETS), so a write of one key does not discard the concurrent fills of the others. LOCAL_TIMEOUT bounds
+the staleness in any remaining race.
+
+Other keys (counters, locks, sorted sets...) go straight to Redis, as with RedisCache.
+Hits and misses of both tiers, evictions and the size of the local tier are reported by metrics() (per process).
+"""
+
+logger = logging.getLogger(__name__)
+
+MISSING = object()
+METRICS = ('local_hits', 'local_misses', 'redis_hits', 'redis_misses', 'evictions', 'invalidations')
+CLEAR_ALL = '*'
+GENERATION_BUCKETS = 4096
+
+
+class LocalTier:
+    """
+    The in-process tier of a TieredRedisCache: an LRU of pickled values with a per-entry expiry, shared by all the
+    threads of the process, and the thread listening to the invalidation channel.
+    """
+
+    def __init__(self, max_entries, max_bytes, timeout):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.timeout = timeout
+        self.node_id = uuid.uuid4().hex
+        self.entries = OrderedDict()  # key -> (expiry, pickled value)
+        self.size = 0
+        self.generations = [0] * GENERATION_BUCKETS  # per bucket of key hashes, incremented by the invalidations
+        self.epoch = 0  # incremented when every key is invalidated
+        self.counters = dict.fromkeys(METRICS, 0)
+        self.lock = threading.Lock()
+        self.listening = threading.Event()
+
+    def get(self, key):
+        """Return the pickled value of key, or MISSING."""
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.counters['local_misses'] += 1
+                return MISSING
+            if entry[0] <= time.monotonic():
+                self.drop(key)
+                self.counters['local_misses'] += 1
+                return MISSING
+            self.entries.move_to_end(key)
+            self.counters['local_hits'] += 1
+            return entry[1]
+
+    def generation(self, key):
+        """Return the invalidation generation of key, read before the value is read from Redis (see put())."""
+        with self.lock:
+            return self.current_generation(key)
+
+    def current_generation(self, key):
+        """Return the invalidation generation of key (the lock must be held)."""
+        return self.epoch, self.generations[hash(key) % GENERATION_BUCKETS]
+
+    def put(self, key, data, generation):
+        """
+        Store the pickled value of key, unless an invalidation of key (or of its hash bucket) arrived since
+        `generation` was read (the value may be stale) or the value alone exceeds the memory cap. Least recently used
+        entries are evicted to fit the caps.
+        """
+        with self.lock:
+            if generation != self.current_generation(key) or len(data) > self.max_bytes:
+                return
+            self.drop(key)
+            self.entries[key] = (time.monotonic() + self.timeout, data)
+            self.size += len(data)
+            while len(self.entries) > self.max_entries or self.size > self.max_bytes:
+                self.drop(next(iter(self.entries)))
+                self.counters['evictions'] += 1
+
+    def drop(self, key):
+        """Remove key (the lock must be held)."""
+        entry = self.entries.pop(key, None)
+        if entry is not None:
+            self.size -= len(entry[1])
+
+    def invalidate(self, keys):
+        """Remove keys, or everything when keys is None."""
+        with self.lock:
+            self.counters['invalidations'] += 1
+            if keys is None:
+                self.epoch += 1
+                self.entries.clear()
+                self.size = 0
+            else:
+                for key in keys:
+                    self.generations[hash(key) % GENERATION_BUCKETS] += 1
+                    self.drop(key)
+
+    def count(self, name):
+        with self.lock:
+            self.counters[name] += 1
+
+    def message(self, keys):
+        """Return the invalidation message of keys (made keys, or CLEAR_ALL) sent by this tier."""
+        return '\n'.join([self.node_id, *keys])
+
+    def listen(self, backend, channel):
+        """
+        Subscribe to the invalidation channel and evict the keys received from the other processes (this one evicts
+        its own keys before publishing them), forever (run in a daemon thread).
+        The tier is cleared and disabled whenever the subscription is lost, then re-enabled once it is back.
+        """
+        while True:
+            try:
+                pubsub = backend._cache.get_client(write=False).pubsub()
+                pubsub.subscribe(channel)
+                for message in pubsub.listen():
+                    if message['type'] == 'subscribe':
+                        self.invalidate(None)
+                        self.listening.set()
+                    elif message['type'] == 'message':
+                        node_id, *keys = message['data'].decode().split('\n')
+                        if node_id != self.node_id:
+                            self.invalidate(None if keys == [CLEAR_ALL] else keys)
+            except Exception as e:  # the listener must survive anything the connection throws
+                logger.error(f"Cache invalidation listener on {channel} stopped: {e}")
+            self.listening.clear()
+            self.invalidate(None)
+            time.sleep(1)
+
+
+_tiers = {}
+_tiers_lock = threading.Lock()
+
+
+def get_local_tier(backend):
+    """
+    Return the local tier of the process for the cache configured like backend, starting its listener on first use
+    (and again in a forked child, which does not inherit the thread).
+    """
+    key = (tuple(backend._servers), backend.invalidation_channel, os.getpid())
+    tier = _tiers.get(key)
+    if tier is None:
+        with _tiers_lock:
+            tier = _tiers.get(key)
+            if tier is None:
+                tier = LocalTier(backend.local_max_entries, backend.local_max_bytes, backend.local_timeout)
+                threading.Thread(target=tier.listen, args=(backend, backend.invalidation_channel), daemon=True,
+                                 name='cache-invalidation').start()
+                _tiers[key] = tier
+    return tier
+
+
+class TieredRedisCache(RedisCache):
+    """
+    Redis cache backend with an in-process LRU tier for the keys of OPTIONS['LOCAL_KEY_PREFIXES'], invalidated
+    across processes with Redis pub/sub. See the module documentation for the options.
+    """
+
+    def __init__(self, server, params):
+        options = dict(params.get('OPTIONS', {}))
+        self.local_key_prefixes = tuple(options.pop('LOCAL_KEY_PREFIXES', ()))
+        self.local_max_entries = options.pop('LOCAL_MAX_ENTRIES', 10000)
+        self.local_max_bytes = options.pop('LOCAL_MAX_BYTES', 32 * 1024 * 1024)
+        self.local_timeout = options.pop('LOCAL_TIMEOUT', 5)
+        channel = options.pop('INVALIDATION_CHANNEL', None)
+        super().__init__(server, {**params, 'OPTIONS': options})
+        self.invalidation_channel = channel or self.make_key('cache:invalidate')
+
+    def local_tier(self, key):
+        """Return the local tier if key (not yet prefixed) is kept locally and the tier is usable, else None."""
+        if not key.startswith(self.local_key_prefixes):
+            return None
+        tier = get_local_tier(self)
+        return tier if tier.listening.is_set() else None
+
+    def invalidate(self, keys):
+        """Evict local keys (made keys) from this process and publish them to the other processes."""
+        if not keys:
+            return
+        tier = get_local_tier(self)
+        tier.invalidate(keys)
+        try:
+            self._cache.get_client(write=True).publish(self.invalidation_channel, tier.message(keys))
+        except RedisError as e:
+            logger.error(f"Failed to publish the invalidation of {len(keys)} cache keys: {e}")
+
+    def local_keys(self, keys, version=None):
+        """Return the made keys of the given keys that are kept locally."""
+        return [self.make_and_validate_key(key, version=version) for key in keys
+                if key.startswith(self.local_key_prefixes)] if self.local_key_prefixes else []
+
+    def count_redis(self, found):
+        if self.local_key_prefixes:
+            get_local_tier(self).count('redis_hits' if found else 'redis_misses')
+
+    def get(self, key, default=None, version=None):
+        tier = self.local_tier(key)
+        made_key = self.make_and_validate_key(key, version=version)
+        if tier is not None:
+            data = tier.get(made_key)
+            if data is not MISSING:
+                return pickle.loads(data)
+            generation = tier.generation(made_key)
+        value = self._cache.get(made_key, MISSING)
+        self.count_redis(value is not MISSING)
+        if value is MISSING:
+            return default
+        if tier is not None:
+            tier.put(made_key, pickle.dumps(value, pickle.HIGHEST_PROTOCOL), generation)
+        return value
+
+    def get_many(self, keys, version=None):
+        found = {}
+        remote = {}
+        generations = {}
+        for key in keys:
+            tier = self.local_tier(key)
+            made_key = self.make_and_validate_key(key, version=version)
+            if tier is not None:
+                data = tier.get(made_key)
+                if data is not MISSING:
+                    found[key] = pickle.loads(data)
+                    continue
+                generations[made_key] = (tier, tier.generation(made_key))
+            remote[made_key] = key
+        if remote:
+            values = self._cache.get_many(remote.keys())
+            for made_key, key in remote.items():
+                self.count_redis(made_key in values)
+                if made_key not in values:
+                    continue
+                found[key] = values[made_key]
+                if made_key in generations:
+                    tier, generation = generations[made_key]
+                    tier.put(made_key, pickle.dumps(values[made_key], pickle.HIGHEST_PROTOCOL), generation)
+        return found
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        super().set(key, value, timeout, version)
+        self.invalidate(self.local_keys([key], version))
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        added = super().add(key, value, timeout, version)
+        if added:
+            self.invalidate(self.local_keys([key], version))
+        return added
+
+    def delete(self, key, version=None):
+        deleted = super().delete(key, version)
+        self.invalidate(self.local_keys([key], version))
+        return deleted
+
+    def incr(self, key, delta=1, version=None):
+        value = super().incr(key, delta, version)
+        self.invalidate(self.local_keys([key], version))
+        return value
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        failed = super().set_many(data, timeout, version)
+        self.invalidate(self.local_keys(data, version))
+        return failed
+
+    def delete_many(self, keys, version=None):
+        super().delete_many(keys, version)
+        self.invalidate(self.local_keys(keys, version))
+
+    def clear(self):
+        cleared = super().clear()
+        if self.local_key_prefixes:
+            tier = get_local_tier(self)
+            tier.invalidate(None)
+            try:
+                self._cache.get_client(write=True).publish(self.invalidation_channel, tier.message([CLEAR_ALL]))
+            except RedisError as e:
+                logger.error(f"Failed to publish the cache clear: {e}")
+        return cleared
+
+    def metrics(self):
+        """
+        Return the hit / miss counters of both tiers in this process, the number of evictions (memory cap) and of
+        invalidations received, and the number of entries and bytes held by the local tier.
+        """
+        tier = get_local_tier(self)
+        with tier.lock:
+            return {**tier.counters, 'entries': len(tier.entries), 'bytes': tier.size,
+                    'listening': tier.listening.is_set()}
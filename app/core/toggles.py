@@ -0,0 +1,169 @@
+from django.db import connections, router, transaction
+from django.db.models.signals import post_delete, post_save
+
+"""
+Single-statement, race-free toggles for "membership" rows such as likes and follows.
+
+A toggle used to be `filter(...).exists()` followed by `create()` or `delete()`: two or three round trips, and two
+concurrent requests (a double click) could both see "missing" and the second INSERT failed on the unique constraint.
+Here each change is one statement that relies on the unique constraint instead of racing against it:
+- INSERT ... ON CONFLICT DO NOTHING RETURNING ... (a row is returned only if this statement inserted it),
+- DELETE ... RETURNING ... (the rows returned are exactly the rows this statement deleted).
+post_save / post_delete are sent for the rows that were actually inserted or deleted, in the same transaction as the
+statement, so receivers such as the denormalized counters run once per real change and never for a no-op.
+
+Both statements are supported by PostgreSQL and SQLite (3.35+).
+
+toggle_row is a single statement too on PostgreSQL: the DELETE and the INSERT are data-modifying CTEs of one query
+(WITH d AS (DELETE ... RETURNING ...), i AS (INSERT ... SELECT ... WHERE NOT EXISTS (SELECT 1 FROM d ...) ON CONFLICT
+DO NOTHING RETURNING ...) SELECT the rows of d and i), one round trip per like. SQLite does not allow DELETE or INSERT
+inside WITH, so there (tests, local development) it runs the two statements one after the other, in one transaction.
+"""
+
+
+def _returning(model, connection):
+    """Return the concrete fields of model and the quoted column list used in RETURNING."""
+    fields = model._meta.concrete_fields
+    return fields, ', '.join(connection.ops.quote_name(field.column) for field in fields)
+
+
+def _from_rows(model, using, fields, rows):
+    """Build model instances from rows returned in the column order of fields."""
+    connection = connections[using]
+    columns = [field.get_col(model._meta.db_table) for field in fields]
+    converters = [connection.ops.get_db_converters(column) + column.get_db_converters(connection)
+                  for column in columns]
+    converted = []
+    for row in rows:
+        values = []
+        for column, column_converters, value in zip(columns, converters, row):
+            for converter in column_converters:
+                value = converter(value, column, connection)
+            values.append(value)
+        converted.append(model.from_db(using, [field.attname for field in fields], values))
+    return converted
+
+
+def _insert_values(model, connection, values):
+    """Return the inserted fields of a row built from values, and their database values."""
+    instance = model(**values)
+    fields = [field for field in model._meta.local_concrete_fields if not field.primary_key or
+              getattr(instance, field.attname) is not None]
+    return fields, [field.get_db_prep_save(field.pre_save(instance, True), connection) for field in fields]
+
+
+def _where(model, connection, lookup, table=None):
+    """Return the `column = %s AND ...` condition matching the exact field values in lookup, and its parameters."""
+    instance = model(**lookup)
+    prefix = f'{table}.' if table else ''
+    where = []
+    params = []
+    for name in lookup:
+        field = model._meta.get_field(name)
+        where.append(f'{prefix}{connection.ops.quote_name(field.column)} = %s')
+        params.append(field.get_db_prep_value(getattr(instance, field.attname), connection))
+    return ' AND '.join(where), params
+
+
+def insert_ignore(model, **values):
+    """
+    Insert one row built from values unless it would violate a unique constraint.
+    Returns the inserted instance, or None if an equal row already existed. Sends post_save when a row is inserted.
+    """
+    using = router.db_for_write(model)
+    connection = connections[using]
+    fields, params = _insert_values(model, connection, values)
+    returned_fields, returning = _returning(model, connection)
+    sql = (f'INSERT INTO {connection.ops.quote_name(model._meta.db_table)} '
+           f'({", ".join(connection.ops.quote_name(field.column) for field in fields)}) '
+           f'VALUES ({", ".join(["%s"] * len(fields))}) ON CONFLICT DO NOTHING RETURNING {returning}')
+    with transaction.atomic(using=using):
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            rows = cursor.fetchall()
+        if not rows:
+            return None
+        instance = _from_rows(model, using, returned_fields, rows)[0]
+        post_save.send(sender=model, instance=instance, created=True, update_fields=None, raw=False, using=using)
+    return instance
+
+
+def delete_returning(model, **lookup):
+    """
+    Delete the rows matching the exact field values in lookup and return them as instances.
+    Sends post_delete for every deleted row. Cascades are left to the database constraints, so only use it for
+    models that nothing else references (likes, votes, follows).
+    """
+    using = router.db_for_write(model)
+    connection = connections[using]
+    where, params = _where(model, connection, lookup)
+    returned_fields, returning = _returning(model, connection)
+    sql = f'DELETE FROM {connection.ops.quote_name(model._meta.db_table)} WHERE {where} RETURNING {returning}'
+    with transaction.atomic(using=using):
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            rows = cursor.fetchall()
+        deleted = _from_rows(model, using, returned_fields, rows)
+        for row in deleted:
+            post_delete.send(sender=model, instance=row, using=using, origin=row)
+    return deleted
+
+
+def set_row(model, present, defaults=None, **lookup):
+    """
+    Idempotently make the row identified by lookup exist (present=True) or not exist (present=False).
+    defaults are extra values used when inserting. Returns True if the database was changed.
+    """
+    if present:
+        return insert_ignore(model, **lookup, **(defaults or {})) is not None
+    return bool(delete_returning(model, **lookup))
+
+
+def toggle_row(model, defaults=None, **lookup):
+    """
+    Delete the row identified by lookup if it exists, otherwise insert it. Returns True if the row now exists.
+
+    A deleted row only counts as "was present" if it also matched defaults (e.g. a Relation with is_follow=False
+    is replaced by a real follow). If a concurrent request inserted the row first, the row still exists and True is
+    returned, so a double click never fails.
+    """
+    defaults = defaults or {}
+    if connections[router.db_for_write(model)].vendor == 'postgresql':
+        return _toggle_row_statement(model, defaults, lookup)
+    deleted = delete_returning(model, **lookup)
+    if any(all(getattr(row, name) == value for name, value in defaults.items()) for row in deleted):
+        return False
+    insert_ignore(model, **lookup, **defaults)
+    return True
+
+
+def _toggle_row_statement(model, defaults, lookup):
+    """
+    toggle_row as one PostgreSQL statement. The DELETE runs first: the INSERT only reads d in its WHERE, and a row
+    deleted by the statement no longer conflicts with the row it inserts (a Relation replaced by a real follow).
+    Sends post_delete for the deleted row and post_save for the inserted one.
+    """
+    using = router.db_for_write(model)
+    connection = connections[using]
+    table = connection.ops.quote_name(model._meta.db_table)
+    where, where_params = _where(model, connection, lookup)
+    present, present_params = _where(model, connection, defaults, table='d') if defaults else ('TRUE', [])
+    fields, values = _insert_values(model, connection, {**lookup, **defaults})
+    returned_fields, returning = _returning(model, connection)
+    columns = ', '.join(connection.ops.quote_name(field.column) for field in fields)
+    casts = ', '.join(f'CAST(%s AS {field.cast_db_type(connection)})' for field in fields)
+    sql = (f'WITH d AS (DELETE FROM {table} WHERE {where} RETURNING {returning}), '
+           f'i AS (INSERT INTO {table} ({columns}) SELECT {casts} WHERE NOT EXISTS (SELECT 1 FROM d WHERE {present}) '
+           f'ON CONFLICT DO NOTHING RETURNING {returning}) '
+           f'SELECT FALSE, * FROM d UNION ALL SELECT TRUE, * FROM i')
+    with transaction.atomic(using=using):
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [*where_params, *values, *present_params])
+            rows = cursor.fetchall()
+        deleted = _from_rows(model, using, returned_fields, [row[1:] for row in rows if not row[0]])
+        inserted = _from_rows(model, using, returned_fields, [row[1:] for row in rows if row[0]])
+        for row in deleted:
+            post_delete.send(sender=model, instance=row, using=using, origin=row)
+        for row in inserted:
+            post_save.send(sender=model, instance=row, created=True, update_fields=None, raw=False, using=using)
+    return not any(all(getattr(row, name) == value for name, value in defaults.items()) for row in deleted)
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Post, Comment, Vote, Image, CommentLike
+from .models import Post, Comment, Vote, Image, CommentLike, Hashtag
 
 
 class VoteInline(admin.TabularInline):
@@ -110,7 +110,8 @@ class CommentAdmin(admin.ModelAdmin):
     Specifies the display options for the Comment model in the admin interface, including the fields to be
         displayed in the list view, filters, search fields, ordering, and row ID fields.
     """
-    list_display = ('owner', 'post', 'create_time', 'is_reply')
+    list_display = ('owner', 'post', 'create_time', 'is_reply', 'like_count')
+    readonly_fields = ('like_count',)
     list_filter = ('owner', 'post')
     search_fields = ['owner', 'post']
     ordering = ('-update_time', '-create_time')
@@ -137,7 +138,8 @@ class PostAdmin(admin.ModelAdmin):
      in the list view, filters, search fields, ordering, and row ID fields.
     Includes inline options for displaying comments and votes related to each post.
     """
-    list_display = ('owner', 'title', 'update_time')
+    list_display = ('owner', 'title', 'update_time', 'like_count', 'comment_count')
+    readonly_fields = ('like_count', 'comment_count')
     list_filter = ('owner', 'title')
     search_fields = ['owner', 'update_time']
     ordering = ('-update_time',)
@@ -154,3 +156,16 @@ class PostAdmin(admin.ModelAdmin):
         if not obj:
             return list()
         return super(PostAdmin, self).get_inline_instances(request, obj)
+
+
+@admin.register(Hashtag)
+class HashtagAdmin(admin.ModelAdmin):
+    """
+    Registers the Hashtag model with the admin interface.
+    Specifies the display options for the Hashtag model in the admin interface, including the fields to be displayed
+        in the list view, search fields and ordering; the post count is maintained by app.post.hashtags.
+    """
+    list_display = ('name', 'post_count', 'create_time')
+    readonly_fields = ('post_count',)
+    search_fields = ['name']
+    ordering = ('-post_count',)
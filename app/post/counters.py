@@ -0,0 +1,89 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.db.models import Count, F, IntegerField, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce, Greatest
+
+from app.account.models import Relation, UserStats
+from app.post.models import Post, Comment, Vote, CommentLike, Hashtag, PostHashtag
+
+"""
+Denormalized counters: Post.like_count, Post.comment_count, Comment.like_count, Hashtag.post_count and the UserStats
+counters.
+
+Counters are adjusted with a single UPDATE ... SET col = col + delta so concurrent writers never lose updates.
+Callers run the adjustment in the same transaction as the Vote/Comment/CommentLike write it accounts for.
+reconcile_counters recomputes the counters from the source tables and repairs any drift.
+Bulk writers (e.g. the like buffer flush) wrap their writes in suspend_counters() and apply one summed delta instead.
+"""
+
+counters_suspended = ContextVar('counters_suspended', default=False)
+
+COUNTERS = {
+    # model: {counter field: (source queryset, foreign key to the model)}
+    Post: {
+        'like_count': (Vote.objects.all(), 'post'),
+        'comment_count': (Comment.objects.all(), 'post'),
+    },
+    Comment: {
+        'like_count': (CommentLike.objects.all(), 'comment'),
+    },
+    Hashtag: {
+        'post_count': (PostHashtag.objects.all(), 'hashtag'),
+    },
+    UserStats: {
+        'post_count': (Post.objects.all(), 'owner__user'),
+        'followers_count': (Relation.objects.filter(is_follow=True), 'following'),
+        'following_count': (Relation.objects.filter(is_follow=True), 'followers'),
+    },
+}
+
+
+def count_subquery(queryset, field):
+    """
+    Return a correlated subquery counting the rows of queryset whose `field` points at the outer row.
+    Unlike Count() over joins, several of these can be combined without multiplying rows.
+    """
+    counts = queryset.filter(**{field: OuterRef('pk')}).order_by().values(field).annotate(
+        total=Count('*')).values('total')
+    return Coalesce(Subquery(counts, output_field=IntegerField()), Value(0))
+
+
+@contextmanager
+def suspend_counters():
+    """
+    Stop the signal receivers from adjusting counters inside the block; the caller applies the delta itself.
+    """
+    token = counters_suspended.set(True)
+    try:
+        yield
+    finally:
+        counters_suspended.reset(token)
+
+
+def adjust_counter(model, pk, field, delta):
+    """
+    Atomically add delta to a counter column of one row (hidden and soft-deleted rows included).
+    The counter never goes below zero. Does nothing inside suspend_counters().
+    """
+    if counters_suspended.get():
+        return 0
+    return model._base_manager.filter(pk=pk).update(**{field: Greatest(F(field) + delta, Value(0))})
+
+
+def reconcile_counters(model, start_pk, end_pk):
+    """
+    Recompute the counters of the rows of model with start_pk <= pk < end_pk and fix the ones that drifted.
+    Returns the number of rows repaired.
+    """
+    counters = COUNTERS[model]
+    actual = {f'actual_{field}': count_subquery(source, fk) for field, (source, fk) in counters.items()}
+    drifted = Q()
+    for field in counters:
+        drifted |= ~Q(**{field: F(f'actual_{field}')})
+    rows = list(model._base_manager.filter(pk__gte=start_pk, pk__lt=end_pk).annotate(**actual).filter(drifted))
+    for row in rows:
+        for field in counters:
+            setattr(row, field, getattr(row, f'actual_{field}'))
+    model._base_manager.bulk_update(rows, list(counters))
+    return len(rows)
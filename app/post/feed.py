@@ -0,0 +1,292 @@
+import heapq
+import logging
+from itertools import islice
+
+from django.conf import settings
+from django.db.models import Q
+from redis.exceptions import RedisError
+
+from app.account.models import Relation, UserStats
+from app.core.cache import get_redis_client, make_redis_key
+from app.post.loaders import post_card_queryset
+from app.post.models import Post
+
+"""
+Home timeline built with hybrid fan-out (push for regular accounts, pull for high-follower accounts).
+
+Every user has a capped Redis sorted set `timeline:<user_id>` holding the ids of the most recent posts of the
+accounts they follow (and their own), scored by the post creation timestamp.
+- When a post is created its id is pushed into the timeline of the owner and of every follower (fan_out_post).
+- Accounts with more followers than settings.FEED_FANOUT_FOLLOWER_THRESHOLD (the denormalized
+  UserStats.followers_count) are not fanned out. Their posts go into a capped per-author sorted set
+  `author_posts:<user_id>` and the author is added to the `feed:high_follower` set. Readers merge those lists into
+  their own timeline at read time with a k-way merge on the creation timestamp, so the write cost of a post is
+  bounded by the threshold instead of the follower count.
+- When an author falls back under the threshold, the timelines of their followers are dropped (once, on the first
+  post after the change): the posts of the pull period were never pushed into them, and the rebuild from the
+  database brings them back.
+- Reading a page is one pipelined round of ZREVRANGE calls plus one batched Post query (get_timeline_posts).
+- Timelines that are cold or were evicted are rebuilt from the Relation graph (rebuild_timeline), either lazily on
+  the first read or up front with `manage.py rebuild_timelines`.
+
+Each sorted set holds a sentinel member with score -inf so that an existing key always means "warm", even for users
+that follow nobody. Fan-out only touches warm timelines; cold ones are rebuilt from the database when read.
+"""
+
+logger = logging.getLogger(__name__)
+
+TIMELINE_SENTINEL = '0'  # Post ids start at 1, so '0' never collides with a real post.
+
+# Push a post id into a sorted set only if that set is warm, then trim it to the size passed in ARGV[3].
+# Rank 0 is always the sentinel, so trimming starts at rank 1.
+PUSH_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 1 then
+    redis.call('ZADD', KEYS[1], ARGV[1], ARGV[2])
+    redis.call('ZREMRANGEBYRANK', KEYS[1], 1, -(tonumber(ARGV[3]) + 1))
+    return 1
+end
+return 0
+"""
+
+
+def timeline_key(user_id):
+    """Return the Redis key of the home timeline of the given user."""
+    return make_redis_key(f'timeline:{user_id}')
+
+
+def author_posts_key(user_id):
+    """Return the Redis key of the recent-posts list of a high-follower author."""
+    return make_redis_key(f'author_posts:{user_id}')
+
+
+def high_follower_key():
+    """Return the Redis key of the set of authors whose posts are pulled at read time."""
+    return make_redis_key('feed:high_follower')
+
+
+def post_score(post):
+    """Return the sorted-set score of a post (its creation timestamp)."""
+    return post.create_time.timestamp()
+
+
+def followers_count(user_id):
+    """Return the number of followers of a user (the denormalized UserStats counter, one primary key lookup)."""
+    return UserStats.objects.filter(user_id=user_id).values_list('followers_count', flat=True).first() or 0
+
+
+def follower_ids(user_id):
+    """Return the ids of the followers of a user, streamed from the database in FEED_FANOUT_BATCH_SIZE chunks."""
+    return Relation.objects.filter(
+        following_id=user_id, is_follow=True
+    ).values_list('followers_id', flat=True).iterator(chunk_size=settings.FEED_FANOUT_BATCH_SIZE)
+
+
+def timeline_queryset(user_id, exclude_user_ids=()):
+    """
+    Return the database query equivalent to a user's timeline: active posts of followed accounts and the user's own
+    posts, newest first. Posts of the accounts in exclude_user_ids are left out (they are merged at read time).
+    """
+    following_ids = Relation.objects.filter(followers_id=user_id, is_follow=True).values('following_id')
+    posts = Post.objects.filter(Q(owner__user_id__in=following_ids) | Q(owner__user_id=user_id))
+    if exclude_user_ids:
+        posts = posts.exclude(Q(owner__user_id__in=exclude_user_ids) & ~Q(owner__user_id=user_id))
+    return posts.order_by('-create_time', '-id')
+
+
+def store_sorted_posts(client, key, rows, ttl):
+    """
+    Replace the sorted set at key with the given (post_id, create_time) rows plus the sentinel.
+    """
+    mapping = {TIMELINE_SENTINEL: float('-inf')}
+    mapping.update({str(post_id): create_time.timestamp() for post_id, create_time in rows})
+    pipe = client.pipeline(transaction=True)
+    pipe.delete(key)
+    pipe.zadd(key, mapping)
+    pipe.expire(key, ttl)
+    pipe.execute()
+
+
+def get_high_follower_ids(client):
+    """Return the ids of the authors that are currently not fanned out."""
+    return [int(member) for member in client.smembers(high_follower_key())]
+
+
+def rebuild_timeline(user_id, client=None):
+    """
+    Rebuild the timeline of a user from the Relation graph and return the number of posts stored.
+    Posts of high-follower authors are not stored; they are merged in when the timeline is read.
+    """
+    client = client or get_redis_client()
+    if client is None:
+        return 0
+    rows = list(timeline_queryset(user_id, get_high_follower_ids(client)).values_list(
+        'id', 'create_time')[:settings.FEED_TIMELINE_SIZE])
+    store_sorted_posts(client, timeline_key(user_id), rows, settings.FEED_TIMELINE_TTL)
+    return len(rows)
+
+
+def rebuild_author_posts(user_id, client):
+    """
+    Rebuild the recent-posts list of a high-follower author from the database and return the number of posts stored.
+    """
+    rows = list(Post.objects.filter(owner__user_id=user_id).order_by('-create_time', '-id').values_list(
+        'id', 'create_time')[:settings.FEED_AUTHOR_POSTS_SIZE])
+    store_sorted_posts(client, author_posts_key(user_id), rows, settings.FEED_TIMELINE_TTL)
+    return len(rows)
+
+
+def drop_timeline(user_id):
+    """
+    Evict the timeline of a user so that it is rebuilt on the next read (e.g. after a follow or unfollow).
+    """
+    client = get_redis_client()
+    if client is None:
+        return
+    try:
+        client.delete(timeline_key(user_id))
+    except RedisError as e:
+        logger.error(f"Failed to drop timeline of user {user_id}: {e}")
+
+
+def drop_timelines(client, user_ids):
+    """Evict the timelines of all users yielded by user_ids, one multi-key DEL per batch."""
+    user_ids = iter(user_ids)
+    while True:
+        batch = list(islice(user_ids, settings.FEED_FANOUT_BATCH_SIZE))
+        if not batch:
+            break
+        client.delete(*[timeline_key(user_id) for user_id in batch])
+
+
+def fan_out_post(post, threshold=None):
+    """
+    Distribute a newly created post and return the number of sorted sets it was pushed into.
+
+    Regular authors: the post is pushed into the timeline of its owner and of every follower, streamed from the
+    database and written in pipelined batches.
+    High-follower authors (more than `threshold` followers, settings.FEED_FANOUT_FOLLOWER_THRESHOLD by default):
+    the post is pushed only into the owner's timeline and the author's recent-posts list.
+    An author leaving pull mode has the timelines of their followers dropped first, see the module documentation.
+    """
+    client = get_redis_client()
+    if client is None:
+        return 0
+    threshold = settings.FEED_FANOUT_FOLLOWER_THRESHOLD if threshold is None else threshold
+    owner_user_id = post.owner.user_id
+    try:
+        if followers_count(owner_user_id) > threshold:
+            client.sadd(high_follower_key(), owner_user_id)
+            if not client.exists(author_posts_key(owner_user_id)):
+                rebuild_author_posts(owner_user_id, client)
+            push = client.register_script(PUSH_SCRIPT)
+            push(keys=[author_posts_key(owner_user_id)],
+                 args=[post_score(post), post.pk, settings.FEED_AUTHOR_POSTS_SIZE])
+            return 1 + push_to_timelines(client, post, [owner_user_id])
+        if client.srem(high_follower_key(), owner_user_id):
+            drop_timelines(client, follower_ids(owner_user_id))
+    except RedisError as e:
+        logger.error(f"Fan-out of post {post.pk} failed: {e}")
+        return 0
+    return push_to_timelines(client, post, [owner_user_id], follower_ids(owner_user_id))
+
+
+def push_to_timelines(client, post, *user_id_streams):
+    """
+    Push a post into the timelines of all users yielded by the given iterables, one pipeline per batch.
+    """
+    push = client.register_script(PUSH_SCRIPT)
+    score = post_score(post)
+    pushed = 0
+    user_ids = (user_id for stream in user_id_streams for user_id in stream)
+    try:
+        while True:
+            batch = list(islice(user_ids, settings.FEED_FANOUT_BATCH_SIZE))
+            if not batch:
+                break
+            pipe = client.pipeline(transaction=False)
+            for user_id in batch:
+                push(keys=[timeline_key(user_id)], args=[score, post.pk, settings.FEED_TIMELINE_SIZE], client=pipe)
+            pushed += sum(pipe.execute())
+    except RedisError as e:
+        logger.error(f"Fan-out of post {post.pk} stopped after {pushed} timelines: {e}")
+    return pushed
+
+
+def followed_high_follower_ids(client, user_id):
+    """Return the ids of the high-follower authors followed by a user (one indexed Relation query)."""
+    high_follower_ids = get_high_follower_ids(client)
+    if not high_follower_ids:
+        return []
+    return list(Relation.objects.filter(
+        followers_id=user_id, following_id__in=high_follower_ids, is_follow=True
+    ).values_list('following_id', flat=True))
+
+
+def merge_timelines(streams, offset, limit):
+    """
+    K-way merge of sorted sets read newest first as (member, score) pairs and return one page of post ids.
+    Sentinels and duplicates (posts fanned out before their author crossed the threshold) are skipped.
+    """
+    merged = heapq.merge(*streams, key=lambda member_score: -member_score[1])
+    seen = set()
+    post_ids = []
+    for member, _ in merged:
+        post_id = int(member)
+        if post_id == int(TIMELINE_SENTINEL) or post_id in seen:
+            continue
+        seen.add(post_id)
+        post_ids.append(post_id)
+        if len(post_ids) == offset + limit:
+            break
+    return post_ids[offset:]
+
+
+def get_timeline_ids(user_id, offset, limit):
+    """
+    Return the ids of one page of a user's timeline, rebuilding cold sorted sets first.
+    The recent-posts lists of followed high-follower authors are merged in by creation time.
+    Returns None when Redis is not available.
+    """
+    client = get_redis_client()
+    if client is None:
+        return None
+    key = timeline_key(user_id)
+    try:
+        if not client.exists(key):
+            rebuild_timeline(user_id, client)
+        author_ids = followed_high_follower_ids(client, user_id)
+        if not author_ids:
+            members = client.zrevrange(key, offset, offset + limit - 1)
+            client.expire(key, settings.FEED_TIMELINE_TTL)
+            return [int(member) for member in members if member.decode() != TIMELINE_SENTINEL]
+
+        author_keys = [author_posts_key(author_id) for author_id in author_ids]
+        pipe = client.pipeline(transaction=False)
+        for author_key in author_keys:
+            pipe.exists(author_key)
+        for author_id, exists in zip(author_ids, pipe.execute()):
+            if not exists:
+                rebuild_author_posts(author_id, client)
+        pipe = client.pipeline(transaction=False)
+        for stream_key in [key, *author_keys]:
+            pipe.zrevrange(stream_key, 0, offset + limit - 1, withscores=True)
+        streams = pipe.execute()
+        client.expire(key, settings.FEED_TIMELINE_TTL)
+    except RedisError as e:
+        logger.error(f"Failed to read timeline of user {user_id}: {e}")
+        return None
+    return merge_timelines(streams, offset, limit)
+
+
+def get_timeline_posts(user_id, page=1, page_size=None):
+    """
+    Return the posts of one page of a user's home timeline, newest first.
+    Falls back to querying the database directly when Redis is not available.
+    """
+    page_size = page_size or settings.FEED_PAGE_SIZE
+    offset = (max(page, 1) - 1) * page_size
+    post_ids = get_timeline_ids(user_id, offset, page_size)
+    if post_ids is None:
+        return list(post_card_queryset(timeline_queryset(user_id))[offset:offset + page_size])
+    posts_by_id = post_card_queryset().in_bulk(post_ids)
+    return [posts_by_id[post_id] for post_id in post_ids if post_id in posts_by_id]
@@ -1,5 +1,6 @@
 from ckeditor.widgets import CKEditorWidget
 from django import forms
+from app.core.text import html_to_text, normalize_text
 from .models import Post, Comment
 
 
@@ -9,6 +10,15 @@ class SearchForm(forms.Form):
     """
     search = forms.CharField(label='Search', max_length=100)
 
+    def clean_search(self):
+        """
+        Normalizes the query the same way the search documents are (see app.core.text.normalize_text).
+        """
+        search = normalize_text(self.cleaned_data.get('search'))
+        if not search:
+            raise forms.ValidationError('Enter something to search for.')
+        return search
+
 
 class UpdatePostForm(forms.ModelForm):
     """
@@ -30,9 +40,10 @@ class UpdatePostForm(forms.ModelForm):
         Validates the body of the post.
         """
         body = self.cleaned_data.get('body')
-        if len(body) < 1:
+        length = len(html_to_text(body))  # the visible text, markup does not count
+        if length < 1:
             raise forms.ValidationError('Body must be at least 1 character long.')
-        elif len(body) > 500:
+        elif length > 500:
             raise forms.ValidationError('Body must be less than 500 characters long.')
         return body
 
@@ -75,13 +86,16 @@ class CreatCommentForm(forms.ModelForm):
         model = Comment
         fields = ('comments', 'reply', 'is_reply')
 
-    def clean_body(self):
+    def clean_comments(self):
         """
-        Validates the body of the comment.
+        Validates the text of the comment. The field is optional; a comment that is sent must have some text.
         """
-        body = self.cleaned_data.get('body')
-        if len(body) < 1:
-            raise forms.ValidationError('Body must be at least 1 character long.')
-        elif len(body) > 500:
-            raise forms.ValidationError('Body must be less than 500 characters long.')
-        return body
+        comments = self.cleaned_data.get('comments') or ''
+        if not comments:
+            return comments
+        length = len(html_to_text(comments))  # the visible text, markup does not count
+        if length < 1:
+            raise forms.ValidationError('Comment must be at least 1 character long.')
+        elif length > 500:
+            raise forms.ValidationError('Comment must be less than 500 characters long.')
+        return comments
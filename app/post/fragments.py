@@ -0,0 +1,91 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+"""
+Fragment cache for the rendered post cards (posts, explorer, hashtag and timeline pages).
+
+The part of a card that only depends on the post (images, title, excerpt, like and comment counts, owner) is cached
+under `post_card:<template>:<post_id>:<version>:<state>`, where the version of a post is a counter kept in the cache
+under `post_card:version:<post_id>` and the state a digest of what the card shows from the loaded row (update time,
+counters, images, see card_state). Saving or deleting the Post, one of its Images, Votes or Comments bumps the version
+after the transaction commits (see app.post.signals), so the next render misses and every older fragment is simply
+never read again: invalidation is one INCR per write, nothing is scanned or deleted. Writers that bypass the signals
+(soft deletes of comments, the like buffer flush) bump the version themselves.
+The versions are read after the page was loaded: a write that commits in between bumps the version while the card is
+rendered from the older row, but that card is stored under the state of the older row, which the next page (loaded
+after the write) does not have, so it is never served.
+
+A page of cards costs two cache round trips (get_many of the versions, get_many of the fragments) plus one set_many
+for the cards that missed and one add per missing version. Missing versions start from the current time in
+nanoseconds rather than 0, so a version that was evicted never comes back to a number an old fragment is stored
+under; they are created with add, so a bump landing at the same moment is never overwritten.
+
+Per-viewer parts (buttons with a CSRF token, "liked by you") are never cached: the card templates render them
+around the cached fragment (see app.post.templatetags.post_cards).
+Fragments also expire after settings.POST_CARD_CACHE_TIMEOUT seconds, which bounds how long a change of the owner
+profile (username, picture) takes to show.
+"""
+
+
+def version_key(post_id):
+    """Return the cache key of the card version of a post."""
+    return f'post_card:version:{post_id}'
+
+
+def fragment_key(template_name, post_id, version, state):
+    """Return the cache key of the card of a post rendered with template_name at a version and row state."""
+    return f'post_card:{template_name}:{post_id}:{version}:{state}'
+
+
+def card_state(post):
+    """Return a digest of the loaded columns and images a card shows (images are prefetched by post_card_queryset)."""
+    images = ','.join(f'{image.pk}:{image.images.name}' for image in post.images.all())
+    state = f'{post.update_time.isoformat()}|{post.like_count}|{post.comment_count}|{images}'
+    return hashlib.sha1(state.encode()).hexdigest()[:16]
+
+
+def get_card_versions(post_ids):
+    """Return {post_id: card version}, starting the versions that are missing."""
+    keys = {post_id: version_key(post_id) for post_id in post_ids}
+    found = cache.get_many(keys.values())
+    versions = {}
+    for post_id, key in keys.items():
+        if key in found:
+            versions[post_id] = found[key]
+        else:
+            version = time.time_ns()
+            versions[post_id] = version if cache.add(key, version, None) else cache.get(key, version)
+    return versions
+
+
+def bump_card_versions(post_ids):
+    """Make the cached cards of the given posts stale."""
+    for post_id in post_ids:
+        try:
+            cache.incr(version_key(post_id))
+        except ValueError:
+            cache.set(version_key(post_id), time.time_ns(), None)
+
+
+def render_post_cards(posts, template_name):
+    """
+    Return [(post, html)] for posts, html being template_name rendered with `post`, taken from the fragment cache
+    when the post has not changed since it was cached.
+    """
+    posts = list(posts)
+    versions = get_card_versions([post.pk for post in posts])
+    keys = {post.pk: fragment_key(template_name, post.pk, versions[post.pk], card_state(post)) for post in posts}
+    fragments = cache.get_many(keys.values())
+    rendered = {}
+    for post in posts:
+        if keys[post.pk] not in fragments:
+            rendered[keys[post.pk]] = render_to_string(template_name, {'post': post})
+    if rendered:
+        cache.set_many(rendered, settings.POST_CARD_CACHE_TIMEOUT)
+        fragments.update(rendered)
+    return [(post, mark_safe(fragments[keys[post.pk]])) for post in posts]
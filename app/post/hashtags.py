@@ -0,0 +1,78 @@
+import re
+
+from django.db import transaction
+from django.db.models import F
+
+from app.core.text import normalize_text
+from app.post.models import Hashtag, Post, PostHashtag
+from app.post.trending import TAG_WEIGHT, record_events
+
+"""
+Hashtags: `#tags` of the title and body of a post, extracted when the post is saved.
+
+The tags of a post are kept in PostHashtag (hashtag -> post, with the post creation time), the inverted index used by
+the tag pages: the newest posts of a tag are one range scan of the (hashtag, create_time, post) index instead of a
+trigram search over every post. Hashtag.post_count is adjusted in the same transaction as the PostHashtag rows
+(increments here, decrements by the PostHashtag post_delete receiver, which also covers cascades).
+"""
+
+# A tag starts after whitespace or at the start of the text and is made of letters (any script), digits and '_';
+# the zero-width non-joiner, tatweel and diacritics of Persian words are kept and dropped by the normalization, so
+# `#کتاب‌خوانی` and `#کتابخوانی` are the same tag. URL fragments (`page#top`) are not tags.
+HASHTAG_PATTERN = re.compile(r'(?:^|(?<=\s))#([\w\u200c\u200d\u0640\u064b-\u0655\u0670]+)')
+HASHTAG_MAX_LENGTH = 100
+
+
+def normalize_hashtag(name):
+    """Return the stored form of a tag name: normalized (see app.core.text.normalize_text) and without spaces."""
+    return normalize_text(name).replace(' ', '')[:HASHTAG_MAX_LENGTH]
+
+
+def extract_hashtags(*texts):
+    """Return the set of normalized tag names found in texts."""
+    names = set()
+    for text in texts:
+        for match in HASHTAG_PATTERN.finditer(text or ''):
+            name = normalize_hashtag(match.group(1))
+            if name:
+                names.add(name)
+    return names
+
+
+def get_hashtag_ids(names):
+    """Return {name: id} for names, creating the missing Hashtag rows (concurrent creators are ignored)."""
+    if not names:
+        return {}
+    Hashtag.objects.bulk_create([Hashtag(name=name) for name in names], ignore_conflicts=True)
+    return dict(Hashtag.objects.filter(name__in=names).values_list('name', 'id'))
+
+
+def sync_post_hashtags(post):
+    """
+    Make the PostHashtag rows of post match the tags of its title and plain-text body: one query for the current
+    tags, then only the added and removed tags are written, with one UPDATE for the counters of the added ones.
+    Returns (number of tags added, number of tags removed).
+    """
+    names = extract_hashtags(post.title, post.body_text)
+    with transaction.atomic():
+        current = dict(PostHashtag.objects.filter(post=post).values_list('hashtag__name', 'hashtag_id'))
+        added = names - current.keys()
+        removed = [hashtag_id for name, hashtag_id in current.items() if name not in names]
+        if added:
+            ids = get_hashtag_ids(added)
+            PostHashtag.objects.bulk_create(
+                [PostHashtag(hashtag_id=hashtag_id, post=post, create_time=post.create_time)
+                 for hashtag_id in ids.values()])
+            Hashtag.objects.filter(pk__in=ids.values()).update(post_count=F('post_count') + 1)
+            transaction.on_commit(lambda: record_events('tags', list(ids.values()), TAG_WEIGHT))
+        if removed:
+            PostHashtag.objects.filter(post=post, hashtag_id__in=removed).delete()
+    return len(added), len(removed)
+
+
+def hashtag_posts(hashtag):
+    """
+    Return the active posts of a hashtag annotated with `tagged_at` (the post creation time), to be paginated on
+    ('-tagged_at', '-id').
+    """
+    return Post.objects.filter(post_hashtags__hashtag=hashtag).annotate(tagged_at=F('post_hashtags__create_time'))
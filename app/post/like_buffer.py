@@ -0,0 +1,232 @@
+import logging
+
+from django.conf import settings
+from django.db import DatabaseError, transaction
+from redis.exceptions import RedisError
+
+from app.account.models import User
+from app.core.cache import get_redis_client, make_redis_key
+from app.core.toggles import set_row, toggle_row
+from app.post.counters import adjust_counter, suspend_counters
+from app.post.fragments import bump_card_versions
+from app.post.models import Post, Vote
+from app.post.ranking import refresh_explore_scores
+from app.post.trending import VOTE_WEIGHT, record_events
+
+"""
+Write-behind buffer for post likes.
+
+When settings.LIKE_BUFFER_ENABLED is on, like toggles of posts with at least settings.LIKE_BUFFER_MIN_LIKES likes
+(or that already have buffered toggles) are recorded in Redis instead of writing a Vote row and updating the Post
+row on every request:
+- `likes:ops:<post_id>` is a hash user_id -> '1' (liked) / '0' (unliked) holding the latest state of every user
+  that toggled since the last flush (the membership of the buffered likes),
+- `likes:delta` is a hash post_id -> net change of the like count since the last flush (HINCRBY),
+- `likes:dirty` is the set of post ids that have buffered toggles.
+
+flush_like_buffer (run periodically with `manage.py flush_like_buffer`) writes the buffered state to the database:
+the ops hash of a post is first renamed to `likes:flushing:<post_id>`, then the Vote rows are written with one
+bulk_create and one delete and Post.like_count is adjusted with a single UPDATE (then the post is rescored for the
+explorer), all in one transaction.
+The flushing hash is only removed after the transaction committed, so a flusher that crashes leaves it in place and
+the next run retries it. The retry is idempotent because the Vote writes and the counter delta are computed against
+the rows that are actually in the database, not against the buffered delta.
+
+Post.like_count lags behind by the buffered delta until the next flush; buffered_likes_count adds it back.
+"""
+
+logger = logging.getLogger(__name__)
+
+# Set the like of ARGV[1] on a post to ARGV[4] ('1' / '0'), or toggle it when ARGV[4] is empty. The current state is
+# the buffered one (pending or being flushed) and falls back to ARGV[2], the state found in the database.
+# Returns {new state, buffered delta of the post}.
+TOGGLE_SCRIPT = """
+local state = tonumber(redis.call('HGET', KEYS[1], ARGV[1]) or redis.call('HGET', KEYS[2], ARGV[1]) or ARGV[2])
+local liked = 1 - state
+if ARGV[4] ~= '' then
+    liked = tonumber(ARGV[4])
+end
+redis.call('HSET', KEYS[1], ARGV[1], liked)
+local delta = redis.call('HINCRBY', KEYS[3], ARGV[3], liked - state)
+redis.call('SADD', KEYS[4], ARGV[3])
+return {liked, delta}
+"""
+
+# Move the pending toggles of a post to its flushing hash, unless a previous flush of the post did not finish.
+# The buffered delta is dropped: the flush recomputes it from the database. Returns 1 if there is anything to flush.
+CLAIM_SCRIPT = """
+if redis.call('EXISTS', KEYS[2]) == 1 then
+    return 1
+end
+if redis.call('EXISTS', KEYS[1]) == 0 then
+    redis.call('SREM', KEYS[4], ARGV[1])
+    return 0
+end
+redis.call('RENAME', KEYS[1], KEYS[2])
+redis.call('HDEL', KEYS[3], ARGV[1])
+return 1
+"""
+
+# Remove the flushing hash of a post once its transaction committed; the post stays dirty if it was toggled since.
+FINISH_SCRIPT = """
+redis.call('DEL', KEYS[2])
+if redis.call('EXISTS', KEYS[1]) == 0 then
+    redis.call('SREM', KEYS[4], ARGV[1])
+end
+return 1
+"""
+
+
+def ops_key(post_id):
+    """Return the Redis key of the buffered like toggles of a post."""
+    return make_redis_key(f'likes:ops:{post_id}')
+
+
+def flushing_key(post_id):
+    """Return the Redis key of the toggles of a post that are being written to the database."""
+    return make_redis_key(f'likes:flushing:{post_id}')
+
+
+def delta_key():
+    """Return the Redis key of the buffered like count deltas of all posts."""
+    return make_redis_key('likes:delta')
+
+
+def dirty_key():
+    """Return the Redis key of the set of posts that have buffered toggles."""
+    return make_redis_key('likes:dirty')
+
+
+def post_keys(post_id):
+    """Return the keys used by the scripts, in the KEYS order they expect."""
+    return [ops_key(post_id), flushing_key(post_id), delta_key(), dirty_key()]
+
+
+def get_buffer_client(post):
+    """
+    Return the Redis client if toggles of this post go through the buffer, otherwise None.
+    """
+    if not settings.LIKE_BUFFER_ENABLED:
+        return None
+    client = get_redis_client()
+    if client is None:
+        return None
+    try:
+        if post.like_count >= settings.LIKE_BUFFER_MIN_LIKES or client.sismember(dirty_key(), post.pk):
+            return client
+    except RedisError as e:
+        logger.error(f"Failed to check the like buffer of post {post.pk}: {e}")
+    return None
+
+
+def toggle_like(post, user, liked=None):
+    """
+    Like (liked=True), unlike (liked=False) or toggle (liked=None) a post on behalf of a user.
+    Returns (liked, likes_count). Buffered changes only touch Redis (toggle_buffered_like); the others write the Vote
+    row right away (toggle_direct_like).
+    """
+    client = get_buffer_client(post)
+    if client is not None:
+        try:
+            return toggle_buffered_like(client, post, user, liked)
+        except RedisError as e:
+            logger.error(f"Buffered like of post {post.pk} failed, writing it directly: {e}")
+    return toggle_direct_like(post, user, liked)
+
+
+def toggle_direct_like(post, user, liked=None):
+    """
+    Write a like change to the database and return (liked, likes_count): a single INSERT ... ON CONFLICT DO NOTHING
+    or DELETE ... RETURNING statement (see app.core.toggles).
+    """
+    if liked is None:
+        liked = toggle_row(Vote, post=post, user=user)
+    else:
+        set_row(Vote, liked, post=post, user=user)
+    post.refresh_from_db(fields=['like_count'])
+    return liked, post.likes_count()
+
+
+def toggle_buffered_like(client, post, user, liked=None):
+    """
+    Record a like change in Redis and return (liked, likes_count).
+    The database is only queried when the user has no buffered state for this post yet.
+    """
+    pending = client.hget(ops_key(post.pk), user.pk) or client.hget(flushing_key(post.pk), user.pk)
+    liked_in_db = pending is None and Vote.objects.filter(post=post, user=user).exists()
+    toggle = client.register_script(TOGGLE_SCRIPT)
+    liked, delta = toggle(keys=post_keys(post.pk),
+                          args=[user.pk, int(liked_in_db), post.pk, '' if liked is None else int(liked)])
+    if liked:
+        record_events('posts', [post.pk], VOTE_WEIGHT)
+    return bool(liked), max(post.like_count + int(delta), 0)
+
+
+def buffered_likes_count(post):
+    """Return the like count of a post including the toggles that are still buffered in Redis."""
+    client = get_buffer_client(post)
+    if client is None:
+        return post.likes_count()
+    try:
+        delta = client.hget(delta_key(), post.pk)
+    except RedisError as e:
+        logger.error(f"Failed to read the buffered likes of post {post.pk}: {e}")
+        return post.likes_count()
+    return max(post.like_count + int(delta or 0), 0)
+
+
+def flush_post_likes(client, post_id):
+    """
+    Write the buffered toggles of one post to the database and return the change applied to its like count.
+    """
+    claim = client.register_script(CLAIM_SCRIPT)
+    if not claim(keys=post_keys(post_id), args=[post_id]):
+        return 0
+
+    states = client.hgetall(flushing_key(post_id))
+    liked = {int(user_id) for user_id, state in states.items() if state == b'1'}
+    unliked = {int(user_id) for user_id, state in states.items() if state == b'0'}
+
+    delta = 0
+    with transaction.atomic():
+        if Post.objects.archive().filter(pk=post_id).exists():
+            with suspend_counters():
+                existing = set(Vote.objects.filter(post_id=post_id, user_id__in=liked).values_list(
+                    'user_id', flat=True))
+                missing = set(User.objects.filter(pk__in=liked - existing).values_list('pk', flat=True))
+                Vote.objects.bulk_create([Vote(post_id=post_id, user_id=user_id) for user_id in missing],
+                                         ignore_conflicts=True)
+                deleted, _ = Vote.objects.filter(post_id=post_id, user_id__in=unliked).delete()
+            delta = len(missing) - deleted
+            if delta:
+                adjust_counter(Post, post_id, 'like_count', delta)
+                refresh_explore_scores([post_id])
+                transaction.on_commit(lambda: bump_card_versions([post_id]))
+
+    finish = client.register_script(FINISH_SCRIPT)
+    finish(keys=post_keys(post_id), args=[post_id])
+    return delta
+
+
+def flush_like_buffer():
+    """
+    Flush the buffered toggles of every dirty post and return the number of posts flushed.
+    A Redis lock makes concurrent flushers skip instead of racing on the same posts.
+    """
+    client = get_redis_client()
+    if client is None:
+        return 0
+    lock = client.lock(make_redis_key('likes:flush_lock'), timeout=settings.LIKE_BUFFER_FLUSH_LOCK_TIMEOUT)
+    if not lock.acquire(blocking=False):
+        return 0
+    flushed = 0
+    try:
+        for post_id in client.sscan_iter(dirty_key()):
+            try:
+                flush_post_likes(client, int(post_id))
+                flushed += 1
+            except (RedisError, DatabaseError) as e:
+                logger.error(f"Flushing the likes of post {int(post_id)} failed: {e}")
+    finally:
+        lock.release()
+    return flushed
@@ -0,0 +1,53 @@
+from django.db.models import Prefetch
+
+from app.post.counters import count_subquery
+from app.post.models import Post, Image, Comment
+
+"""
+Loaders that fetch everything a template needs in a constant number of queries, whatever the page size.
+"""
+
+
+def post_card_queryset(queryset=None):
+    """
+    Return a queryset of posts ready to be rendered as post cards (posts, explorer and timeline pages).
+
+    A page of this queryset costs two queries regardless of its size:
+    - the posts with their owner profile and user (select_related); vote and comment counts are read from the
+      denormalized like_count and comment_count columns,
+    - the active images of every post on the page (prefetch_related).
+    Cards show an excerpt of the plain-text body_text, so the HTML body, the search vector and the owner bio are
+    deferred.
+    """
+    queryset = Post.objects.all() if queryset is None else queryset
+    return queryset.select_related('owner__user').defer('body', 'search_vector', 'owner__bio').prefetch_related(
+        Prefetch('images', queryset=Image.objects.all())
+    )
+
+
+# Orderings of the top-level comments of the post detail page, selected with ?sort=.
+COMMENT_ORDERINGS = {
+    'recent': ('-create_time', '-id'),
+    'top': ('-like_count', '-id'),
+}
+# Replies are read oldest first, like a conversation.
+REPLY_ORDERING = ('create_time', 'id')
+
+
+def comment_queryset(queryset):
+    """
+    Return a queryset of comments ready to be rendered as comment cards, one query per page:
+    the owner profile and user are joined (select_related), like counts come from the denormalized like_count
+    column and `reply_total`, the number of active direct replies, is a correlated subquery.
+    """
+    return queryset.select_related('owner__user').annotate(reply_total=count_subquery(Comment.objects.all(), 'reply'))
+
+
+def top_level_comments(post):
+    """Return the active top-level comments of a post as comment cards (see comment_queryset)."""
+    return comment_queryset(Comment.objects.filter(post=post, is_reply=False))
+
+
+def comment_replies(comment):
+    """Return the active direct replies of a comment as comment cards (see comment_queryset)."""
+    return comment_queryset(Comment.objects.filter(reply=comment))
@@ -0,0 +1,49 @@
+# Generated by Django 5.2.18 on 2026-10-17 01:19
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def count_of(queryset, field):
+    counts = queryset.filter(**{field: OuterRef('pk')}).order_by().values(field).annotate(
+        total=Count('*')).values('total')
+    return Coalesce(Subquery(counts, output_field=IntegerField()), Value(0))
+
+
+def backfill_counters(apps, schema_editor):
+    """Fill the new counter columns from the Vote, Comment and CommentLike tables."""
+    Post = apps.get_model('post', 'Post')
+    Comment = apps.get_model('post', 'Comment')
+    Vote = apps.get_model('post', 'Vote')
+    CommentLike = apps.get_model('post', 'CommentLike')
+    active_comments = Comment.objects.filter(is_active=True, is_deleted=False)
+    Post.objects.update(like_count=count_of(Vote.objects.all(), 'post'),
+                        comment_count=count_of(active_comments, 'post'))
+    Comment.objects.update(like_count=count_of(CommentLike.objects.all(), 'comment'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('post', '0002_post_keyset_pagination_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='comment',
+            name='like_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='comment_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='like_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.18 on 2026-10-17 05:10
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, Min, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def remove_duplicate_comment_likes(apps, schema_editor):
+    """Keep the oldest CommentLike of every (user, comment) pair and recount the comments that had duplicates."""
+    Comment = apps.get_model('post', 'Comment')
+    CommentLike = apps.get_model('post', 'CommentLike')
+    duplicates = CommentLike.objects.values('user', 'comment').annotate(keep=Min('id'), total=Count('id')).filter(
+        total__gt=1).order_by()
+    comment_ids = set()
+    for duplicate in duplicates:
+        CommentLike.objects.filter(user=duplicate['user'], comment=duplicate['comment']).exclude(
+            id=duplicate['keep']).delete()
+        comment_ids.add(duplicate['comment'])
+    if comment_ids:
+        counts = CommentLike.objects.filter(comment=OuterRef('pk')).order_by().values('comment').annotate(
+            total=Count('*')).values('total')
+        Comment.objects.filter(pk__in=comment_ids).update(
+            like_count=Coalesce(Subquery(counts, output_field=IntegerField()), Value(0)))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('post', '0003_denormalized_counters'),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicate_comment_likes, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='commentlike',
+            constraint=models.UniqueConstraint(fields=('user', 'comment'), name='unique_user_comment_like'),
+        ),
+    ]
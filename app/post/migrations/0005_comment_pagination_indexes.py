@@ -0,0 +1,26 @@
+# Generated by Django 5.2.18 on 2026-10-17 01:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('account', '0003_relation_direction_indexes'),
+        ('post', '0004_commentlike_unique_user_comment_like'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['post', 'is_reply', '-create_time', '-id'], name='index_post_recent_comments'),
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['post', 'is_reply', '-like_count', '-id'], name='index_post_top_comments'),
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['reply', 'create_time', 'id'], name='index_reply_create_time'),
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 5.2.18 on 2026-10-17 02:10
+
+from django.db import migrations, models
+
+BATCH_SIZE = 1000
+
+
+def backfill_comment_paths(apps, schema_editor):
+    """
+    Set the materialized path of every existing comment, in primary key batches.
+    A reply is always created after the comment it answers, so walking the comments in pk order sees every parent
+    before its replies; the paths of parents from earlier batches are read with one query per batch.
+    """
+    Comment = apps.get_model('post', 'Comment')
+    last_pk = 0
+    while True:
+        batch = list(Comment.objects.filter(pk__gt=last_pk).order_by('pk').only('pk', 'reply_id')[:BATCH_SIZE])
+        if not batch:
+            break
+        paths = dict(Comment.objects.filter(pk__in={comment.reply_id for comment in batch if comment.reply_id},
+                                            pk__lte=last_pk).values_list('pk', 'path'))
+        for comment in batch:
+            parent_path = paths.get(comment.reply_id, '') if comment.reply_id else ''
+            comment.path = paths[comment.pk] = f'{parent_path}{comment.pk:010d}/'
+        Comment.objects.bulk_update(batch, ['path'])
+        last_pk = batch[-1].pk
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('post', '0005_comment_pagination_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='comment',
+            name='path',
+            field=models.CharField(db_index=True, default='', editable=False, max_length=500),
+        ),
+        migrations.RunPython(backfill_comment_paths, migrations.RunPython.noop),
+    ]
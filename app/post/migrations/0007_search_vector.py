@@ -0,0 +1,95 @@
+# Generated by Django 5.2.18 on 2026-10-17 05:10
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations, models
+
+BATCH_SIZE = 10000
+
+# Keeps post_post.search_vector in sync with title and body. It must build the document exactly like
+# app.post.search (same text search configuration, same markup pattern).
+CREATE_TRIGGER = """
+CREATE OR REPLACE FUNCTION post_post_search_vector_update() RETURNS trigger AS $$
+BEGIN
+    NEW.search_vector :=
+        setweight(to_tsvector('simple', coalesce(NEW.title, '')), 'A') ||
+        setweight(to_tsvector('simple', regexp_replace(coalesce(NEW.body, ''), '<[^>]+>', ' ', 'g')), 'B');
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS post_post_search_vector_trigger ON post_post;
+CREATE TRIGGER post_post_search_vector_trigger
+    BEFORE INSERT OR UPDATE OF title, body ON post_post
+    FOR EACH ROW EXECUTE FUNCTION post_post_search_vector_update();
+"""
+
+DROP_TRIGGER = """
+DROP TRIGGER IF EXISTS post_post_search_vector_trigger ON post_post;
+DROP FUNCTION IF EXISTS post_post_search_vector_update();
+"""
+
+BACKFILL = """
+UPDATE post_post SET search_vector =
+    setweight(to_tsvector('simple', coalesce(title, '')), 'A') ||
+    setweight(to_tsvector('simple', regexp_replace(coalesce(body, ''), '<[^>]+>', ' ', 'g')), 'B')
+WHERE id >= %s AND id < %s
+"""
+
+
+def create_search_trigger(apps, schema_editor):
+    """
+    Create the search_vector trigger and fill the column of the existing posts by primary key ranges.
+    The trigger is PostgreSQL only; other databases keep a NULL search_vector.
+    """
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    Post = apps.get_model('post', 'Post')
+    schema_editor.execute(CREATE_TRIGGER)
+    last_pk = Post.objects.aggregate(last_pk=models.Max('pk'))['last_pk'] or 0
+    for start_pk in range(1, last_pk + 1, BATCH_SIZE):
+        schema_editor.execute(BACKFILL, params=[start_pk, start_pk + BATCH_SIZE])
+
+
+def drop_search_trigger(apps, schema_editor):
+    """Remove the search_vector trigger."""
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(DROP_TRIGGER)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('account', '0003_relation_direction_indexes'),
+        ('post', '0006_comment_path'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddField(
+            model_name='post',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunPython(create_search_trigger, drop_search_trigger),
+        migrations.AddIndex(
+            model_name='post',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='index_search_vector_posts'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=django.contrib.postgres.indexes.GinIndex(
+                django.contrib.postgres.indexes.OpClass('title', name='gin_trgm_ops'), name='index_title_trgm_posts'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=django.contrib.postgres.indexes.GinIndex(
+                django.contrib.postgres.indexes.OpClass(
+                    models.Func(models.F('body'), models.Value('<[^>]+>'), models.Value(' '), models.Value('g'),
+                                function='REGEXP_REPLACE'),
+                    name='gin_trgm_ops'),
+                name='index_body_trgm_posts'),
+        ),
+    ]
@@ -0,0 +1,109 @@
+# Generated by Django 5.2.18 on 2026-10-17 05:20
+
+import html
+import re
+
+import django.contrib.postgres.indexes
+from django.db import migrations, models
+
+BATCH_SIZE = 1000
+
+# Frozen copy of app.core.text.html_to_text at the time of this migration.
+DROPPED = re.compile(r'<(script|style)\b.*?</\1\s*>|<!--.*?-->', re.IGNORECASE | re.DOTALL)
+BLOCK_TAG = re.compile(r'</?(?:p|br|div|li|ul|ol|h[1-6]|tr|td|th|table|blockquote|pre|hr)\b[^>]*>', re.IGNORECASE)
+TAG = re.compile(r'<[^>]*>')
+WHITESPACE = re.compile(r'\s+')
+
+
+def html_to_text(value):
+    if not value:
+        return ''
+    value = DROPPED.sub(' ', value)
+    value = BLOCK_TAG.sub(' ', value)
+    value = TAG.sub('', value)
+    return WHITESPACE.sub(' ', html.unescape(value)).strip()
+
+
+def backfill(model, source, shadow):
+    """Fill model.shadow with the text of model.source on every row, in primary key batches."""
+    manager = model._base_manager
+    last_pk = manager.aggregate(last_pk=models.Max('pk'))['last_pk'] or 0
+    for start_pk in range(1, last_pk + 1, BATCH_SIZE):
+        rows = list(manager.filter(pk__gte=start_pk, pk__lt=start_pk + BATCH_SIZE).only('pk', source))
+        for row in rows:
+            setattr(row, shadow, html_to_text(getattr(row, source)))
+        manager.bulk_update(rows, [shadow])
+
+
+# The search document is now built from the plain-text shadow column instead of stripping the HTML body in SQL.
+# The new columns are filled by backfill_plain_text once the trigger reads body_text, so its updates of body_text
+# refresh the search vectors of the existing posts.
+SEARCH_TRIGGER_FUNCTION = """
+CREATE OR REPLACE FUNCTION post_post_search_vector_update() RETURNS trigger AS $$
+BEGIN
+    NEW.search_vector :=
+        setweight(to_tsvector('simple', coalesce(NEW.title, '')), 'A') ||
+        setweight(to_tsvector('simple', {body}), 'B');
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS post_post_search_vector_trigger ON post_post;
+CREATE TRIGGER post_post_search_vector_trigger
+    BEFORE INSERT OR UPDATE OF title, {columns} ON post_post
+    FOR EACH ROW EXECUTE FUNCTION post_post_search_vector_update();
+"""
+
+
+def use_body_text(apps, schema_editor):
+    """Build the search vector from body_text. PostgreSQL only."""
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(SEARCH_TRIGGER_FUNCTION.format(body="coalesce(NEW.body_text, '')", columns='body_text'))
+
+
+def use_body(apps, schema_editor):
+    """Build the search vector from the HTML body again. PostgreSQL only."""
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(SEARCH_TRIGGER_FUNCTION.format(
+        body="regexp_replace(coalesce(NEW.body, ''), '<[^>]+>', ' ', 'g')", columns='body'))
+
+
+def backfill_plain_text(apps, schema_editor):
+    """Fill Post.body_text and Comment.comments_text of the existing rows."""
+    backfill(apps.get_model('post', 'Post'), 'body', 'body_text')
+    backfill(apps.get_model('post', 'Comment'), 'comments', 'comments_text')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('account', '0004_profile_bio_text'),
+        ('post', '0007_search_vector'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='post',
+            name='index_body_trgm_posts',
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='comments_text',
+            field=models.TextField(default='', editable=False),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='body_text',
+            field=models.TextField(default='', editable=False),
+        ),
+        migrations.RunPython(use_body_text, use_body),
+        migrations.RunPython(backfill_plain_text, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='post',
+            index=django.contrib.postgres.indexes.GinIndex(
+                django.contrib.postgres.indexes.OpClass('body_text', name='gin_trgm_ops'),
+                name='index_body_text_trgm_posts'),
+        ),
+    ]
@@ -0,0 +1,121 @@
+# Generated by Django 5.2.18 on 2026-10-17 05:30
+
+import django.contrib.postgres.indexes
+from django.db import migrations, models
+
+BATCH_SIZE = 10000
+
+# Frozen copy of app.core.text.NORMALIZE_FROM / NORMALIZE_TO at the time of this migration.
+NORMALIZE_FROM = (
+    '\u0643\u064a\u0649\u0629\u0623\u0625\u0671\u0624'
+    '\u06f0\u06f1\u06f2\u06f3\u06f4\u06f5\u06f6\u06f7\u06f8\u06f9'
+    '\u0660\u0661\u0662\u0663\u0664\u0665\u0666\u0667\u0668\u0669'
+    '\u200c\u00a0'
+    '\u064b\u064c\u064d\u064e\u064f\u0650\u0651\u0652\u0653\u0654\u0655\u0670'
+    '\u0640\u200b\u200d\u200e\u200f\ufeff'
+)
+NORMALIZE_TO = (
+    '\u06a9\u06cc\u06cc\u0647\u0627\u0627\u0627\u0648'
+    '0123456789'
+    '0123456789'
+    '  '
+)
+
+# persian_english: `simple` for Persian words (lower-cased, no stemming, no stop words) and the English stemmer for
+# ASCII words. search_normalize() is the SQL twin of app.core.text.normalize_text; it is immutable so that the
+# trigram indexes can be built on it.
+CREATE_SEARCH_CONFIG = f"""
+CREATE TEXT SEARCH CONFIGURATION persian_english (COPY = simple);
+ALTER TEXT SEARCH CONFIGURATION persian_english
+    ALTER MAPPING FOR asciiword, asciihword, hword_asciipart WITH english_stem;
+
+CREATE OR REPLACE FUNCTION search_normalize(value text) RETURNS text AS $$
+    SELECT translate(lower(value), '{NORMALIZE_FROM}', '{NORMALIZE_TO}')
+$$ LANGUAGE sql IMMUTABLE STRICT PARALLEL SAFE;
+
+CREATE OR REPLACE FUNCTION post_post_search_vector_update() RETURNS trigger AS $$
+BEGIN
+    NEW.search_vector :=
+        setweight(to_tsvector('persian_english', search_normalize(coalesce(NEW.title, ''))), 'A') ||
+        setweight(to_tsvector('persian_english', search_normalize(coalesce(NEW.body_text, ''))), 'B');
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+"""
+
+DROP_SEARCH_CONFIG = """
+CREATE OR REPLACE FUNCTION post_post_search_vector_update() RETURNS trigger AS $$
+BEGIN
+    NEW.search_vector :=
+        setweight(to_tsvector('simple', coalesce(NEW.title, '')), 'A') ||
+        setweight(to_tsvector('simple', coalesce(NEW.body_text, '')), 'B');
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+DROP FUNCTION IF EXISTS search_normalize(text);
+DROP TEXT SEARCH CONFIGURATION IF EXISTS persian_english;
+"""
+
+# Rebuild the vectors of the existing posts with the new trigger function.
+REBUILD = 'UPDATE post_post SET title = title WHERE id >= %s AND id < %s'
+
+
+def create_search_config(apps, schema_editor):
+    """
+    Create the text search configuration and search_normalize(), and rebuild the search vectors. PostgreSQL only.
+    """
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    Post = apps.get_model('post', 'Post')
+    schema_editor.execute(CREATE_SEARCH_CONFIG)
+    last_pk = Post.objects.aggregate(last_pk=models.Max('pk'))['last_pk'] or 0
+    for start_pk in range(1, last_pk + 1, BATCH_SIZE):
+        schema_editor.execute(REBUILD, params=[start_pk, start_pk + BATCH_SIZE])
+
+
+def drop_search_config(apps, schema_editor):
+    """Restore the `simple` search vectors and drop the configuration and search_normalize(). PostgreSQL only."""
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(DROP_SEARCH_CONFIG)
+    Post = apps.get_model('post', 'Post')
+    last_pk = Post.objects.aggregate(last_pk=models.Max('pk'))['last_pk'] or 0
+    for start_pk in range(1, last_pk + 1, BATCH_SIZE):
+        schema_editor.execute(REBUILD, params=[start_pk, start_pk + BATCH_SIZE])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('account', '0004_profile_bio_text'),
+        ('post', '0008_plain_text_fields'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='post',
+            name='index_title_trgm_posts',
+        ),
+        migrations.RemoveIndex(
+            model_name='post',
+            name='index_body_text_trgm_posts',
+        ),
+        migrations.RunPython(create_search_config, drop_search_config),
+        migrations.AddIndex(
+            model_name='post',
+            index=django.contrib.postgres.indexes.GinIndex(
+                django.contrib.postgres.indexes.OpClass(
+                    models.Func(models.F('title'), function='search_normalize', output_field=models.TextField()),
+                    name='gin_trgm_ops'),
+                name='index_title_norm_trgm_posts'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=django.contrib.postgres.indexes.GinIndex(
+                django.contrib.postgres.indexes.OpClass(
+                    models.Func(models.F('body_text'), function='search_normalize', output_field=models.TextField()),
+                    name='gin_trgm_ops'),
+                name='index_body_norm_trgm_posts'),
+        ),
+    ]
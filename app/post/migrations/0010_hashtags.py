@@ -0,0 +1,43 @@
+# Generated by Django 5.2.18 on 2026-10-17 05:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('post', '0009_persian_search'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Hashtag',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True)),
+                ('post_count', models.PositiveIntegerField(default=0, editable=False)),
+                ('create_time', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Hashtag',
+                'verbose_name_plural': 'Hashtags',
+                'ordering': ('name',),
+            },
+        ),
+        migrations.CreateModel(
+            name='PostHashtag',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('create_time', models.DateTimeField()),
+                ('hashtag', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='post_hashtags', to='post.hashtag')),
+                ('post', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='post_hashtags', to='post.post')),
+            ],
+            options={
+                'verbose_name': 'PostHashtag',
+                'verbose_name_plural': 'PostHashtags',
+                'indexes': [models.Index(fields=['hashtag', '-create_time', '-post'], name='index_hashtag_recent_posts')],
+                'constraints': [models.UniqueConstraint(fields=('post', 'hashtag'), name='unique_post_hashtag')],
+            },
+        ),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 5.2.18 on 2026-10-17 05:50
+
+import math
+
+from django.conf import settings
+from django.db import migrations, models
+
+BATCH_SIZE = 10000
+
+
+def backfill_explore_scores(apps, schema_editor):
+    """
+    Score every existing post (hidden and soft-deleted ones included) in primary key batches, with the formula of
+    app.post.ranking.explore_score and the current EXPLORE_* weights.
+    """
+    Post = apps.get_model('post', 'Post')
+    last_pk = Post._base_manager.aggregate(last_pk=models.Max('pk'))['last_pk'] or 0
+    for start_pk in range(1, last_pk + 1, BATCH_SIZE):
+        rows = Post._base_manager.filter(pk__gte=start_pk, pk__lt=start_pk + BATCH_SIZE).values_list(
+            'pk', 'like_count', 'comment_count', 'owner__user__stats__followers_count', 'create_time')
+        posts = []
+        for pk, like_count, comment_count, followers_count, create_time in rows:
+            engagement = settings.EXPLORE_LIKE_WEIGHT * like_count + settings.EXPLORE_COMMENT_WEIGHT * comment_count
+            score = (math.log1p(engagement) + settings.EXPLORE_FOLLOWER_WEIGHT * math.log1p(followers_count or 0) +
+                     create_time.timestamp() / settings.EXPLORE_TIME_SCALE)
+            posts.append(Post(pk=pk, explore_score=score))
+        Post._base_manager.bulk_update(posts, ['explore_score'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('account', '0005_autocomplete_prefix_indexes'),
+        ('post', '0010_hashtags'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='explore_score',
+            field=models.FloatField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_explore_scores, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(condition=models.Q(('is_active', True), ('is_deleted', False)), fields=['-explore_score', '-id'], name='index_explore_score_posts'),
+        ),
+    ]
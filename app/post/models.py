@@ -1,21 +1,30 @@
 from ckeditor.fields import RichTextField
+from django.contrib.postgres.indexes import GinIndex, OpClass
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
 from app.account.models import Profile, User
-from app.core.mixin import DeleteManagerMixin, image_upload_path_mixin
+from app.core.mixin import CounterFieldsMixin, DeleteManagerMixin, PlainTextMixin, image_upload_path_mixin
+from app.core.text import normalized
 
 
-class Post(models.Model):
+class Post(CounterFieldsMixin, PlainTextMixin, models.Model):
     """
     Defines the Post model representing user posts in the application.
     Fields:
     - owner: ForeignKey to the Profile model representing the owner of the post.
     - body: RichTextField containing the content of the post.
+    - body_text: Plain-text, whitespace-normalized copy of body, refreshed on save. Used by search and excerpts.
     - title: CharField for the title of the post.
     - is_deleted: BooleanField indicating if the post is deleted.
     - is_active: BooleanField indicating if the post is active.
     - delete_time: DateTimeField indicating the time when the post was deleted.
     - create_time: DateTimeField indicating the time when the post was created.
     - update_time: DateTimeField indicating the time when the post was last updated.
+    - like_count: Denormalized number of votes on the post, maintained by the Vote signals.
+    - comment_count: Denormalized number of active comments on the post, maintained by the Comment signals.
+      Neither counter (nor explore_score) is written by save() of an existing post (see CounterFieldsMixin).
+    - search_vector: Precomputed full-text search document of the title and body, maintained by a database trigger.
+    - explore_score: Precomputed explorer ranking score, maintained by app.post.ranking.
     - objects: Custom manager for soft deletion.
 
     Methods:
@@ -28,17 +37,26 @@ class Post(models.Model):
     - verbose_name: Sets the display name for a single Post object.
     - verbose_name_plural: Sets the display name for multiple Post objects.
     - get_latest_by: Specifies the field to use for retrieving the latest Post object.
-    - indexes: Defines indexes for owner and title fields.
+    - indexes: Defines indexes for owner and title fields, the (update_time, id) keyset pagination indexes, the
+      GIN search indexes (search_vector, normalized title and body_text trigrams) used by app.post.search, and the
+      partial (explore_score, id) index of the active posts read by the explorer.
     """
     owner = models.ForeignKey(Profile, on_delete=models.CASCADE, related_name='posts')
     body = RichTextField()
+    body_text = models.TextField(default='', editable=False)
     title = models.CharField(max_length=255)
     is_deleted = models.BooleanField(default=False)
     is_active = models.BooleanField(default=True)
     delete_time = models.DateTimeField(auto_now=True, editable=False)
     create_time = models.DateTimeField(auto_now_add=True, editable=False)
     update_time = models.DateTimeField(auto_now=True, editable=False)
+    like_count = models.PositiveIntegerField(default=0, editable=False)
+    comment_count = models.PositiveIntegerField(default=0, editable=False)
+    search_vector = SearchVectorField(null=True, editable=False)
+    explore_score = models.FloatField(default=0, editable=False)
     objects = DeleteManagerMixin()  # Assuming UserManager is a custom manager < soft delete >
+    plain_text_fields = {'body': 'body_text'}
+    counter_fields = ('like_count', 'comment_count', 'explore_score')
 
     def __str__(self):
         return f'{self.owner} - {self.title} - {self.update_time}'
@@ -49,28 +67,35 @@ class Post(models.Model):
         verbose_name_plural = 'Posts'
         get_latest_by = '-create_time'
         indexes = [
-            models.Index(fields=['owner', 'title'], name='index_owner_title_posts')
+            models.Index(fields=['owner', 'title'], name='index_owner_title_posts'),
+            models.Index(fields=['-update_time', '-id'], name='index_update_time_id_posts'),
+            models.Index(fields=['owner', '-update_time', '-id'], name='index_owner_update_time_posts'),
+            GinIndex(fields=['search_vector'], name='index_search_vector_posts'),
+            GinIndex(OpClass(normalized('title'), name='gin_trgm_ops'), name='index_title_norm_trgm_posts'),
+            GinIndex(OpClass(normalized('body_text'), name='gin_trgm_ops'), name='index_body_norm_trgm_posts'),
+            models.Index(fields=['-explore_score', '-id'], name='index_explore_score_posts',
+                         condition=models.Q(is_active=True, is_deleted=False)),
         ]
 
     def likes_count(self):
         """
         Defines the likes_count method of the Post model.
-        This method returns the number of likes (votes) on the post.
+        This method returns the number of likes (votes) on the post from the denormalized like_count column.
 
         Returns:
         - Integer representing the count of likes (votes) on the post.
         """
-        return self.post_vote.count()
+        return self.like_count
 
     def comments_count(self):
         """
         Defines the comments_count method of the Post model.
-        This method returns the number of comments on the post.
+        This method returns the number of comments on the post from the denormalized comment_count column.
 
         Returns:
         - Integer representing the count of comments on the post.
         """
-        return self.post_comments.count()
+        return self.comment_count
 
 
 class Image(models.Model):
@@ -115,7 +140,7 @@ class Image(models.Model):
         ]
 
 
-class Comment(models.Model):
+class Comment(CounterFieldsMixin, PlainTextMixin, models.Model):
     """
     Defines the Comment model which represents comments made by users on posts.
     Fields:
@@ -124,15 +149,26 @@ class Comment(models.Model):
     - reply: ForeignKey to self representing a reply to another comment (optional).
     - is_reply: BooleanField indicating whether the comment is a reply to another comment.
     - comments: RichTextField containing the content of the comment.
+    - comments_text: Plain-text, whitespace-normalized copy of comments, refreshed on save.
     - is_active: BooleanField indicating whether the comment is active. (default: True)
     - is_deleted: BooleanField indicating whether the comment has been deleted.
     - delete_time: DateTimeField indicating the time when the comment was deleted.
     - create_time: DateTimeField indicating the time when the comment was created.
     - update_time: DateTimeField indicating the time when the comment was last updated.
+    - like_count: Denormalized number of likes on the comment, maintained by the CommentLike signals, never written
+      by save() of an existing comment (see CounterFieldsMixin).
+    - path: Materialized path of the comment, the zero-padded ids of its ancestors and its own id
+      ('0000000012/0000000034/'), set by a post_save signal. The subtree of a comment is every comment whose path
+      starts with its path, one indexed range scan. Replies nest at most settings.COMMENT_MAX_DEPTH levels deep
+      (see ReplyCommentView), which keeps the path within its 500 characters.
     - objects: Custom manager for soft deletion.
 
     Methods:
     - __str__: Returns a string representation of the Comment object.
+    - path_segment: Returns the path segment of a comment id.
+    - depth: Returns the nesting level of the comment (1 for a top-level comment).
+    - subtree: Returns the active comments of the subtree rooted at the comment (the comment included).
+    - descendants_count: Returns the number of active comments below the comment, at any depth.
 
     Meta:
     - ordering: Specifies the default ordering of Comment objects.
@@ -148,34 +184,68 @@ class Comment(models.Model):
                               null=True)
     is_reply = models.BooleanField(default=False)
     comments = RichTextField()
+    comments_text = models.TextField(default='', editable=False)
     is_active = models.BooleanField(default=True)
     is_deleted = models.BooleanField(default=False)
     delete_time = models.DateTimeField(auto_now=True, editable=False)
     create_time = models.DateTimeField(auto_now_add=True, editable=False)
     update_time = models.DateTimeField(auto_now=True, editable=False)
+    like_count = models.PositiveIntegerField(default=0, editable=False)
+    path = models.CharField(max_length=500, default='', editable=False, db_index=True)
     objects = DeleteManagerMixin()  # Assuming UserManager is a custom manager < soft delete >
+    plain_text_fields = {'comments': 'comments_text'}
+    counter_fields = ('like_count',)
 
     def __str__(self):
         return f'{self.owner} - {self.post} - {self.update_time}'
 
+    @staticmethod
+    def path_segment(pk):
+        """
+        Returns the path segment of a comment id. Fixed width, so that paths sort like the tree (depth first).
+        """
+        return f'{pk:010d}/'
+
+    def depth(self):
+        """
+        Returns the nesting level of the comment, the number of segments of its path (1 for a top-level comment).
+        """
+        return self.path.count('/')
+
+    def subtree(self):
+        """
+        Returns the active comments of the subtree rooted at this comment, this comment included.
+        """
+        return Comment.objects.filter(path__startswith=self.path or self.path_segment(self.pk))
+
+    def descendants_count(self):
+        """
+        Returns the number of active comments below this comment, at any depth.
+        """
+        return self.subtree().exclude(pk=self.pk).count()
+
     class Meta:
         ordering = ('-update_time', '-create_time')
         verbose_name = 'Comment'
         verbose_name_plural = 'Comments'
         get_latest_by = '-create_time'
         indexes = [
-            models.Index(fields=['owner', 'post'], name='index_owner_post_comments')
+            models.Index(fields=['owner', 'post'], name='index_owner_post_comments'),
+            # Keyset pagination of the top-level comments of a post (newest / most liked) and of the replies.
+            models.Index(fields=['post', 'is_reply', '-create_time', '-id'], name='index_post_recent_comments'),
+            models.Index(fields=['post', 'is_reply', '-like_count', '-id'], name='index_post_top_comments'),
+            models.Index(fields=['reply', 'create_time', 'id'], name='index_reply_create_time'),
         ]
 
     def count_comment_like(self):
         """
         Defines the count_comment_like method of the Comment model.
-        This method returns the number of likes (votes) on the comment.
+        This method returns the number of likes (votes) on the comment from the denormalized like_count column.
 
         Returns:
         - Integer representing the count of likes (votes) on the comment.
         """
-        return self.comment_like.count()
+        return self.like_count
 
 
 class Vote(models.Model):
@@ -233,6 +303,7 @@ class CommentLike(models.Model):
     - verbose_name: Sets the display name for a single CommentLike object.
     - verbose_name_plural: Sets the display name for multiple CommentLike objects.
     - get_latest_by: Specifies the field to use for retrieving the latest CommentLike object.
+    - constraints: Defines constraints for uniqueness of user and comment fields.
     - indexes: Defines indexes for user and comment fields.
     """
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='user_comment_like')
@@ -247,6 +318,76 @@ class CommentLike(models.Model):
         verbose_name = 'CommentLike'
         verbose_name_plural = 'CommentLikes'
         get_latest_by = '-create_time'
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'comment'], name='unique_user_comment_like')
+        ]
         indexes = [
             models.Index(fields=['user', 'comment'], name='index_user_comment_like')
         ]
+
+
+class Hashtag(models.Model):
+    """
+    Defines the Hashtag model, one row per distinct #tag used in posts.
+    Fields:
+    - name: The normalized tag, without the '#' (lower-cased, Persian letters folded, see app.post.hashtags).
+    - post_count: Denormalized number of posts using the tag, maintained by app.post.hashtags and the PostHashtag
+      signals.
+    - create_time: DateTimeField indicating the time when the tag was first used.
+
+    Methods:
+    - __str__: Returns a string representation of the Hashtag object.
+
+    Meta:
+    - ordering: Specifies the default ordering of Hashtag objects.
+    - verbose_name: Sets the display name for a single Hashtag object.
+    - verbose_name_plural: Sets the display name for multiple Hashtag objects.
+    """
+    name = models.CharField(max_length=100, unique=True)
+    post_count = models.PositiveIntegerField(default=0, editable=False)
+    create_time = models.DateTimeField(auto_now_add=True, editable=False)
+
+    def __str__(self):
+        return f'#{self.name}'
+
+    class Meta:
+        ordering = ('name',)
+        verbose_name = 'Hashtag'
+        verbose_name_plural = 'Hashtags'
+
+
+class PostHashtag(models.Model):
+    """
+    Defines the PostHashtag model, the inverted index from a hashtag to the posts using it.
+    Fields:
+    - hashtag: ForeignKey to the Hashtag model.
+    - post: ForeignKey to the Post model.
+    - create_time: Creation time of the post, copied here so that the posts of a tag are read newest first straight
+      from the (hashtag, create_time, post) index.
+
+    Methods:
+    - __str__: Returns a string representation of the PostHashtag object.
+
+    Meta:
+    - verbose_name: Sets the display name for a single PostHashtag object.
+    - verbose_name_plural: Sets the display name for multiple PostHashtag objects.
+    - constraints: Defines constraints for uniqueness of hashtag and post fields.
+    - indexes: Defines the index of the tag pages (hashtag, newest post first).
+    """
+    # No single-column indexes: the unique (post, hashtag) constraint and the tag page index start with them.
+    hashtag = models.ForeignKey(Hashtag, on_delete=models.CASCADE, related_name='post_hashtags', db_index=False)
+    post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name='post_hashtags', db_index=False)
+    create_time = models.DateTimeField()
+
+    def __str__(self):
+        return f'{self.hashtag} - {self.post}'
+
+    class Meta:
+        verbose_name = 'PostHashtag'
+        verbose_name_plural = 'PostHashtags'
+        constraints = [
+            models.UniqueConstraint(fields=['post', 'hashtag'], name='unique_post_hashtag')
+        ]
+        indexes = [
+            models.Index(fields=['hashtag', '-create_time', '-post'], name='index_hashtag_recent_posts')
+        ]
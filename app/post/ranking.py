@@ -0,0 +1,72 @@
+import hashlib
+import math
+
+from django.conf import settings
+from django.core.cache import cache
+
+from app.core.pagination import CursorPaginator
+from app.post.loaders import post_card_queryset
+from app.post.models import Post
+from app.post.search_cache import cached_page, generation_key
+
+"""
+Explorer ranking.
+
+Every post has a precomputed Post.explore_score, and the explorer reads its first page (and every next page) with
+one range scan of the partial (explore_score, id) index on active posts, instead of sorting all posts.
+
+The score is a time-decayed mix of engagement and author reach, in "hot" form:
+
+    log(1 + EXPLORE_LIKE_WEIGHT * likes + EXPLORE_COMMENT_WEIGHT * comments)
+    + EXPLORE_FOLLOWER_WEIGHT * log(1 + followers of the author)
+    + creation timestamp / EXPLORE_TIME_SCALE
+
+The time term grows with the creation time instead of shrinking with the age, so a score never has to be recomputed
+just because time passed: a post EXPLORE_TIME_SCALE seconds newer than another needs e times less engagement to rank
+the same. Only the posts whose counters change are rescored (refresh_explore_scores), in the same transaction as the
+Vote or Comment write: the Vote / Comment signals, DeleteCommentView and the like buffer flush call it. The follower
+count is the one of the author at the time of the last rescore.
+`manage.py rebuild_explore_scores` rescores every post (after changing the weights, or to catch up follower counts).
+
+The explorer pages are the same for everyone, so they are cached (cached_explorer_page) for
+settings.EXPLORER_CACHE_TIMEOUT seconds, then served stale for settings.EXPLORER_CACHE_STALE_TIMEOUT more seconds,
+with the stampede protection of app.core.stampede. Their keys include the generation of the `all` search scope, so
+creating, updating or deleting a post invalidates them at once; votes and comments show up when a page is refreshed.
+"""
+
+EXPLORER_ORDERING = ('-explore_score', '-id')
+
+
+def explore_score(like_count, comment_count, followers_count, create_time):
+    """Return the explorer score of a post from its counters, its author's followers and its creation time."""
+    engagement = settings.EXPLORE_LIKE_WEIGHT * like_count + settings.EXPLORE_COMMENT_WEIGHT * comment_count
+    return (math.log1p(engagement) + settings.EXPLORE_FOLLOWER_WEIGHT * math.log1p(followers_count or 0) +
+            create_time.timestamp() / settings.EXPLORE_TIME_SCALE)
+
+
+def refresh_explore_scores(post_ids):
+    """
+    Recompute the explorer score of the given posts (hidden and soft-deleted ones included): one query reading their
+    counters and one UPDATE. Returns {post id: new score}.
+    """
+    rows = Post._base_manager.filter(pk__in=post_ids).values_list(
+        'pk', 'like_count', 'comment_count', 'owner__user__stats__followers_count', 'create_time')
+    posts = [Post(pk=pk, explore_score=explore_score(like_count, comment_count, followers_count, create_time))
+             for pk, like_count, comment_count, followers_count, create_time in rows]
+    Post._base_manager.bulk_update(posts, ['explore_score'])
+    return {post.pk: post.explore_score for post in posts}
+
+
+def explorer_page_key(cursor, page_size):
+    """Return the cache key of one explorer page in the current generation of the `all` search scope."""
+    generation = cache.get(generation_key('all'), 0)
+    digest = hashlib.sha1(f'{cursor or ""}\n{page_size}'.encode()).hexdigest()
+    return f'explorer:pages:{generation}:{digest}'
+
+
+def cached_explorer_page(queryset, cursor, page_size):
+    """Return the page of the posts of queryset selected by cursor, in explorer order, using the page cache."""
+    return cached_page(
+        explorer_page_key(cursor, page_size), queryset,
+        lambda: CursorPaginator(post_card_queryset(queryset), EXPLORER_ORDERING, page_size).page(cursor),
+        settings.EXPLORER_CACHE_TIMEOUT, settings.EXPLORER_CACHE_STALE_TIMEOUT)[0]
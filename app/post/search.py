@@ -0,0 +1,39 @@
+from django.contrib.postgres.search import SearchQuery, SearchRank, TrigramWordSimilarity
+from django.db.models import F, Q
+from app.core.text import normalize_text, normalized
+
+"""
+Full-text and fuzzy search over posts.
+
+Every Post row stores a precomputed `search_vector` (title weighted A, plain-text body_text weighted B), maintained by
+a database trigger on insert and on updates of title or body_text (see migrations 0007 to 0009). Searching used to
+compute TrigramSimilarity('title') + TrigramSimilarity('body') for every row and filter on the result, a sequential
+scan that rebuilt the trigrams of every HTML body on every search. search_posts only uses index-backed operators instead:
+- `search_vector @@ websearch_to_tsquery(...)` (GIN index on search_vector) for word matches,
+- `query <% search_normalize(title)` / `query <% search_normalize(body_text)` (GIN gin_trgm_ops expression indexes)
+  for typos and partial words,
+so PostgreSQL answers with a BitmapOr of the three indexes and only ranks the rows that matched.
+
+Documents and queries are normalized the same way: search_normalize() in the database, app.core.text.normalize_text
+for the query, so Arabic/Persian spelling variants, digits, ZWNJ and diacritics do not prevent a match.
+"""
+
+# Text search configuration used by the trigger and by the queries; they must agree. persian_english is `simple`
+# (lower-cased words, no stop words, right for Persian) with the English stemmer for ASCII words.
+SEARCH_CONFIG = 'persian_english'
+
+
+def search_posts(queryset, query):
+    """
+    Filter queryset to the posts matching query and annotate them with `rank`, higher is better.
+    Ranking combines the text search rank with the trigram word similarity of the title, so exact title matches come
+    first and misspelled queries still find something.
+    """
+    query = normalize_text(query)
+    search_query = SearchQuery(query, config=SEARCH_CONFIG, search_type='websearch')
+    return queryset.alias(normalized_title=normalized('title'), normalized_body=normalized('body_text')).annotate(
+        rank=SearchRank(F('search_vector'), search_query) + TrigramWordSimilarity(query, 'normalized_title'),
+    ).filter(
+        Q(search_vector=search_query) | Q(normalized_title__trigram_word_similar=query) |
+        Q(normalized_body__trigram_word_similar=query)
+    )
@@ -0,0 +1,137 @@
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+
+from app.core.pagination import CursorPage, CursorPaginator
+from app.core.stampede import MISS, STALE, get_or_compute
+from app.post.loaders import post_card_queryset
+from app.post.search import search_posts
+
+"""
+Result cache for post searches (Explorer and HomePostView).
+
+A search page is cached as the ids of its posts and its next/previous cursors, under a key built from the normalized
+query, the cursor, the page size and the current generation of the scope the results depend on:
+- `all`: every post (Explorer searches),
+- `user:<user_id>`: the posts of one user (the search of the posts page).
+Creating, updating or deleting a post increments the generation of `all` and of its owner's scope
+(invalidate_post_searches), so every entry computed before the change stops being reachable at once; nothing is
+scanned or deleted, the old entries simply expire.
+
+Within a generation an entry is fresh for settings.SEARCH_CACHE_TIMEOUT seconds, then stale for
+settings.SEARCH_CACHE_STALE_TIMEOUT more seconds. Entries go through app.core.stampede: a missing, stale or (randomly)
+almost stale entry is recomputed by the one request that wins the refresh lock while the others wait for it or are
+served the stale page, so a popular query never sends a burst of identical scans to the database. cached_page is
+also used for the explorer pages (app.post.ranking).
+
+Cached ids are loaded back through the caller's queryset, so a post that was hidden or deleted in the meantime is
+dropped from the page instead of being shown.
+
+Counters for hits, stale hits, misses and the database time spent (misses) and saved (hits) are kept in the cache;
+search_cache_metrics reads them (`manage.py search_cache_stats`).
+"""
+
+SEARCH_ORDERING = ('-rank', '-id')
+METRICS = ('hits', 'stale_hits', 'misses', 'query_us', 'saved_us')
+
+
+def generation_key(scope):
+    """Return the cache key of the generation counter of a scope."""
+    return f'search:generation:{scope}'
+
+
+def metric_key(name):
+    """Return the cache key of a search cache counter."""
+    return f'search:metrics:{name}'
+
+
+def incr(key, delta=1):
+    """Increment a counter that never expires, creating it when missing."""
+    try:
+        return cache.incr(key, delta)
+    except ValueError:
+        cache.add(key, 0, None)
+        return cache.incr(key, delta)
+
+
+def invalidate_post_searches(owner_user_id):
+    """
+    Make every cached search that may contain posts of this user stale by bumping the generations of its scopes.
+    """
+    for scope in ('all', f'user:{owner_user_id}'):
+        incr(generation_key(scope))
+
+
+def result_key(scope, query, cursor, page_size):
+    """Return the cache key of one search page in the current generation of scope."""
+    generation = cache.get(generation_key(scope), 0)
+    digest = hashlib.sha1(f'{query}\n{cursor or ""}\n{page_size}'.encode()).hexdigest()
+    return f'search:results:{scope}:{generation}:{digest}'
+
+
+def load_page(queryset, entry):
+    """Build the page of a cache entry, loading its posts through queryset in the cached order."""
+    posts = post_card_queryset(queryset.filter(pk__in=entry['ids'])).in_bulk()
+    return CursorPage([posts[pk] for pk in entry['ids'] if pk in posts], entry['next_cursor'],
+                      entry['previous_cursor'])
+
+
+def cached_page(key, queryset, paginate, timeout, stale_timeout):
+    """
+    Return the page built by paginate() (a page of post cards of queryset), cached under key as the ids of its posts and
+    its cursors, with stampede protection. Returns (page, status, seconds), see app.core.stampede.get_or_compute.
+    """
+    computed = []
+
+    def compute():
+        page = paginate()
+        computed.append(page)
+        return {'ids': [post.pk for post in page.object_list], 'next_cursor': page.next_cursor,
+                'previous_cursor': page.previous_cursor}
+
+    entry, status, seconds = get_or_compute(key, compute, timeout, stale_timeout)
+    return computed[0] if computed else load_page(queryset, entry), status, seconds
+
+
+def cached_search_page(queryset, query, cursor, page_size, scope):
+    """
+    Return the page of search_posts(queryset, query) selected by cursor, ordered by rank, using the result cache.
+    query must already be normalized (SearchForm does it), scope names the posts queryset can contain.
+    """
+    page, status, seconds = cached_page(
+        result_key(scope, query, cursor, page_size), queryset,
+        lambda: CursorPaginator(post_card_queryset(search_posts(queryset, query)), SEARCH_ORDERING,
+                                page_size).page(cursor),
+        settings.SEARCH_CACHE_TIMEOUT, settings.SEARCH_CACHE_STALE_TIMEOUT)
+    cost_us = int(seconds * 1000000)
+    if status == MISS:
+        incr(metric_key('misses'))
+        incr(metric_key('query_us'), cost_us)
+    else:
+        incr(metric_key('stale_hits' if status == STALE else 'hits'))
+        incr(metric_key('saved_us'), cost_us)
+    return page
+
+
+def search_cache_metrics():
+    """
+    Return the search cache counters with the hit ratio (fresh and stale hits over all lookups) and the database
+    time spent on misses and saved by hits, in seconds.
+    """
+    values = cache.get_many([metric_key(name) for name in METRICS])
+    counters = {name: values.get(metric_key(name), 0) for name in METRICS}
+    lookups = counters['hits'] + counters['stale_hits'] + counters['misses']
+    return {
+        'hits': counters['hits'],
+        'stale_hits': counters['stale_hits'],
+        'misses': counters['misses'],
+        'hit_ratio': (counters['hits'] + counters['stale_hits']) / lookups if lookups else 0.0,
+        'query_seconds': counters['query_us'] / 1000000,
+        'saved_seconds': counters['saved_us'] / 1000000,
+    }
+
+
+def reset_search_cache_metrics():
+    """Reset the search cache counters."""
+    cache.delete_many([metric_key(name) for name in METRICS])
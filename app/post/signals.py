@@ -1,6 +1,15 @@
-from django.db.models.signals import post_save
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
-from .models import Image, Post
+from app.account.models import Relation, UserStats
+from .counters import adjust_counter, counters_suspended
+from .feed import drop_timeline, fan_out_post
+from .fragments import bump_card_versions
+from .hashtags import sync_post_hashtags
+from .models import Image, Post, Vote, Comment, CommentLike, Hashtag, PostHashtag
+from .ranking import refresh_explore_scores
+from .search_cache import invalidate_post_searches
+from .trending import COMMENT_WEIGHT, VOTE_WEIGHT, record_events
 
 
 @receiver(post_save, sender=Post)
@@ -20,3 +29,200 @@ def create_image_for_post(sender, instance, created, **kwargs):
         images = instance.images.all()  # Retrieve all related images
         for image in images:
             Image.objects.create(post_image=instance, images=image)
+
+
+@receiver(post_save, sender=Post)
+def fan_out_new_post(sender, instance, created, **kwargs):
+    """
+    Signal receiver function to push a newly created Post into the home timelines of its owner and followers.
+    The fan-out runs after the transaction commits so followers never see a post that was rolled back.
+    """
+    if created and instance.is_active:
+        transaction.on_commit(lambda: fan_out_post(instance))
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def invalidate_cached_searches(sender, instance, **kwargs):
+    """
+    Signal receiver function to invalidate the cached searches that may contain a created, updated or deleted Post.
+    The generations are bumped after the transaction commits, so a search running meanwhile cannot cache the old
+    results under the new generation.
+    """
+    owner_user_id = instance.owner.user_id
+    transaction.on_commit(lambda: invalidate_post_searches(owner_user_id))
+
+
+@receiver(post_save, sender=Post)
+def extract_post_hashtags(sender, instance, raw=False, update_fields=None, **kwargs):
+    """
+    Signal receiver function to update the hashtags of a Post from its title and body when either may have changed.
+    """
+    if raw or (update_fields is not None and not {'title', 'body_text'} & set(update_fields)):
+        return
+    sync_post_hashtags(instance)
+
+
+@receiver(post_delete, sender=PostHashtag)
+def decrement_hashtag_post_count(sender, instance, **kwargs):
+    """
+    Signal receiver function to decrement Hashtag.post_count when a tag is removed from a post (or the post deleted).
+    """
+    adjust_counter(Hashtag, instance.hashtag_id, 'post_count', -1)
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+@receiver(post_save, sender=Image)
+@receiver(post_delete, sender=Image)
+@receiver(post_save, sender=Vote)
+@receiver(post_delete, sender=Vote)
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def invalidate_post_card(sender, instance, **kwargs):
+    """
+    Signal receiver function to make the cached card of a Post stale when the post, one of its images, votes or
+    comments is saved or deleted. The version is bumped after the transaction commits, so a page rendered meanwhile
+    cannot cache the old card under the new version.
+    """
+    if sender is Post:
+        post_id = instance.pk
+    elif sender is Image:
+        post_id = instance.post_image_id
+    else:
+        post_id = instance.post_id
+    transaction.on_commit(lambda: bump_card_versions([post_id]))
+
+
+@receiver(post_save, sender=Relation)
+@receiver(post_delete, sender=Relation)
+def drop_follower_timeline(sender, instance, **kwargs):
+    """
+    Signal receiver function to evict the home timeline of a user who followed or unfollowed someone.
+    The timeline is rebuilt from the Relation graph on the next read.
+    """
+    if instance.followers_id:
+        transaction.on_commit(lambda: drop_timeline(instance.followers_id))
+
+
+@receiver(post_save, sender=Vote)
+def increment_post_like_count(sender, instance, created, **kwargs):
+    """
+    Signal receiver function to increment Post.like_count when a Vote is created.
+    """
+    if created:
+        adjust_counter(Post, instance.post_id, 'like_count', 1)
+
+
+@receiver(post_delete, sender=Vote)
+def decrement_post_like_count(sender, instance, **kwargs):
+    """
+    Signal receiver function to decrement Post.like_count when a Vote is deleted.
+    """
+    adjust_counter(Post, instance.post_id, 'like_count', -1)
+
+
+@receiver(post_save, sender=Vote)
+@receiver(post_save, sender=Comment)
+def record_trending_post(sender, instance, created, **kwargs):
+    """
+    Signal receiver function to count a new Vote or Comment towards the trending score of its post, once the
+    transaction commits. Buffered likes are counted by the like buffer instead (their Vote rows come later).
+    """
+    if created and not counters_suspended.get():
+        weight = VOTE_WEIGHT if sender is Vote else COMMENT_WEIGHT
+        post_id = instance.post_id
+        transaction.on_commit(lambda: record_events('posts', [post_id], weight))
+
+
+@receiver(post_save, sender=Comment)
+def set_comment_path(sender, instance, created, **kwargs):
+    """
+    Signal receiver function to set the materialized path of a new Comment: the path of its parent followed by its
+    own id. The parent path is read from the cached parent when there is one.
+    """
+    if not created or instance.path:
+        return
+    parent_path = ''
+    if instance.reply_id:
+        if Comment.reply.is_cached(instance):
+            parent_path = instance.reply.path
+        else:
+            parent_path = Comment.objects.archive().filter(pk=instance.reply_id).values_list(
+                'path', flat=True).first() or ''
+    instance.path = parent_path + Comment.path_segment(instance.pk)
+    Comment.objects.archive().filter(pk=instance.pk).update(path=instance.path)
+
+
+@receiver(post_save, sender=Comment)
+def increment_post_comment_count(sender, instance, created, **kwargs):
+    """
+    Signal receiver function to increment Post.comment_count when an active Comment is created.
+    Soft deletion goes through a queryset update, so DeleteCommentView decrements the counter itself.
+    """
+    if created and instance.is_active and not instance.is_deleted:
+        adjust_counter(Post, instance.post_id, 'comment_count', 1)
+
+
+@receiver(post_delete, sender=Comment)
+def decrement_post_comment_count(sender, instance, **kwargs):
+    """
+    Signal receiver function to decrement Post.comment_count when an active Comment is removed from the database.
+    """
+    if instance.is_active and not instance.is_deleted:
+        adjust_counter(Post, instance.post_id, 'comment_count', -1)
+
+
+@receiver(post_save, sender=CommentLike)
+def increment_comment_like_count(sender, instance, created, **kwargs):
+    """
+    Signal receiver function to increment Comment.like_count when a CommentLike is created.
+    """
+    if created:
+        adjust_counter(Comment, instance.comment_id, 'like_count', 1)
+
+
+@receiver(post_delete, sender=CommentLike)
+def decrement_comment_like_count(sender, instance, **kwargs):
+    """
+    Signal receiver function to decrement Comment.like_count when a CommentLike is deleted.
+    """
+    adjust_counter(Comment, instance.comment_id, 'like_count', -1)
+
+
+@receiver(post_save, sender=Post)
+def increment_user_post_count(sender, instance, created, **kwargs):
+    """
+    Signal receiver function to increment UserStats.post_count when an active Post is created.
+    Hiding and soft deletion go through HidePostView and DeletePostView, which adjust the counter themselves.
+    """
+    if created and instance.is_active and not instance.is_deleted:
+        adjust_counter(UserStats, instance.owner.user_id, 'post_count', 1)
+
+
+@receiver(post_delete, sender=Post)
+def decrement_user_post_count(sender, instance, **kwargs):
+    """
+    Signal receiver function to decrement UserStats.post_count when an active Post is removed from the database.
+    """
+    if instance.is_active and not instance.is_deleted:
+        adjust_counter(UserStats, instance.owner.user_id, 'post_count', -1)
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_save, sender=Vote)
+@receiver(post_delete, sender=Vote)
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def rescore_post(sender, instance, created=False, **kwargs):
+    """
+    Signal receiver function to recompute the explorer score of a new Post, or of the Post of a Vote or Comment that
+    was created or deleted. Connected last, after the counter receivers, so the score sees the adjusted counters. Bulk
+    writers inside suspend_counters() rescore the posts themselves.
+    """
+    if counters_suspended.get() or (not created and kwargs['signal'] is post_save):
+        return
+    if sender is Post:  # keep the new instance in sync, a later save() of it writes the score back
+        instance.explore_score = refresh_explore_scores([instance.pk]).get(instance.pk, 0)
+    else:
+        refresh_explore_scores([instance.post_id])
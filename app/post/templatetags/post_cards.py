@@ -0,0 +1,30 @@
+from django import template
+
+from app.post.fragments import render_post_cards
+from app.post.models import Vote
+
+"""
+Template tags of the post card lists.
+
+- cached_post_cards: the cached post-only part of every card (see app.post.fragments), as (post, html) pairs.
+- liked_post_ids: the ids of the listed posts liked by the current user, the per-viewer part rendered around the
+  cached fragments (one query per page).
+"""
+
+register = template.Library()
+
+
+@register.simple_tag
+def cached_post_cards(posts, template_name):
+    """Return [(post, html)] for posts, html being template_name rendered for the post (fragment cache)."""
+    return render_post_cards(posts, template_name)
+
+
+@register.simple_tag(takes_context=True)
+def liked_post_ids(context, posts):
+    """Return the set of the ids of posts liked by the user of the request (empty when rendered without a request)."""
+    request = context.get('request')
+    post_ids = [post.pk for post in posts]
+    if request is None or not request.user.is_authenticated or not post_ids:
+        return set()
+    return set(Vote.objects.filter(user=request.user, post_id__in=post_ids).values_list('post_id', flat=True))
@@ -1,7 +1,32 @@
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from io import StringIO
+from unittest import mock, skipUnless
 from django.contrib.auth import get_user_model
-from django.test import TestCase
-from app.account.models import Profile
-from .models import Post, Image, Comment, Vote, CommentLike
+from django.core.management import call_command
+from django.core.cache import cache
+from django.urls import reverse
+from django.db import DatabaseError, connection
+from django.db.models import Value
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.template.loader import render_to_string
+from app.account.models import Profile, Relation
+from app.core.cache import get_redis_client, make_redis_key
+from app.core.pagination import CursorPaginator
+from app.core.text import normalize_text
+from app.core.toggles import toggle_row
+from .feed import drop_timeline, get_timeline_posts
+from .fragments import bump_card_versions, get_card_versions, version_key
+from .like_buffer import buffered_likes_count, flush_like_buffer, flushing_key, post_keys, toggle_like
+from .loaders import post_card_queryset
+from .forms import CreatCommentForm, SearchForm
+from .search import search_posts
+from .search_cache import cached_search_page, result_key, search_cache_metrics
+from .trending import current_minute, refresh_trending, trending_hashtags, trending_posts
+from .hashtags import extract_hashtags
+from .models import Post, Image, Comment, Vote, CommentLike, Hashtag, PostHashtag
 
 User = get_user_model()
 
@@ -54,3 +79,854 @@ class ModelsTestCase(TestCase):
         """Test if comment like model attributes are correctly set"""
         self.assertEqual(self.comment_like.user, self.user)
         self.assertEqual(self.comment_like.comment, self.comment)
+
+
+class TimelineTestCase(TestCase):
+    def setUp(self):
+        """Setting up a reader who follows one author but not another"""
+        self.reader = User.objects.create(username='reader', email='reader@gmail.com', phone_number='09120000001')
+        self.author = User.objects.create(username='author', email='author@gmail.com', phone_number='09120000002')
+        self.stranger = User.objects.create(username='stranger', email='stranger@gmail.com',
+                                            phone_number='09120000003')
+        for user in (self.reader, self.author, self.stranger):
+            Profile.objects.create(user=user, full_name=user.username, name=user.username, last_name=user.username,
+                                   gender='Female', age=30, bio='Hi', profile_picture='profile_picture/test.jpeg')
+        Relation.objects.create(followers=self.reader, following=self.author, is_follow=True)
+        drop_timeline(self.reader.pk)
+
+    def test_timeline_contains_followed_posts(self):
+        """Test the timeline holds posts of followed accounts, newest first, and nothing else"""
+        with self.captureOnCommitCallbacks(execute=True):
+            first = Post.objects.create(owner=self.author.profile, body="First", title="First")
+            second = Post.objects.create(owner=self.author.profile, body="Second", title="Second")
+            Post.objects.create(owner=self.stranger.profile, body="Other", title="Other")
+        self.assertEqual(get_timeline_posts(self.reader.pk), [second, first])
+
+    def test_timeline_pagination(self):
+        """Test the timeline is served one page at a time"""
+        with self.captureOnCommitCallbacks(execute=True):
+            posts = [Post.objects.create(owner=self.author.profile, body=f"Body {i}", title=f"Title {i}")
+                     for i in range(5)]
+        self.assertEqual(get_timeline_posts(self.reader.pk, page=2, page_size=2), [posts[2], posts[1]])
+
+    @override_settings(FEED_FANOUT_FOLLOWER_THRESHOLD=0)
+    def test_timeline_merges_high_follower_posts(self):
+        """Test posts of authors above the fan-out threshold are merged into the timeline at read time"""
+        own = Post.objects.create(owner=self.reader.profile, body="Own", title="Own")
+        get_timeline_posts(self.reader.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            pulled = Post.objects.create(owner=self.author.profile, body="Pulled", title="Pulled")
+        self.assertEqual(get_timeline_posts(self.reader.pk), [pulled, own])
+
+    def test_author_leaving_pull_mode_keeps_pulled_posts(self):
+        """Test posts created while an author was pulled stay in the timeline after the author is pushed again"""
+        with override_settings(FEED_FANOUT_FOLLOWER_THRESHOLD=0):
+            get_timeline_posts(self.reader.pk)
+            with self.captureOnCommitCallbacks(execute=True):
+                pulled = Post.objects.create(owner=self.author.profile, body="Pulled", title="Pulled")
+        with self.captureOnCommitCallbacks(execute=True):
+            pushed = Post.objects.create(owner=self.author.profile, body="Pushed", title="Pushed")
+        self.assertEqual(get_timeline_posts(self.reader.pk), [pushed, pulled])
+
+
+class PostCardLoaderTestCase(TestCase):
+    def setUp(self):
+        """Setting up an author and a reader who votes and comments"""
+        self.author = User.objects.create(username='author', email='author@gmail.com', phone_number='09120000002')
+        self.reader = User.objects.create(username='reader', email='reader@gmail.com', phone_number='09120000001')
+        for user in (self.author, self.reader):
+            Profile.objects.create(user=user, full_name=user.username, name=user.username, last_name=user.username,
+                                   gender='Female', age=30, bio='Hi', profile_picture='profile_picture/test.jpeg')
+
+    def create_posts(self, count):
+        for i in range(count):
+            post = Post.objects.create(owner=self.author.profile, body=f"Body {i}", title=f"Title {i}")
+            Image.objects.create(post_image=post, images=f"image_{i}.jpg")
+            Image.objects.create(post_image=post, images=f"hidden_{i}.jpg", is_active=False)
+            Comment.objects.create(owner=self.reader.profile, post=post, comments="Comment")
+            Vote.objects.create(user=self.reader, post=post)
+
+    def render_cards(self):
+        """Touch everything a post card renders and return the number of queries it took"""
+        with CaptureQueriesContext(connection) as queries:
+            for post in post_card_queryset()[:100]:
+                [image.images.url for image in post.images.all()]
+                (post.owner.user.username, post.owner.profile_picture, post.like_count, post.comment_count)
+        return len(queries)
+
+    def test_constant_query_count(self):
+        """Test a page of 1 post and a page of 100 posts cost the same number of queries"""
+        self.create_posts(1)
+        one_post_queries = self.render_cards()
+        self.create_posts(99)
+        self.assertEqual(self.render_cards(), one_post_queries)
+        self.assertEqual(one_post_queries, 2)
+
+    def test_active_images(self):
+        """Test only active images are prefetched"""
+        self.create_posts(1)
+        post = post_card_queryset().get()
+        self.assertEqual([image.images.name for image in post.images.all()], ["image_0.jpg"])
+
+
+class CountersTestCase(TestCase):
+    def setUp(self):
+        """Setting up a post with a comment"""
+        self.user = User.objects.create(username='pedramkarimi', email='pedram.9060@gmail.com',
+                                        phone_number='09128355747')
+        self.profile = Profile.objects.create(user=self.user, full_name='Pedram Karimi', name='pedram',
+                                              last_name='karimi', gender='Female', age=30, bio='Hi',
+                                              profile_picture='profile_picture/test.jpeg')
+        self.post = Post.objects.create(owner=self.profile, body="Test Body", title="Test Title")
+        self.comment = Comment.objects.create(owner=self.profile, post=self.post, comments="Test Comment")
+
+    def test_counters_follow_writes(self):
+        """Test the counters are incremented and decremented with the Vote, Comment and CommentLike writes"""
+        Vote.objects.create(user=self.user, post=self.post)
+        CommentLike.objects.create(user=self.user, comment=self.comment)
+        self.post.refresh_from_db()
+        self.comment.refresh_from_db()
+        self.assertEqual((self.post.likes_count(), self.post.comments_count()), (1, 1))
+        self.assertEqual(self.comment.count_comment_like(), 1)
+
+        Vote.objects.filter(post=self.post).delete()
+        CommentLike.objects.filter(comment=self.comment).delete()
+        self.post.refresh_from_db()
+        self.comment.refresh_from_db()
+        self.assertEqual(self.post.likes_count(), 0)
+        self.assertEqual(self.comment.count_comment_like(), 0)
+
+    def test_save_keeps_concurrent_increments(self):
+        """Test saving a post or comment loaded before a like does not write its old counters back"""
+        post = Post.objects.get(pk=self.post.pk)
+        comment = Comment.objects.get(pk=self.comment.pk)
+        Vote.objects.create(user=self.user, post=self.post)
+        CommentLike.objects.create(user=self.user, comment=self.comment)
+        post.title = "New Title"
+        post.save()
+        comment.comments = "New Comment"
+        comment.save()
+        self.post.refresh_from_db()
+        self.comment.refresh_from_db()
+        self.assertEqual((self.post.title, self.post.like_count, self.post.comment_count), ("New Title", 1, 1))
+        self.assertEqual((self.comment.comments_text, self.comment.like_count), ("New Comment", 1))
+
+    def test_reconcile_counters(self):
+        """Test reconcile_counters repairs drifted counters"""
+        Vote.objects.create(user=self.user, post=self.post)
+        Post.objects.filter(pk=self.post.pk).update(like_count=7, comment_count=0)
+        call_command('reconcile_counters', stdout=StringIO())
+        self.post.refresh_from_db()
+        self.assertEqual((self.post.like_count, self.post.comment_count), (1, 1))
+
+
+@skipUnless(get_redis_client(), 'The like buffer needs the default cache to be backed by Redis')
+@override_settings(LIKE_BUFFER_ENABLED=True, LIKE_BUFFER_MIN_LIKES=0)
+class LikeBufferTestCase(TestCase):
+    def setUp(self):
+        """Setting up a post and two users"""
+        self.user = User.objects.create(username='pedramkarimi', email='pedram.9060@gmail.com',
+                                        phone_number='09128355747')
+        self.other = User.objects.create(username='rezakarimi', email='reza@gmail.com', phone_number='09128355748')
+        self.profile = Profile.objects.create(user=self.user, full_name='Pedram Karimi', name='pedram',
+                                              last_name='karimi', gender='Female', age=30, bio='Hi',
+                                              profile_picture='profile_picture/test.jpeg')
+        self.post = Post.objects.create(owner=self.profile, body="Test Body", title="Test Title")
+        self.addCleanup(get_redis_client().delete, *post_keys(self.post.pk))
+
+    def test_toggles_are_buffered_until_flush(self):
+        """Test toggles only touch Redis and the flush writes the final state"""
+        self.assertEqual(toggle_like(self.post, self.user), (True, 1))
+        self.assertEqual(toggle_like(self.post, self.other), (True, 2))
+        self.assertEqual(toggle_like(self.post, self.other), (False, 1))
+        self.assertFalse(Vote.objects.filter(post=self.post).exists())
+        self.assertEqual(buffered_likes_count(self.post), 1)
+
+        flush_like_buffer()
+        self.post.refresh_from_db()
+        self.assertEqual(list(Vote.objects.filter(post=self.post).values_list('user_id', flat=True)), [self.user.pk])
+        self.assertEqual(self.post.like_count, 1)
+        self.assertEqual(buffered_likes_count(self.post), 1)
+
+    def test_failed_flush_is_retried(self):
+        """Test toggles claimed by a flush that crashed are written once by the next flush"""
+        toggle_like(self.post, self.user)
+        with mock.patch('app.post.like_buffer.Vote.objects.bulk_create', side_effect=DatabaseError):
+            flush_like_buffer()
+        self.assertTrue(get_redis_client().exists(flushing_key(self.post.pk)))
+
+        toggle_like(self.post, self.other)
+        flush_like_buffer()
+        flush_like_buffer()
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.like_count, 2)
+        self.assertEqual(Vote.objects.filter(post=self.post).count(), 2)
+        self.assertFalse(get_redis_client().exists(flushing_key(self.post.pk)))
+
+
+class ToggleTestCase(TestCase):
+    def setUp(self):
+        """Setting up a post, a comment and a second user"""
+        self.user = User.objects.create(username='pedramkarimi', email='pedram.9060@gmail.com',
+                                        phone_number='09128355747')
+        self.other = User.objects.create(username='rezakarimi', email='reza@gmail.com', phone_number='09128355748')
+        self.profile = Profile.objects.create(user=self.user, full_name='Pedram Karimi', name='pedram',
+                                              last_name='karimi', gender='Female', age=30, bio='Hi',
+                                              profile_picture='profile_picture/test.jpeg')
+        self.post = Post.objects.create(owner=self.profile, body="Test Body", title="Test Title")
+        self.comment = Comment.objects.create(owner=self.profile, post=self.post, comments="Test Comment")
+
+    def test_toggle_like(self):
+        """Test toggling a like inserts then deletes the Vote and keeps the counter in sync"""
+        self.assertEqual(toggle_like(self.post, self.user), (True, 1))
+        self.assertEqual(toggle_like(self.post, self.user), (False, 0))
+        self.assertFalse(Vote.objects.filter(post=self.post).exists())
+
+    def test_put_and_delete_are_idempotent(self):
+        """Test repeated PUT and DELETE requests leave a single state and a correct counter"""
+        self.client.force_login(self.user)
+        url = reverse('like_user', kwargs={'post_id': self.post.pk})
+        for _ in range(3):
+            self.assertEqual(self.client.put(url).json()['likes_count'], 1)
+        self.assertEqual(Vote.objects.filter(post=self.post, user=self.user).count(), 1)
+        for _ in range(3):
+            self.assertEqual(self.client.delete(url).json()['likes_count'], 0)
+        self.assertFalse(Vote.objects.filter(post=self.post).exists())
+
+        url = reverse('like_comment', kwargs={'post_id': self.post.pk, 'comment_id': self.comment.pk})
+        self.client.put(url)
+        self.client.put(url)
+        self.comment.refresh_from_db()
+        self.assertEqual(self.comment.like_count, 1)
+
+    @skipUnless(connection.vendor == 'postgresql', 'The single-statement toggle needs PostgreSQL')
+    def test_toggle_is_one_statement(self):
+        """Test liking and unliking in toggle mode each write the Vote table with a single statement"""
+        for liked in (True, False):
+            with CaptureQueriesContext(connection) as queries:
+                self.assertEqual(toggle_row(Vote, post=self.post, user=self.user), liked)
+            self.assertEqual(len([query for query in queries if '"post_vote"' in query['sql']]), 1)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.like_count, 0)
+
+    def test_toggle_follow(self):
+        """Test the follow toggle replaces an inactive relation and fires the relation signals"""
+        Relation.objects.create(followers=self.other, following=self.user, is_follow=False)
+        self.client.force_login(self.other)
+        url = reverse('follow_user', kwargs={'user_id': self.user.pk, 'post_id': self.post.pk})
+        self.assertTrue(self.client.post(url).json()['is_following'])
+        self.assertTrue(Relation.objects.get(followers=self.other, following=self.user).is_follow)
+        self.assertFalse(self.client.post(url).json()['is_following'])
+        self.assertFalse(self.client.delete(url).json()['is_following'])
+        self.assertFalse(Relation.objects.filter(followers=self.other).exists())
+
+
+@skipUnless(connection.vendor == 'postgresql', 'Concurrent writes need PostgreSQL')
+class ConcurrentToggleTestCase(TransactionTestCase):
+    threads = 16
+    repeats = 5
+
+    def setUp(self):
+        """Setting up one post and one user per thread"""
+        owner = User.objects.create(username='pedramkarimi', email='pedram.9060@gmail.com',
+                                    phone_number='09128355747')
+        profile = Profile.objects.create(user=owner, full_name='Pedram Karimi', name='pedram', last_name='karimi',
+                                         gender='Female', age=30, bio='Hi', profile_picture='profile_picture/test.jpeg')
+        self.post = Post.objects.create(owner=profile, body="Test Body", title="Test Title")
+        self.users = [User.objects.create(username=f'user{i}', email=f'user{i}@gmail.com',
+                                          phone_number=f'0912000{i:04d}') for i in range(self.threads)]
+
+    def hammer(self, liked):
+        """Set the like of every user `repeats` times from its own thread; return the latency of every call."""
+        def run(user):
+            latencies = []
+            try:
+                for _ in range(self.repeats):
+                    start = time.perf_counter()
+                    toggle_like(Post.objects.get(pk=self.post.pk), user, liked=liked)
+                    latencies.append(time.perf_counter() - start)
+            finally:
+                connection.close()
+            return latencies
+
+        with ThreadPoolExecutor(max_workers=self.threads) as executor:
+            return sorted(latency for latencies in executor.map(run, self.users) for latency in latencies)
+
+    def test_concurrent_likes(self):
+        """Test concurrent retries of the same like and unlike never fail and leave an exact final state"""
+        latencies = self.hammer(liked=True)
+        self.post.refresh_from_db()
+        self.assertEqual(Vote.objects.filter(post=self.post).count(), self.threads)
+        self.assertEqual(self.post.like_count, self.threads)
+        self.assertLess(latencies[int(len(latencies) * 0.95) - 1], 1)
+
+        self.hammer(liked=False)
+        self.post.refresh_from_db()
+        self.assertFalse(Vote.objects.filter(post=self.post).exists())
+        self.assertEqual(self.post.like_count, 0)
+
+
+@override_settings(COMMENT_PAGE_SIZE=2)
+class CommentPaginationTestCase(TestCase):
+    def setUp(self):
+        """Setting up a post with comments and replies"""
+        self.user = User.objects.create(username='pedramkarimi', email='pedram.9060@gmail.com',
+                                        phone_number='09128355747')
+        self.profile = Profile.objects.create(user=self.user, full_name='Pedram Karimi', name='pedram',
+                                              last_name='karimi', gender='Female', age=30, bio='Hi',
+                                              profile_picture='profile_picture/test.jpeg')
+        self.post = Post.objects.create(owner=self.profile, body="Test Body", title="Test Title")
+        self.client.force_login(self.user)
+
+    def add_comments(self, count, replies=1):
+        """Create `count` top-level comments, each with `replies` replies"""
+        comments = []
+        for i in range(count):
+            comment = Comment.objects.create(owner=self.profile, post=self.post, comments=f"Comment {i}")
+            for j in range(replies):
+                Comment.objects.create(owner=self.profile, post=self.post, comments=f"Reply {i}.{j}", reply=comment,
+                                       is_reply=True)
+            comments.append(comment)
+        return comments
+
+    def test_detail_renders_first_page(self):
+        """Test the detail page only renders the first page of top-level comments, newest or most liked first"""
+        comments = self.add_comments(3)
+        CommentLike.objects.create(user=self.user, comment=comments[0])
+        response = self.client.get(reverse('post_detail', kwargs={'pk': self.post.pk}))
+        self.assertEqual(list(response.context['comments']), [comments[2], comments[1]])
+        self.assertTrue(response.context['page'].has_next)
+        self.assertNotContains(response, 'Reply 0.0')
+        response = self.client.get(reverse('post_detail', kwargs={'pk': self.post.pk}), {'sort': 'top'})
+        self.assertEqual(response.context['comments'].object_list[0], comments[0])
+
+    def test_more_comments_and_replies(self):
+        """Test the comment and reply endpoints page through everything with the cursors"""
+        comment = self.add_comments(3, replies=3)[0]
+        first = self.client.get(reverse('post_detail', kwargs={'pk': self.post.pk}))
+        data = self.client.get(reverse('post_comments', kwargs={'pk': self.post.pk}),
+                               {'fragment': '1', 'cursor': first.context['page'].next_cursor}).json()
+        self.assertIn('Comment 0', data['html'])
+        self.assertIsNone(data['next_cursor'])
+
+        url = reverse('comment_replies', kwargs={'pk': comment.pk})
+        data = self.client.get(url, {'fragment': '1'}).json()
+        self.assertEqual(re.findall(r'Reply \d\.\d', data['html']), ['Reply 0.0', 'Reply 0.1'])
+        data = self.client.get(url, {'fragment': '1', 'cursor': data['next_cursor']}).json()
+        self.assertEqual(re.findall(r'Reply \d\.\d', data['html']), ['Reply 0.2'])
+
+    def test_bounded_query_count(self):
+        """Test a page of comments costs the same number of queries whatever the number of replies"""
+        url = reverse('post_comments', kwargs={'pk': self.post.pk})
+        self.add_comments(2, replies=1)
+        self.client.get(url, {'fragment': '1'})  # caches the logged-in user (app.account.identity)
+        with CaptureQueriesContext(connection) as few:
+            self.client.get(url, {'fragment': '1'})
+        self.add_comments(2, replies=20)
+        with CaptureQueriesContext(connection) as many:
+            self.client.get(url, {'fragment': '1'})
+        self.assertEqual(len(few), len(many))
+
+
+class HashtagTestCase(TestCase):
+    def setUp(self):
+        """Setting up a user with a profile"""
+        self.user = User.objects.create(username='pedramkarimi', email='pedram.9060@gmail.com',
+                                        phone_number='09128355747')
+        self.profile = Profile.objects.create(user=self.user, full_name='Pedram Karimi', name='pedram',
+                                              last_name='karimi', gender='Female', age=30, bio='Hi',
+                                              profile_picture='profile_picture/test.jpeg')
+        self.client.force_login(self.user)
+
+    def tags(self, post):
+        return set(PostHashtag.objects.filter(post=post).values_list('hashtag__name', flat=True))
+
+    def counts(self):
+        return dict(Hashtag.objects.values_list('name', 'post_count'))
+
+    def test_extract_hashtags(self):
+        """Test tags are normalized and URL fragments are not tags"""
+        self.assertEqual(extract_hashtags('#Django and #django_tips, see https://x.com/a#top',
+                                          '#\u0643\u062a\u0627\u0628\u200c\u062e\u0648\u0627\u0646\u064a'),
+                         {'django', 'django_tips', '\u06a9\u062a\u0627\u0628\u062e\u0648\u0627\u0646\u06cc'})
+
+    def test_tags_follow_post_writes(self):
+        """Test the tags and their counts follow post creation, update and deletion"""
+        first = Post.objects.create(owner=self.profile, title="#Travel", body="<p>Day one <b>#sea</b></p>")
+        second = Post.objects.create(owner=self.profile, title="Trip", body="<p>#travel</p>")
+        self.assertEqual(self.tags(first), {'travel', 'sea'})
+        self.assertEqual(self.counts(), {'travel': 2, 'sea': 1})
+
+        first.body = "<p>#mountain</p>"
+        first.save()
+        self.assertEqual(self.tags(first), {'travel', 'mountain'})
+        self.assertEqual(self.counts(), {'travel': 2, 'sea': 0, 'mountain': 1})
+
+        self.client.post(reverse('delete_post', kwargs={'pk': second.pk}))
+        self.assertEqual(self.tags(second), set())
+        self.assertEqual(self.counts()['travel'], 1)
+
+    def test_hashtag_page(self):
+        """Test the tag page lists the active posts of the tag newest first, pages with the cursor, 404s unknown tags"""
+        posts = [Post.objects.create(owner=self.profile, title=f"Title {i}", body=f"<p>#Sea {i}</p>")
+                 for i in range(3)]
+        Post.objects.create(owner=self.profile, title="Other", body="<p>#land</p>")
+        Post.objects.filter(pk=posts[1].pk).update(is_active=False)
+        url = reverse('hashtag', kwargs={'name': 'SEA'})
+        with self.settings(POST_LIST_PAGE_SIZE=1):
+            response = self.client.get(url)
+            self.assertEqual(list(response.context['post_search']), [posts[2]])
+            data = self.client.get(url, {'fragment': '1', 'cursor': response.context['page'].next_cursor}).json()
+        self.assertIn(f'id="carousel_{posts[0].pk}"', data['html'])
+        self.assertIsNone(data['next_cursor'])
+        self.assertRedirects(self.client.get(reverse('hashtag', kwargs={'name': 'unknown'})), reverse('home'),
+                             fetch_redirect_response=False)  # 404, turned into a redirect by LoginRequiredMiddleware
+
+    def test_extract_hashtags_command(self):
+        """Test the command indexes existing posts and repairs stale tags"""
+        post = Post.objects.create(owner=self.profile, title="#one", body="<p>#two</p>")
+        PostHashtag.objects.all().delete()
+        Post.objects.filter(pk=post.pk).update(title="#three")
+        call_command('extract_hashtags', stdout=StringIO())
+        self.assertEqual(self.tags(post), {'two', 'three'})
+        self.assertEqual(self.counts(), {'one': 0, 'two': 1, 'three': 1})
+
+
+class TrendingTestCase(TestCase):
+    def setUp(self):
+        """Setting up a user and three posts"""
+        self.user = User.objects.create(username='pedramkarimi', email='pedram.9060@gmail.com',
+                                        phone_number='09128355747')
+        self.profile = Profile.objects.create(user=self.user, full_name='Pedram Karimi', name='pedram',
+                                              last_name='karimi', gender='Female', age=30, bio='Hi',
+                                              profile_picture='profile_picture/test.jpeg')
+        self.posts = [Post.objects.create(owner=self.profile, title=f"Title {i}", body=f"<p>Body {i}</p>")
+                      for i in range(3)]
+        client = get_redis_client()
+        if client is not None:
+            for key in client.scan_iter(make_redis_key('trending:*')):
+                client.delete(key)
+
+    def activity(self, post, votes=0, comments=0, body=None):
+        """Record a body update, votes and comments of post as committed writes"""
+        with self.captureOnCommitCallbacks(execute=True):
+            if body:
+                post.body = body
+                post.save()
+            for _ in range(votes):
+                voter = User.objects.count()
+                user = User.objects.create(username=f'voter{voter}', email=f'voter{voter}@gmail.com',
+                                           phone_number=f'0911{voter:07d}')
+                Vote.objects.create(user=user, post=post)
+            for i in range(comments):
+                Comment.objects.create(owner=self.profile, post=post, comments=f"Comment {i}")
+
+    @skipUnless(get_redis_client(), 'Trending counts need the default cache to be backed by Redis')
+    def test_trending_follows_recent_activity(self):
+        """Test posts and tags are ranked by weighted activity and older minutes weigh less"""
+        minute = current_minute()
+        with mock.patch('app.post.trending.current_minute', return_value=minute - 30):
+            self.activity(self.posts[0], votes=5, body="<p>#old</p>")
+        with mock.patch('app.post.trending.current_minute', return_value=minute):
+            self.activity(self.posts[1], votes=1, comments=1, body="<p>#new #old</p>")
+            self.activity(self.posts[2], votes=1)
+            self.assertEqual(trending_posts(), [self.posts[1], self.posts[0], self.posts[2]])
+            self.assertEqual([hashtag.name for hashtag in trending_hashtags()], ['old', 'new'])
+
+            self.activity(self.posts[2], votes=3)
+            self.assertEqual(trending_posts()[0], self.posts[1])  # the list is rebuilt once per minute
+        with mock.patch('app.post.trending.current_minute', return_value=minute + 1):
+            get_redis_client().delete(make_redis_key('trending:posts:refresh'))
+            self.assertEqual(trending_posts(limit=1), [self.posts[2]])
+
+    @skipUnless(get_redis_client(), 'Trending counts need the default cache to be backed by Redis')
+    @override_settings(TRENDING_WINDOW_MINUTES=10)
+    def test_activity_leaves_the_window(self):
+        """Test activity older than the window does not count"""
+        minute = current_minute()
+        with mock.patch('app.post.trending.current_minute', return_value=minute - 10):
+            self.activity(self.posts[0], votes=1)
+        with mock.patch('app.post.trending.current_minute', return_value=minute):
+            self.assertEqual(trending_posts(), [])
+
+    @skipUnless(get_redis_client(), 'Trending counts need the default cache to be backed by Redis')
+    def test_empty_list_is_rebuilt_once_a_minute(self):
+        """Test reads of an empty trending list do not rebuild it until the next minute"""
+        with mock.patch('app.post.trending.refresh_trending', wraps=refresh_trending) as refresh:
+            self.assertEqual(trending_posts(), [])
+            self.assertEqual(trending_posts(), [])
+        self.assertEqual(refresh.call_count, 1)
+
+    @skipUnless(get_redis_client() is None, 'Tests the database fallback')
+    def test_trending_without_redis(self):
+        """Test the explorer falls back to the most liked recent posts and the most used hashtags"""
+        self.activity(self.posts[0], votes=1, body="<p>#sea</p>")
+        self.activity(self.posts[1], votes=2, body="<p>#sea #land</p>")
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('explorer'))
+        self.assertEqual(response.context['trending_posts'][:2], [self.posts[1], self.posts[0]])
+        self.assertEqual([hashtag.name for hashtag in response.context['trending_hashtags']], ['sea', 'land'])
+        self.assertContains(response, reverse('hashtag', kwargs={'name': 'sea'}))
+
+
+class ExploreRankingTestCase(TestCase):
+    def setUp(self):
+        """Setting up an author, a reader and three posts"""
+        self.author = User.objects.create(username='author', email='author@gmail.com', phone_number='09120000002')
+        self.reader = User.objects.create(username='reader', email='reader@gmail.com', phone_number='09120000001')
+        for user in (self.author, self.reader):
+            Profile.objects.create(user=user, full_name=user.username, name=user.username, last_name=user.username,
+                                   gender='Female', age=30, bio='Hi', profile_picture='profile_picture/test.jpeg')
+        self.posts = [Post.objects.create(owner=self.author.profile, title=f"Title {i}", body=f"Body {i}")
+                      for i in range(3)]
+        self.client.force_login(self.reader)
+        cache.clear()
+
+    def scores(self):
+        return list(Post.objects.order_by('pk').values_list('explore_score', flat=True))
+
+    def test_scores_follow_votes_and_comments(self):
+        """Test new posts rank first and votes and comments move a post up, deletions move it back"""
+        first, second, third = self.scores()
+        self.assertTrue(first < second < third)
+        Vote.objects.create(user=self.reader, post=self.posts[0])
+        comment = Comment.objects.create(owner=self.reader.profile, post=self.posts[0], comments="Comment")
+        self.assertGreater(self.scores()[0], first)
+        comment.delete()
+        Vote.objects.filter(post=self.posts[0]).delete()
+        self.assertAlmostEqual(self.scores()[0], first)
+
+    @override_settings(EXPLORE_TIME_SCALE=10 ** 9)
+    def test_explorer_reads_ranked_pages(self):
+        """Test the explorer lists active posts by score and pages with the cursor"""
+        call_command('rebuild_explore_scores', stdout=StringIO())
+        for post in self.posts[:2]:
+            Vote.objects.create(user=self.reader, post=post)
+        Comment.objects.create(owner=self.reader.profile, post=self.posts[0], comments="Comment")
+        Post.objects.filter(pk=self.posts[1].pk).update(is_active=False)
+        url = reverse('explorer')
+        with self.settings(POST_LIST_PAGE_SIZE=1):
+            response = self.client.get(url)
+            self.assertEqual(list(response.context['post_search']), [self.posts[0]])
+            data = self.client.get(url, {'fragment': '1', 'cursor': response.context['page'].next_cursor}).json()
+        self.assertIn(f'id="carousel_{self.posts[2].pk}"', data['html'])
+        self.assertIsNone(data['next_cursor'])
+
+    def test_explorer_pages_cached(self):
+        """Test explorer pages are computed once, and a new post invalidates them"""
+        with mock.patch('app.post.ranking.CursorPaginator', wraps=CursorPaginator) as paginator:
+            first = self.client.get(reverse('explorer'))
+            self.assertEqual(list(self.client.get(reverse('explorer')).context['post_search']),
+                             list(first.context['post_search']))
+            self.assertEqual(paginator.call_count, 1)
+            with self.captureOnCommitCallbacks(execute=True):
+                new = Post.objects.create(owner=self.author.profile, title="New", body="Body")
+            self.assertIn(new, self.client.get(reverse('explorer')).context['post_search'])
+            self.assertEqual(paginator.call_count, 2)
+
+
+class PostCardCacheTestCase(TestCase):
+    def setUp(self):
+        """Setting up an author, a reader and a post with an image"""
+        self.author = User.objects.create(username='author', email='author@gmail.com', phone_number='09120000002')
+        self.reader = User.objects.create(username='reader', email='reader@gmail.com', phone_number='09120000001')
+        for user in (self.author, self.reader):
+            Profile.objects.create(user=user, full_name=user.username, name=user.username, last_name=user.username,
+                                   gender='Female', age=30, bio='Hi', profile_picture='profile_picture/test.jpeg')
+        self.post = Post.objects.create(owner=self.author.profile, body="Body", title="Title")
+        Image.objects.create(post_image=self.post, images="image_0.jpg")
+        cache.clear()
+
+    def render(self):
+        """Render the explorer cards of the post and return (html, number of card templates rendered)"""
+        with mock.patch('app.post.fragments.render_to_string', wraps=render_to_string) as render:
+            html = render_to_string('explorer/explorer_cards.html', {'post_search': post_card_queryset()})
+        return html, render.call_count
+
+    def test_cards_are_reused_until_the_post_changes(self):
+        """Test a card is rendered once, then served from the cache until a vote, comment or image changes it"""
+        html, rendered = self.render()
+        self.assertEqual(rendered, 1)
+        self.assertEqual(self.render(), (html, 0))
+
+        for write in (lambda: Vote.objects.create(user=self.reader, post=self.post),
+                      lambda: Comment.objects.create(owner=self.reader.profile, post=self.post, comments="Hi"),
+                      lambda: Image.objects.create(post_image=self.post, images="image_1.jpg")):
+            with self.captureOnCommitCallbacks(execute=True):
+                write()
+            html, rendered = self.render()
+            self.assertEqual(rendered, 1)
+        self.assertIn('1 likes &middot; 1 comments', html)
+        self.assertIn('image_1.jpg', html)
+
+    def test_write_during_render_is_not_cached_as_current(self):
+        """Test a card rendered from a row loaded before a write is never served after it"""
+        posts = list(post_card_queryset())
+        with self.captureOnCommitCallbacks(execute=True):
+            Vote.objects.create(user=self.reader, post=self.post)  # commits after the page was loaded
+        render_to_string('explorer/explorer_cards.html', {'post_search': posts})
+        self.assertIn('1 likes &middot; 0 comments', self.render()[0])
+
+    def test_missing_version_does_not_overwrite_a_bump(self):
+        """Test a version created by a concurrent bump wins over the one being started"""
+        with mock.patch('app.post.fragments.cache.get_many', return_value={}):
+            bump_card_versions([self.post.pk])
+            self.assertEqual(get_card_versions([self.post.pk]), {self.post.pk: cache.get(version_key(self.post.pk))})
+
+    def test_liked_by_viewer_is_not_cached(self):
+        """Test the "liked" bit of a cached card is rendered for each viewer"""
+        Vote.objects.create(user=self.reader, post=self.post)
+        self.client.force_login(self.reader)
+        self.assertContains(self.client.get(reverse('explorer')), 'You liked this post')
+        self.client.force_login(self.author)
+        response = self.client.get(reverse('explorer'))
+        self.assertContains(response, f'id="carousel_{self.post.pk}"')
+        self.assertNotContains(response, 'You liked this post')
+
+
+class PlainTextTestCase(TestCase):
+    def setUp(self):
+        """Setting up a user with a profile"""
+        self.user = User.objects.create(username='pedramkarimi', email='pedram.9060@gmail.com',
+                                        phone_number='09128355747')
+        self.profile = Profile.objects.create(user=self.user, full_name='Pedram Karimi', name='pedram',
+                                              last_name='karimi', gender='Female', age=30, bio='<p>Hi <b>there</b></p>',
+                                              profile_picture='profile_picture/test.jpeg')
+
+    def test_shadow_fields_on_save(self):
+        """Test the plain-text fields are computed on save, also when only the rich text field is saved"""
+        post = Post.objects.create(owner=self.profile, body="<p>Test&nbsp;<em>Body</em></p>", title="Test Title")
+        comment = Comment.objects.create(owner=self.profile, post=post, comments="<p>Nice</p>")
+        self.assertEqual((self.profile.bio_text, post.body_text, comment.comments_text),
+                         ('Hi there', 'Test Body', 'Nice'))
+        post.body = '<p>Changed</p>'
+        post.save(update_fields=['body'])
+        post.refresh_from_db()
+        self.assertEqual(post.body_text, 'Changed')
+
+    def test_backfill_command(self):
+        """Test the backfill command fills stale shadow fields"""
+        post = Post.objects.create(owner=self.profile, body="<p>Old body</p>", title="Test Title")
+        Post.objects.filter(pk=post.pk).update(body_text='')
+        call_command('backfill_plain_text', stdout=StringIO())
+        post.refresh_from_db()
+        self.assertEqual(post.body_text, 'Old body')
+
+    def test_cards_defer_the_body(self):
+        """Test post cards load the plain-text excerpt but not the HTML body"""
+        Post.objects.create(owner=self.profile, body="<p>Test body</p>", title="Test Title")
+        post = post_card_queryset().get()
+        self.assertIn('body', post.get_deferred_fields())
+        self.assertEqual(post.body_text, 'Test body')
+
+    def test_comment_length_counts_visible_text(self):
+        """Test the comment form limits the visible text of a comment, not its markup"""
+        self.assertTrue(CreatCommentForm({'comments': f'<p><strong>{"x" * 500}</strong></p>'}).is_valid())
+        self.assertFalse(CreatCommentForm({'comments': f'<p>{"x" * 501}</p>'}).is_valid())
+        self.assertFalse(CreatCommentForm({'comments': '<p> </p>'}).is_valid())
+        self.assertTrue(CreatCommentForm({'comments': ''}).is_valid())
+
+
+class CommentTreeTestCase(TestCase):
+    def setUp(self):
+        """Setting up a post with a reply chain: root -> child -> grandchild, and a second root"""
+        self.user = User.objects.create(username='pedramkarimi', email='pedram.9060@gmail.com',
+                                        phone_number='09128355747')
+        self.profile = Profile.objects.create(user=self.user, full_name='Pedram Karimi', name='pedram',
+                                              last_name='karimi', gender='Female', age=30, bio='Hi',
+                                              profile_picture='profile_picture/test.jpeg')
+        self.post = Post.objects.create(owner=self.profile, body="Test Body", title="Test Title")
+        self.root = Comment.objects.create(owner=self.profile, post=self.post, comments="Root")
+        self.child = Comment.objects.create(owner=self.profile, post=self.post, comments="Child", reply=self.root,
+                                            is_reply=True)
+        self.grandchild = Comment.objects.create(owner=self.profile, post=self.post, comments="Grandchild",
+                                                 reply=self.child, is_reply=True)
+        self.other = Comment.objects.create(owner=self.profile, post=self.post, comments="Other")
+
+    def test_path_set_on_insert(self):
+        """Test a new comment gets the path of its parent followed by its own id"""
+        self.grandchild.refresh_from_db()
+        self.assertEqual(self.root.path, f'{self.root.pk:010d}/')
+        self.assertEqual(self.grandchild.path,
+                         f'{self.root.pk:010d}/{self.child.pk:010d}/{self.grandchild.pk:010d}/')
+
+    def test_subtree_and_descendants_count(self):
+        """Test the subtree of a comment holds all of its replies at any depth and nothing else"""
+        self.assertEqual(set(self.root.subtree()), {self.root, self.child, self.grandchild})
+        self.assertEqual(self.root.descendants_count(), 2)
+        self.assertEqual(self.child.descendants_count(), 1)
+        self.assertEqual(self.other.descendants_count(), 0)
+
+    def test_delete_branch(self):
+        """Test deleting a comment soft deletes its whole branch and updates the comment count"""
+        self.client.force_login(self.user)
+        self.client.post(reverse('delete_comment', kwargs={'pk': self.child.pk}))
+        self.assertEqual(list(Comment.objects.filter(post=self.post).order_by('pk')), [self.root, self.other])
+        self.assertTrue(Comment.objects.archive().get(pk=self.grandchild.pk).is_deleted)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comment_count, 2)
+
+    @override_settings(COMMENT_MAX_DEPTH=3)
+    def test_reply_depth_capped(self):
+        """Test a reply to a comment at the maximum depth is added next to it instead of below it"""
+        self.client.force_login(self.user)
+        self.grandchild.refresh_from_db()
+        self.client.post(reverse('reply_comment', kwargs={'pk': self.grandchild.pk}), {'comments': 'Deeper'})
+        reply = Comment.objects.get(comments_text='Deeper')
+        self.assertEqual(reply.reply_id, self.child.pk)
+        self.assertEqual(reply.depth(), 3)
+        self.client.post(reverse('reply_comment', kwargs={'pk': self.child.pk}), {'comments': 'Nested'})
+        self.assertEqual(Comment.objects.get(comments_text='Nested').depth(), 3)
+
+
+@skipUnless(connection.vendor == 'postgresql', 'The search vector trigger and trigram indexes need PostgreSQL')
+class SearchTestCase(TestCase):
+    def setUp(self):
+        """Setting up posts to search"""
+        self.user = User.objects.create(username='pedramkarimi', email='pedram.9060@gmail.com',
+                                        phone_number='09128355747')
+        self.profile = Profile.objects.create(user=self.user, full_name='Pedram Karimi', name='pedram',
+                                              last_name='karimi', gender='Female', age=30, bio='Hi',
+                                              profile_picture='profile_picture/test.jpeg')
+        self.in_title = Post.objects.create(owner=self.profile, title="Sunset over Tehran", body="<p>Evening</p>")
+        self.in_body = Post.objects.create(owner=self.profile, title="Evening walk",
+                                           body="<p>A <strong>sunset</strong> by the river</p>")
+        self.other = Post.objects.create(owner=self.profile, title="Breakfast", body="<p>Eggs and bread</p>")
+
+    def test_search_vector_maintained_by_trigger(self):
+        """Test the search vector is filled on insert and follows updates of the body"""
+        self.other.body = "<p>Sunset breakfast</p>"
+        self.other.save()
+        self.assertEqual(set(search_posts(Post.objects.all(), 'sunset')), {self.in_title, self.in_body, self.other})
+
+    def test_search_ranks_and_ignores_markup(self):
+        """Test title matches rank first, typos still match and HTML tags are not searchable"""
+        ranked = list(search_posts(Post.objects.all(), 'sunset').order_by('-rank', '-id'))
+        self.assertEqual(ranked, [self.in_title, self.in_body])
+        self.assertIn(self.in_title, search_posts(Post.objects.all(), 'sunsett'))
+        self.assertFalse(search_posts(Post.objects.all(), 'strong').exists())
+
+
+# (document title, query) pairs written with different keyboards, digits and ZWNJ conventions. Every query must find
+# its document.
+SEARCH_CORPUS = [
+    ('کتاب‌های فارسی', 'كتاب هاي فارسي'),
+    ('علی و دوستان', 'علي'),
+    ('سفر به شیراز ۱۴۰۲', 'شيراز 1402'),
+    ('نمایشگاه ٢٠٢٤', 'نمایشگاه ۲۰۲۴'),
+    ('مدرسهٔ ما', 'مدرسه'),
+    ('سَلامٌ عَلَیکُم', 'سلام علیکم'),
+    ('می‌روم خانه', 'میروم'),
+    ('Running in Tehran', 'run tehran'),
+]
+
+
+class SearchFormTestCase(TestCase):
+    def test_query_normalized(self):
+        """Test the search form normalizes the query and rejects queries with nothing to search"""
+        form = SearchForm({'search': ' كتاب   علي '})
+        self.assertTrue(form.is_valid())
+        self.assertEqual(form.cleaned_data['search'], 'کتاب علی')
+        self.assertFalse(SearchForm({'search': '‌َ'}).is_valid())
+
+
+@skipUnless(connection.vendor == 'postgresql', 'The persian_english configuration and search_normalize need PostgreSQL')
+class SearchCorpusTestCase(TestCase):
+    def setUp(self):
+        """Setting up one post per corpus document and some unrelated posts"""
+        self.user = User.objects.create(username='pedramkarimi', email='pedram.9060@gmail.com',
+                                        phone_number='09128355747')
+        self.profile = Profile.objects.create(user=self.user, full_name='Pedram Karimi', name='pedram',
+                                              last_name='karimi', gender='Female', age=30, bio='Hi',
+                                              profile_picture='profile_picture/test.jpeg')
+        self.posts = [Post.objects.create(owner=self.profile, title=title, body='<p>body</p>')
+                      for title, _ in SEARCH_CORPUS]
+        Post.objects.bulk_create(Post(owner=self.profile, title=f'unrelated {i}', body='<p>nothing</p>')
+                                 for i in range(200))
+
+    def test_normalization_matches_database(self):
+        """Test search_normalize() in the database agrees with normalize_text"""
+        with connection.cursor() as cursor:
+            for title, query in SEARCH_CORPUS:
+                cursor.execute('SELECT search_normalize(%s)', [query])
+                self.assertEqual(' '.join(cursor.fetchone()[0].split()), normalize_text(query))
+
+    def test_recall_and_latency(self):
+        """Test every corpus query finds its post, fast enough to serve a search page"""
+        found = 0
+        timings = []
+        for post, (_, query) in zip(self.posts, SEARCH_CORPUS):
+            start = time.perf_counter()
+            results = list(search_posts(Post.objects.all(), query).order_by('-rank', '-id')[:20])
+            timings.append(time.perf_counter() - start)
+            found += post in results
+        self.assertEqual(found / len(SEARCH_CORPUS), 1.0)
+        self.assertLess(sorted(timings)[int(len(timings) * 0.95) - 1], 0.2)
+
+
+def fake_search_posts(queryset, query):
+    """Stand-in for search_posts on databases without the PostgreSQL search operators"""
+    return queryset.filter(title__icontains=query).annotate(rank=Value(1.0))
+
+
+@mock.patch('app.post.search_cache.search_posts', side_effect=fake_search_posts)
+class SearchCacheTestCase(TestCase):
+    def setUp(self):
+        """Setting up searchable posts and an empty cache"""
+        cache.clear()
+        self.user = User.objects.create(username='pedramkarimi', email='pedram.9060@gmail.com',
+                                        phone_number='09128355747')
+        self.profile = Profile.objects.create(user=self.user, full_name='Pedram Karimi', name='pedram',
+                                              last_name='karimi', gender='Female', age=30, bio='Hi',
+                                              profile_picture='profile_picture/test.jpeg')
+        self.posts = [Post.objects.create(owner=self.profile, title=f'sunset {i}', body='<p>body</p>')
+                      for i in range(3)]
+
+    def search(self, cursor=None):
+        return cached_search_page(Post.objects.all(), 'sunset', cursor, 2, 'all')
+
+    def test_hit_after_miss(self, search):
+        """Test the second identical search is served from the cache, next pages are cached separately"""
+        first = self.search()
+        again = self.search()
+        self.assertEqual(again.object_list, first.object_list)
+        self.assertEqual(again.next_cursor, first.next_cursor)
+        self.search(first.next_cursor)
+        self.assertEqual(search.call_count, 2)
+        metrics = search_cache_metrics()
+        self.assertEqual((metrics['hits'], metrics['misses']), (1, 2))
+        self.assertAlmostEqual(metrics['hit_ratio'], 1 / 3)
+
+    def test_post_write_invalidates(self, search):
+        """Test creating a post bumps the generation so the next search sees it"""
+        self.search()
+        with self.captureOnCommitCallbacks(execute=True):
+            new = Post.objects.create(owner=self.profile, title='sunset new', body='<p>body</p>')
+        self.assertIn(new, self.search().object_list + self.search(self.search().next_cursor).object_list)
+        self.assertEqual(search_cache_metrics()['misses'], 3)
+
+    def test_stale_entry_served_while_refreshing(self, search):
+        """Test a stale entry is served to everyone but the request refreshing it"""
+        with override_settings(SEARCH_CACHE_TIMEOUT=0):
+            self.search()
+            cache.set(f"{result_key('all', 'sunset', None, 2)}:refresh", 1)  # another request is refreshing
+            self.search()
+            self.assertEqual(search.call_count, 1)
+            cache.delete(f"{result_key('all', 'sunset', None, 2)}:refresh")
+            self.search()
+            self.assertEqual(search.call_count, 2)
+        self.assertEqual(search_cache_metrics()['stale_hits'], 1)
+
+    def test_hidden_post_dropped_from_cached_page(self, search):
+        """Test a cached page is loaded through the queryset, so posts hidden since then are not shown"""
+        page = self.search()
+        Post.objects.filter(pk=page.object_list[0].pk).update(is_active=False)
+        self.assertEqual(self.search().object_list, page.object_list[1:])
+
+    def test_explorer_uses_cache(self, search):
+        """Test Explorer searches go through the result cache"""
+        self.client.force_login(self.user)
+        for _ in range(2):
+            response = self.client.get(reverse('explorer'), {'search': 'SUNSET'})
+        self.assertEqual(len(response.context['post_search']), 3)
+        self.assertEqual(search.call_count, 1)
@@ -0,0 +1,150 @@
+import logging
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+from redis.exceptions import RedisError
+
+from app.core.cache import get_redis_client, make_redis_key
+from app.post.loaders import post_card_queryset
+from app.post.models import Hashtag, Post
+
+"""
+Trending hashtags and posts over a sliding window, kept in Redis.
+
+Activity is counted in one sorted set per kind and per minute, `trending:<kind>:<minute>` (member: hashtag or post
+id, score: weighted number of events in that minute):
+- `tags`: a hashtag was added to a post (sync_post_hashtags),
+- `posts`: a post was liked (VOTE_WEIGHT) or commented (COMMENT_WEIGHT).
+Recording an event is one ZINCRBY; the buckets expire once they leave the window of settings.TRENDING_WINDOW_MINUTES.
+
+The trending list of a kind, `trending:<kind>:top`, is the sum of the buckets of the window, each weighted by
+settings.TRENDING_DECAY ** (its age in minutes), trimmed to the settings.TRENDING_SIZE best members. It is rebuilt
+inside Redis (ZUNIONSTORE of the TRENDING_WINDOW_MINUTES buckets, one Lua script) in the request path, by the reader
+that takes the `trending:<kind>:refresh` lock, so at most once a minute per kind; every other read is a single
+ZREVRANGE, and the explorer never aggregates votes or comments in the database. The lock, not the list, marks the
+minute as done: an empty result (Redis drops an empty sorted set) is served as such until the next minute instead of
+being rebuilt by every read. The buckets only hold the members active during their minute, so the long tail costs
+memory for one window at most and the top list stays bounded.
+
+Without Redis the lists fall back to a database query on the denormalized counters.
+"""
+
+logger = logging.getLogger(__name__)
+
+TAG_WEIGHT = 1
+VOTE_WEIGHT = 1
+COMMENT_WEIGHT = 2
+
+# Replace the trending list KEYS[1] with the sum of the buckets KEYS[2..n] weighted by ARGV[3..n+1], keep its ARGV[1]
+# best members and let it expire after ARGV[2] seconds. Runs atomically, so readers never see it half-built.
+REFRESH_SCRIPT = """
+local buckets = #KEYS - 1
+local args = {'ZUNIONSTORE', KEYS[1], buckets}
+for i = 2, #KEYS do
+    table.insert(args, KEYS[i])
+end
+table.insert(args, 'WEIGHTS')
+for i = 3, #ARGV do
+    table.insert(args, ARGV[i])
+end
+redis.call(unpack(args))
+redis.call('ZREMRANGEBYRANK', KEYS[1], 0, -(tonumber(ARGV[1]) + 1))
+redis.call('EXPIRE', KEYS[1], ARGV[2])
+return redis.call('ZCARD', KEYS[1])
+"""
+
+
+def current_minute():
+    """Return the number of the current minute since the epoch (the bucket events are counted in)."""
+    return int(time.time() // 60)
+
+
+def bucket_key(kind, minute):
+    """Return the Redis key of the counts of one kind during one minute."""
+    return make_redis_key(f'trending:{kind}:{minute}')
+
+
+def top_key(kind):
+    """Return the Redis key of the precomputed trending list of one kind."""
+    return make_redis_key(f'trending:{kind}:top')
+
+
+def refresh_key(kind):
+    """Return the Redis key of the lock taken by the reader that rebuilds the trending list of a kind this minute."""
+    return make_redis_key(f'trending:{kind}:refresh')
+
+
+def record_events(kind, member_ids, weight=1):
+    """
+    Count one event of weight for each of member_ids in the bucket of the current minute (one pipeline).
+    Does nothing without Redis; errors are logged, trending is never worth failing a write for.
+    """
+    client = get_redis_client()
+    if client is None or not member_ids:
+        return
+    key = bucket_key(kind, current_minute())
+    try:
+        pipe = client.pipeline(transaction=False)
+        for member_id in member_ids:
+            pipe.zincrby(key, weight, member_id)
+        pipe.expire(key, (settings.TRENDING_WINDOW_MINUTES + 1) * 60)
+        pipe.execute()
+    except RedisError as e:
+        logger.error(f"Failed to record trending {kind} {list(member_ids)}: {e}")
+
+
+def refresh_trending(client, kind):
+    """
+    Rebuild the trending list of a kind from the buckets of the window, decayed per minute, and trim it.
+    Returns the number of members in the list.
+    """
+    minute = current_minute()
+    ages = range(settings.TRENDING_WINDOW_MINUTES)
+    refresh = client.register_script(REFRESH_SCRIPT)
+    return refresh(keys=[top_key(kind), *(bucket_key(kind, minute - age) for age in ages)],
+                   args=[settings.TRENDING_SIZE, settings.TRENDING_WINDOW_MINUTES * 60,
+                         *(settings.TRENDING_DECAY ** age for age in ages)])
+
+
+def get_trending_ids(kind, limit):
+    """
+    Return the ids of the `limit` most trending members of a kind, best first, rebuilding the list when it is older
+    than a minute (an empty list included). Returns None when Redis is not available.
+    """
+    client = get_redis_client()
+    if client is None:
+        return None
+    try:
+        if client.set(refresh_key(kind), 1, nx=True, ex=60):
+            refresh_trending(client, kind)
+        return [int(member) for member in client.zrevrange(top_key(kind), 0, limit - 1)]
+    except RedisError as e:
+        logger.error(f"Failed to read trending {kind}: {e}")
+        return None
+
+
+def trending_hashtags(limit=None):
+    """Return the trending hashtags, best first (the most used hashtags without Redis)."""
+    limit = limit or settings.TRENDING_PAGE_SIZE
+    hashtag_ids = get_trending_ids('tags', limit)
+    if hashtag_ids is None:
+        return list(Hashtag.objects.filter(post_count__gt=0).order_by('-post_count', 'name')[:limit])
+    hashtags = Hashtag.objects.filter(post_count__gt=0).in_bulk(hashtag_ids)
+    return [hashtags[hashtag_id] for hashtag_id in hashtag_ids if hashtag_id in hashtags]
+
+
+def trending_posts(limit=None):
+    """
+    Return the trending active posts loaded for the post cards, best first (without Redis: the most liked and
+    commented posts created during the window).
+    """
+    limit = limit or settings.TRENDING_PAGE_SIZE
+    post_ids = get_trending_ids('posts', limit)
+    if post_ids is None:
+        since = timezone.now() - timedelta(minutes=settings.TRENDING_WINDOW_MINUTES)
+        return list(post_card_queryset(Post.objects.filter(create_time__gte=since)).order_by(
+            '-like_count', '-comment_count', '-id')[:limit])
+    posts = post_card_queryset().in_bulk(post_ids)
+    return [posts[post_id] for post_id in post_ids if post_id in posts]
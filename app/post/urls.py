@@ -1,6 +1,7 @@
 from django.urls import path
 from app.post.views import HomePostView, UpdatePostView, DeletePostView, Explorer, CreatePostView, FollowUserView, \
-    PostLikeView, PostDetailView, ReplyCommentView, DeleteCommentView, CommentLikeView, ReplyCommentLike, HidePostView
+    PostLikeView, PostDetailView, ReplyCommentView, DeleteCommentView, CommentLikeView, ReplyCommentLike, HidePostView, \
+    TimelineView, CommentListView, ReplyListView, HashtagView
 
 """
 Defines URL patterns for the application.
@@ -9,8 +10,12 @@ Attributes:
 - createpost/ (path): Maps to CreatePostView for creating a new post.
 - show_post/<int:pk>/ (path): Maps to HomePostView for displaying a specific post.
 - post_detail/<int:pk>/ (path): Maps to PostDetailView for displaying a specific post and comments.
+- post_detail/<int:pk>/comments/ (path): Maps to CommentListView for the next pages of comments of a post.
 - explorer/<int:pk>/ (path): Maps to Explorer for exploring posts.
+- timeline/ (path): Maps to TimelineView for the home timeline of followed accounts.
+- tags/<str:name>/ (path): Maps to HashtagView for the posts of a hashtag.
 - comment/<int:pk>/reply/ (path): Maps to ReplyCommentView for replying to a comment.
+- comment/<int:pk>/replies/ (path): Maps to ReplyListView for the pages of replies of a comment.
 - follow/<int:pk>/ (path): Maps to FollowUserView for following a user.
 - like/<int:post_id>/ (path): Maps to PostLikeView for liking a post.
 - like/<int:post_id>/<int:comment_id>/ (path): Maps to CommentLikeView for liking a comment.
@@ -24,16 +29,24 @@ urlpatterns = [
     # Explorer URL
     path('explorer/', Explorer.as_view(), name="explorer"),
 
+    # Timeline URL
+    path('timeline/', TimelineView.as_view(), name="timeline"),
+
+    # Hashtag URL
+    path('tags/<str:name>/', HashtagView.as_view(), name="hashtag"),
+
     # Post related URLs
     path('createpost/', CreatePostView.as_view(), name='create_post'),
     path('hide_post/<int:pk>/', HidePostView.as_view(), name='hide_post'),  # noqa
     path('show_post/<int:pk>/', HomePostView.as_view(), name='show_post'),
     path('post_detail/<int:pk>/', PostDetailView.as_view(), name='post_detail'),
+    path('post_detail/<int:pk>/comments/', CommentListView.as_view(), name='post_comments'),
     path('post/<int:pk>/update/', UpdatePostView.as_view(), name='update_post'),
     path('post/<int:pk>/delete/', DeletePostView.as_view(), name='delete_post'),
 
     # Comment related URLs
     path('comment/<int:pk>/reply/', ReplyCommentView.as_view(), name='reply_comment'),
+    path('comment/<int:pk>/replies/', ReplyListView.as_view(), name='comment_replies'),
     path('comment/<int:pk>/delete/', DeleteCommentView.as_view(), name='delete_comment'),
 
     # Like related URLs
@@ -1,33 +1,49 @@
-from django.contrib.postgres.search import TrigramSimilarity
 from django.views.generic import DetailView
 from app.post.forms import SearchForm
-from django.core.exceptions import ObjectDoesNotExist
 from django.urls import reverse_lazy
-from app.account.models import User, Profile, Relation
-from app.core.mixin import HttpsOptionNotLogoutMixin as MustBeLogingCustomView
+from app.account.identity import get_active_profile
+from app.account.models import User, Relation, UserStats
+from app.core.mixin import HttpsOptionNotLogoutMixin as MustBeLogingCustomView, CursorPaginationMixin
+from app.core.toggles import set_row, toggle_row
 from app.post.forms import UpdatePostForm, CreatCommentForm
-from app.post.models import Post, Vote, Image, Comment, CommentLike
+from app.post.models import Post, Image, Comment, CommentLike, Hashtag, PostHashtag
+from app.post.feed import get_timeline_posts
+from app.post.fragments import bump_card_versions
+from app.post.hashtags import hashtag_posts, normalize_hashtag
+from app.post.loaders import post_card_queryset, top_level_comments, comment_replies, COMMENT_ORDERINGS, \
+    REPLY_ORDERING
+from app.post.like_buffer import buffered_likes_count, toggle_like
+from app.post.search_cache import cached_search_page, invalidate_post_searches
+from app.post.trending import trending_hashtags, trending_posts
 from django.contrib import messages
 from django.shortcuts import render, get_object_or_404, redirect
 from django.http import JsonResponse
+from django.conf import settings
+from django.db import transaction
+from app.post.counters import adjust_counter
+from app.post.ranking import cached_explorer_page, refresh_explore_scores
 
 
-class HomePostView(MustBeLogingCustomView):
+class HomePostView(MustBeLogingCustomView, CursorPaginationMixin):
     """
     View for displaying and creating comments on posts.
 
     Attributes:
     - template_posts (str): The template for rendering posts.
+    - template_post_cards (str): The template fragment for rendering one page of post cards.
     - form_class_search (SearchForm): The form class for searching posts.
     - posts (QuerySet): The queryset of posts filtered by the current user and not deleted.
+    - page_size_setting (str): The setting holding the number of posts rendered per page.
     """
     http_method_names = ['get']
+    page_size_setting = 'POST_LIST_PAGE_SIZE'
 
     def setup(self, request, *args, **kwargs):
         """
-        Initializes form_class_search, template_posts, and queryset of posts.
+        Initializes form_class_search, template_posts, template_post_cards, and queryset of posts.
         """
         self.template_posts = 'post/posts.html'  # noqa
+        self.template_post_cards = 'post/post_cards.html'  # noqa
         self.form_class_search = SearchForm  # noqa
         self.request_user_profile = request.user.profile  # noqa
         self.posts = Post.objects.archive().filter(owner=self.request_user_profile, is_deleted=False)  # noqa
@@ -36,65 +52,124 @@ class HomePostView(MustBeLogingCustomView):
     def get(self, request, *args, **kwargs):
         """
        Handles GET requests, including post searching.
+       Posts are paginated by keyset on (update_time, id), search results on (rank, id) through the search result
+       cache.
        """
         form_search = self.form_class_search(request.GET)
-        search_query = request.GET.get('search')
-        if search_query:
-            self.posts = self.posts.annotate(  # noqa
-                similarity=TrigramSimilarity('title', search_query) +
-                           TrigramSimilarity('body', search_query)
-            ).filter(similarity__gt=0.1).order_by('-similarity')
+        if form_search.is_valid():
+            page = cached_search_page(self.posts, form_search.cleaned_data['search'], request.GET.get('cursor'),
+                                      self.get_page_size(), f'user:{request.user.pk}')
+        else:
+            page = self.paginate(post_card_queryset(self.posts), ('-update_time', '-id'))
+        return self.render_page(request, self.template_posts, self.template_post_cards, page,
+                                {'posts': page.object_list, 'form_search': form_search})
+
+
+class TimelineView(MustBeLogingCustomView):
+    """
+    View for displaying the home timeline of the requesting user.
+    The timeline holds the latest posts of the accounts the user follows (and the user's own posts), read one page at
+    a time from the user's Redis timeline.
+    """
+    http_method_names = ['get']
+
+    def setup(self, request, *args, **kwargs):
+        """Initialize the template_timeline and the requested page number."""
+        self.template_timeline = 'post/timeline.html'  # noqa
+        try:
+            self.page = max(int(request.GET.get('page', 1)), 1)  # noqa
+        except ValueError:
+            self.page = 1  # noqa
+        return super().setup(request, *args, **kwargs)
 
-        return render(request, self.template_posts,
-                      {'posts': self.posts, 'form_search': form_search})
+    def get(self, request, *args, **kwargs):
+        """Handles GET requests and renders one page of the timeline."""
+        posts = get_timeline_posts(request.user.pk, page=self.page)
+        return render(request, self.template_timeline,
+                      {'posts': posts,
+                       'page': self.page,
+                       'previous_page': self.page - 1 if self.page > 1 else None,
+                       'next_page': self.page + 1 if len(posts) == settings.FEED_PAGE_SIZE else None})
 
 
-class Explorer(MustBeLogingCustomView):
+class Explorer(MustBeLogingCustomView, CursorPaginationMixin):
     """
     The Explorer class handles both GET and POST requests for exploring posts and adding comments.
     - The setup method initializes view attributes including the template name,form class,next page URL,user,and posts.
     - Get method retrieves posts from all active users, along with their profiles,and renders them on the explorer page.
+    - Posts are rendered one page at a time; further pages are loaded from the same view by cursor.
+    - The first page without a search also shows the trending hashtags and posts (see app.post.trending).
     - The post method processes form submissions for adding comments to posts.
       - If the form is valid, it saves the comment and displays a success message.
       - If the form is invalid, it renders the explorer page again with the form and any validation errors.
     """
     http_method_names = ['get', 'post']
+    page_size_setting = 'POST_LIST_PAGE_SIZE'
 
     def setup(self, request, *args, **kwargs):
-        """Initialize the template_explorer, form_class_search, posts."""
+        """Initialize the template_explorer, template_explorer_cards, form_class_search, posts."""
         self.template_explorer = 'explorer/explorer.html'  # noqa
+        self.template_explorer_cards = 'explorer/explorer_cards.html'  # noqa
         self.form_class_search = SearchForm  # noqa
         self.posts = Post.objects.filter(owner=request.user.profile)  # noqa
         return super().setup(request, *args, **kwargs)
 
     def get(self, request, *args, **kwargs):
         """This method handles GET requests for the Explorer view.
-           It retrieves the search form data and all posts from the database.
-           If the search form is valid, it performs a trigram similarity search on the Post model
-           based on the title and body fields.
-           It then filters the posts based on the search similarity score and orders them by similarity.
-           Next, it retrieves all active users with their profiles and prepares a list of user posts.
-           Finally,it combines the search results and user posts into a list of tuples and renders the explorer template
+           It retrieves the search form data and the active posts from the database.
+           If the search form is valid, it searches the title and body of the posts with the index-backed full-text
+           and trigram operators of app.post.search and orders the matches by rank; result pages are cached (see
+           app.post.search_cache).
+           Finally, it renders one page of posts, keyset-paginated on the precomputed explorer score (see
+           app.post.ranking, pages are cached too) or on (rank, id) for searches, with the cursor of the next page.
            """
         form_search = self.form_class_search(request.GET)
         post_search = Post.objects.all().filter(is_active=True)
 
         if form_search.is_valid():
-            search_query = form_search.cleaned_data.get('search')
-            post_search = post_search.annotate(
-                similarity=TrigramSimilarity('title', search_query) + TrigramSimilarity('body', search_query)).filter(
-                similarity__gt=0.1).order_by('-similarity')
-        return render(request, self.template_explorer,
-                      {'post_search': post_search,
-                       'form_search': form_search})
+            page = cached_search_page(post_search, form_search.cleaned_data['search'], request.GET.get('cursor'),
+                                      self.get_page_size(), 'all')
+        else:
+            page = cached_explorer_page(post_search, request.GET.get('cursor'), self.get_page_size())
+        context = {'post_search': page.object_list, 'form_search': form_search}
+        if not form_search.is_valid() and not request.GET.get('cursor'):
+            context.update(trending_hashtags=trending_hashtags(), trending_posts=trending_posts())
+        return self.render_page(request, self.template_explorer, self.template_explorer_cards, page, context)
+
+
+class HashtagView(MustBeLogingCustomView, CursorPaginationMixin):
+    """
+    View for the posts of a hashtag, newest first.
+    - The setup method initializes the templates and the hashtag (404 for a tag that was never used).
+    - The get method renders one page of the active posts of the tag, keyset-paginated on (create_time, id) from the
+      hashtag index of PostHashtag (see app.post.hashtags); further pages are loaded from the same view by cursor.
+    """
+    http_method_names = ['get']
+    page_size_setting = 'POST_LIST_PAGE_SIZE'
+
+    def setup(self, request, *args, **kwargs):
+        """Initialize the template_hashtag, template_hashtag_cards, hashtag."""
+        self.template_hashtag = 'explorer/hashtag.html'  # noqa
+        self.template_hashtag_cards = 'explorer/explorer_cards.html'  # noqa
+        self.hashtag = get_object_or_404(Hashtag, name=normalize_hashtag(kwargs['name']))  # noqa
+        return super().setup(request, *args, **kwargs)
+
+    def get(self, request, *args, **kwargs):
+        page = self.paginate(post_card_queryset(hashtag_posts(self.hashtag)), ('-tagged_at', '-id'))
+        return self.render_page(request, self.template_hashtag, self.template_hashtag_cards, page,
+                                {'post_search': page.object_list,
+                                 'hashtag': self.hashtag})
 
 
-class PostDetailView(MustBeLogingCustomView, DetailView):
+class PostDetailView(MustBeLogingCustomView, CursorPaginationMixin, DetailView):
     """
     View for displaying detailed information about a single post.
+    Only the first page of top-level comments is rendered (newest or most liked first, selected with ?sort=);
+    more comments and the replies of a comment are loaded with CommentListView and ReplyListView.
     """
 
     http_method_names = ['get', 'post']
+    page_size_setting = 'COMMENT_PAGE_SIZE'
     model = Post
     template_name = 'post/post_detail.html'
     context_object_name = 'post'
@@ -105,14 +180,15 @@ class PostDetailView(MustBeLogingCustomView, DetailView):
         """
 
         # get_post = Post.objects.filter(pk=self.kwargs.get('pk'), is_deleted=False).exists()
-        return get_object_or_404(Post, pk=self.kwargs.get('pk'), is_active=True)
+        return get_object_or_404(Post.objects.select_related('owner__user'), pk=self.kwargs.get('pk'), is_active=True)
 
     def get_context_data(self, **kwargs):
         """
-        Adds the comment form to the context data.
+        Adds the comment form and the first page of top-level comments (one query, see comment_queryset) to the
+        context data.
         """
         context = super().get_context_data(**kwargs)
-        post = self.get_object()  # Retrieve the post object
+        post = self.object
         is_following = False  # Default value
 
         if self.request.user.is_authenticated:
@@ -125,19 +201,24 @@ class PostDetailView(MustBeLogingCustomView, DetailView):
 
         context['form'] = CreatCommentForm()
         context['is_following'] = is_following
+        context['likes_count'] = buffered_likes_count(self.object)
+        context['sort'] = comment_sort(self.request)
+        page = self.paginate(top_level_comments(post), COMMENT_ORDERINGS[context['sort']])
+        context['page'] = context['comments'] = page
         return context
 
     def post(self, request, *args, **kwargs):
         """
         Handles the submission of the comment form.
         """
-        post = self.get_object()
+        post = self.object = self.get_object()
         form = CreatCommentForm(request.POST)
         if form.is_valid():
             comment = form.save(commit=False)
             comment.owner = request.user.profile
             comment.post = post
-            comment.save()
+            with transaction.atomic():
+                comment.save()  # Post.comment_count is incremented by the post_save signal
             messages.success(request, "You have created a new comment")
             return redirect(reverse_lazy('post_detail',
                                          kwargs={
@@ -146,6 +227,55 @@ class PostDetailView(MustBeLogingCustomView, DetailView):
             return self.render_to_response(self.get_context_data(form=form))
 
 
+def comment_sort(request):
+    """Return the comment ordering selected with ?sort= ('recent' by default)."""
+    sort = request.GET.get('sort')
+    return sort if sort in COMMENT_ORDERINGS else 'recent'
+
+
+class CommentListView(MustBeLogingCustomView, CursorPaginationMixin):
+    """
+    Cursor-paginated top-level comments of a post, used by the "More comments" button of the post detail page.
+    Every page costs one query for the post and one for the comments with their owners and reply counts.
+    """
+    http_method_names = ['get']
+    page_size_setting = 'COMMENT_PAGE_SIZE'
+
+    def setup(self, request, *args, **kwargs):
+        """Initializes template_comment_cards and the post instance."""
+        self.template_comment_cards = 'post/comment_cards.html'  # noqa
+        self.post = get_object_or_404(Post.objects.select_related('owner__user'), pk=kwargs['pk'])  # noqa
+        return super().setup(request, *args, **kwargs)
+
+    def get(self, request, *args, **kwargs):
+        """Renders one page of comment cards; `?fragment=1` returns it as JSON with the next cursor."""
+        sort = comment_sort(request)
+        page = self.paginate(top_level_comments(self.post), COMMENT_ORDERINGS[sort])
+        context = {'post': self.post, 'comments': page, 'sort': sort}
+        return self.render_page(request, self.template_comment_cards, self.template_comment_cards, page, context)
+
+
+class ReplyListView(MustBeLogingCustomView, CursorPaginationMixin):
+    """
+    Cursor-paginated replies of a comment, oldest first, used to expand a comment on the post detail page.
+    Every page costs one query for the comment and its post and one for the replies with their owners.
+    """
+    http_method_names = ['get']
+    page_size_setting = 'COMMENT_PAGE_SIZE'
+
+    def setup(self, request, *args, **kwargs):
+        """Initializes template_reply_cards and the comment instance."""
+        self.template_reply_cards = 'post/reply_cards.html'  # noqa
+        self.comment = get_object_or_404(Comment.objects.select_related('post__owner__user'), pk=kwargs['pk'])  # noqa
+        return super().setup(request, *args, **kwargs)
+
+    def get(self, request, *args, **kwargs):
+        """Renders one page of reply cards; `?fragment=1` returns it as JSON with the next cursor."""
+        page = self.paginate(comment_replies(self.comment), REPLY_ORDERING)
+        context = {'post': self.comment.post, 'comment': self.comment, 'replies': page}
+        return self.render_page(request, self.template_reply_cards, self.template_reply_cards, page, context)
+
+
 class HidePostView(MustBeLogingCustomView):
     """
     View for hiding a post or Reveal Post.
@@ -162,21 +292,24 @@ class HidePostView(MustBeLogingCustomView):
 
     def get(self, request, *args, **kwargs):
         post = self.get_post.get(id=self.post_id)
-        if post.is_active:
-            post.is_active = False
-            post.save()
-            messages.success(request, f"You have hidden this post {post.title}")
-        else:
-            post.is_active = True
-            post.save()
-            messages.success(request, f"You have unhidden this post {post.title}")
+        with transaction.atomic():  # UserStats.post_count only counts visible posts
+            if post.is_active:
+                post.is_active = False
+                post.save()
+                adjust_counter(UserStats, request.user.pk, 'post_count', -1)
+                messages.success(request, f"You have hidden this post {post.title}")
+            else:
+                post.is_active = True
+                post.save()
+                adjust_counter(UserStats, request.user.pk, 'post_count', 1)
+                messages.success(request, f"You have unhidden this post {post.title}")
 
         return redirect(reverse_lazy('show_post', kwargs={'pk': post.pk}))
 
 
 class DeleteCommentView(MustBeLogingCustomView):
     """
-    View for deleting a comment.
+    View for deleting a comment together with all of its replies, at any depth.
     """
     http_method_names = ['post']
 
@@ -184,10 +317,10 @@ class DeleteCommentView(MustBeLogingCustomView):
         """
         Initializes the comment_id, request_user, and next_page_post_detail.
         """
-        self.comment_id = get_object_or_404(Comment, pk=kwargs.get('pk'))  # noqa
+        self.comment_id = get_object_or_404(Comment.objects.select_related('owner'), pk=kwargs.get('pk'))  # noqa
         self.request_user = request.user  # noqa
-        self.get_comment = Comment.objects.filter(pk=self.comment_id.pk)  # noqa
-        self.next_page_post_detail = reverse_lazy('post_detail', kwargs={'pk': self.comment_id.post.pk})  # noqa
+        self.get_comment = self.comment_id.subtree()  # noqa  the comment and all of its replies
+        self.next_page_post_detail = reverse_lazy('post_detail', kwargs={'pk': self.comment_id.post_id})  # noqa
         return super().setup(request, *args, **kwargs)
 
     def post(self, request, *args, **kwargs):
@@ -196,10 +329,13 @@ class DeleteCommentView(MustBeLogingCustomView):
         """
         comment = self.comment_id
 
-        if comment.owner.user == self.request_user:
-            self.get_comment.delete()
+        if comment.owner.user_id == self.request_user.pk:
+            with transaction.atomic():
+                deleted = self.get_comment.delete()  # soft delete of the branch, returns the number of comments hidden
+                adjust_counter(Post, comment.post_id, 'comment_count', -deleted)
+                refresh_explore_scores([comment.post_id])
+                transaction.on_commit(lambda: bump_card_versions([comment.post_id]))
             if comment.is_reply:
-                self.get_comment.delete()
                 messages.success(request, "You have deleted a reply")
             else:
                 messages.success(request, "You have deleted a comment")
@@ -212,6 +348,8 @@ class DeleteCommentView(MustBeLogingCustomView):
 class ReplyCommentView(MustBeLogingCustomView):
     """
     View for replying to a comment.
+    Replies nest at most settings.COMMENT_MAX_DEPTH levels deep: a reply to a comment at that depth is added next to
+    it, as a reply to its parent.
     """
     http_method_names = ['post']
 
@@ -223,7 +361,7 @@ class ReplyCommentView(MustBeLogingCustomView):
         self.form_class = CreatCommentForm  # noqa
         self.request_post = request.POST  # noqa
         self.request_user_profile = request.user.profile  # noqa
-        self.next_page_post_detail = reverse_lazy('post_detail', kwargs={'pk': self.parent_comment.post.pk})  # noqa
+        self.next_page_post_detail = reverse_lazy('post_detail', kwargs={'pk': self.parent_comment.post_id})  # noqa
         return super().setup(request, *args, **kwargs)
 
     def post(self, request, *args, **kwargs):
@@ -231,14 +369,17 @@ class ReplyCommentView(MustBeLogingCustomView):
         Handles the submission of the reply form.
         """
         parent_comment = self.parent_comment
+        if parent_comment.depth() >= settings.COMMENT_MAX_DEPTH:
+            parent_comment = parent_comment.reply
         form = self.form_class(self.request_post)
         if form.is_valid():
             comment = form.save(commit=False)
             comment.owner = self.request_user_profile
-            comment.post = parent_comment.post
+            comment.post_id = parent_comment.post_id
             comment.reply = parent_comment
             comment.is_reply = True
-            comment.save()
+            with transaction.atomic():
+                comment.save()  # Post.comment_count is incremented by the post_save signal
             messages.success(request, "You have replied to a comment")
             return redirect(self.next_page_post_detail)
         else:
@@ -268,11 +409,9 @@ class CreatePostView(MustBeLogingCustomView):
         self.request_files = request.FILES  # noqa
         self.request_user = request.user  # noqa
         self.request_post = request.POST  # noqa
-        try:
-            self.user_profile = Profile.objects.get(user=self.request_user)
-        except ObjectDoesNotExist:
+        self.user_profile = get_active_profile(self.request_user)  # noqa
+        if self.user_profile is None:
             messages.error(request, "You must have a profile. Please create a profile")
-            self.user_profile = None  # noqa
         return super().setup(request, *args, **kwargs)
 
     def get(self, request):
@@ -285,7 +424,7 @@ class CreatePostView(MustBeLogingCustomView):
         form = UpdatePostForm(self.request_post, self.request_files)
         if form.is_valid():
             post = form.save(commit=False)
-            post.owner = Profile.objects.get(user=self.request_user)
+            post.owner = self.user_profile
 
             if 'Image' in self.request_files:
                 post.save()
@@ -333,7 +472,7 @@ class UpdatePostView(MustBeLogingCustomView):
         form = self.form_class(self.request_post, self.request_files, instance=self.post_instance)
         if form.is_valid():
             posts = form.save(commit=False)
-            posts.owner = Profile.objects.get(user=self.request_user)
+            posts.owner = get_active_profile(self.request_user)
             if 'Image' in self.request_files:
                 posts.save()
                 images = self.request_files.getlist('Image')
@@ -351,8 +490,9 @@ class UpdatePostView(MustBeLogingCustomView):
 class FollowUserView(MustBeLogingCustomView):
     """
     A view for allowing users to follow or unfollow another user.
+    POST toggles the relation, PUT follows and DELETE unfollows (both idempotent, safe to retry).
     """
-    http_method_names = ['post']
+    http_method_names = ['post', 'put', 'delete']
 
     def setup(self, request, *args, **kwargs):
         """
@@ -370,24 +510,34 @@ class FollowUserView(MustBeLogingCustomView):
         """
         Handles the POST request for following or unfollowing a user.
 
-        Checks if a relation already exists between the users. If it exists, unfollows the user;
-        otherwise, creates a new relation to follow the user.
+        Toggles the relation with one DELETE ... RETURNING statement, falling back to
+        INSERT ... ON CONFLICT DO NOTHING when nothing was deleted, so concurrent clicks never fail.
+        """
+        return self.follow_response(toggle_row(Relation, defaults={'is_follow': True}, followers=self.user,
+                                               following=self.users_instance))
+
+    def put(self, request, *args, **kwargs):
+        """
+        Handles the PUT request for following a user. Idempotent: following twice is the same as following once.
         """
+        set_row(Relation, True, defaults={'is_follow': True}, followers=self.user, following=self.users_instance)
+        return self.follow_response(True)
 
-        relation = Relation.objects.filter(followers=self.user, following=self.users_instance, is_follow=True)
+    def delete(self, request, *args, **kwargs):
+        """
+        Handles the DELETE request for unfollowing a user. Idempotent: unfollowing twice is the same as once.
+        """
+        set_row(Relation, False, followers=self.user, following=self.users_instance)
+        return self.follow_response(False)
 
-        if relation.exists():
-            relation.delete()
-            message = f"You have unfollowed {self.users_instance.username}."
-            is_following = False
-        else:
-            Relation.objects.get_or_create(
-                followers=self.user,
-                following=self.users_instance,
-                is_follow=True
-            )
+    def follow_response(self, is_following):
+        """
+        Builds the JSON response describing the new relation state.
+        """
+        if is_following:
             message = f"You are now following {self.users_instance.username}."
-            is_following = True
+        else:
+            message = f"You have unfollowed {self.users_instance.username}."
 
         response_data = {
             'success': True,
@@ -401,8 +551,9 @@ class FollowUserView(MustBeLogingCustomView):
 class PostLikeView(MustBeLogingCustomView):
     """
     A view for allowing users to like or unlike a post.
+    GET toggles the like, PUT likes and DELETE unlikes (both idempotent, safe to retry).
     """
-    http_method_names = ['get']
+    http_method_names = ['get', 'put', 'delete']
 
     def setup(self, request, *args, **kwargs):
         """
@@ -420,17 +571,31 @@ class PostLikeView(MustBeLogingCustomView):
         Handles the GET request for liking or unliking a post.
 
         Checks if the user has already liked the post. If not, creates a new like. If yes, removes the like.
+        Toggles of popular posts are buffered in Redis when settings.LIKE_BUFFER_ENABLED is on (see like_buffer).
+        """
+        return self.like_response(*toggle_like(self.post, self.user))
+
+    def put(self, request, *args, **kwargs):
+        """
+        Handles the PUT request for liking a post. Liking an already liked post changes nothing.
+        """
+        return self.like_response(*toggle_like(self.post, self.user, liked=True))
+
+    def delete(self, request, *args, **kwargs):
+        """
+        Handles the DELETE request for unliking a post. Unliking a post that is not liked changes nothing.
         """
-        like = Vote.objects.filter(post=self.post, user=self.user)  # noqa
+        return self.like_response(*toggle_like(self.post, self.user, liked=False))
 
-        if not like.exists():
-            like.create(post=self.post, user=self.user)
+    def like_response(self, liked, likes_count):
+        """
+        Builds the JSON response describing the new like state of the post.
+        """
+        if liked:
             message = f"You have liked this post {self.post.title}"
         else:
-            like.delete()
             message = f"You have removed your like from this post {self.post.title}"
 
-        likes_count = self.post.likes_count()
         post_id = self.post.id
         response_data = {
             'message': message,
@@ -444,8 +609,9 @@ class PostLikeView(MustBeLogingCustomView):
 class CommentLikeView(MustBeLogingCustomView):
     """
     A view for allowing users to like or unlike a comment.
+    GET toggles the like, PUT likes and DELETE unlikes (both idempotent, safe to retry).
     """
-    http_method_names = ['get']
+    http_method_names = ['get', 'put', 'delete']
 
     def setup(self, request, *args, **kwargs):
         """
@@ -462,12 +628,29 @@ class CommentLikeView(MustBeLogingCustomView):
         Handles the GET request for liking or unliking a comment.
         Checks if the user has already liked the comment. If not, creates a new like. If yes, removes the like.
         """
-        like = CommentLike.objects.filter(comment=self.comment, user=self.user)  # noqa
-        if not like.exists():
-            like.create(comment=self.comment, user=self.user)
+        return self.like_response(toggle_row(CommentLike, comment=self.comment, user=self.user))
+
+    def put(self, request, *args, **kwargs):
+        """
+        Handles the PUT request for liking a comment. Liking an already liked comment changes nothing.
+        """
+        set_row(CommentLike, True, comment=self.comment, user=self.user)
+        return self.like_response(True)
+
+    def delete(self, request, *args, **kwargs):
+        """
+        Handles the DELETE request for unliking a comment. Unliking a comment that is not liked changes nothing.
+        """
+        set_row(CommentLike, False, comment=self.comment, user=self.user)
+        return self.like_response(False)
+
+    def like_response(self, liked):
+        """
+        Builds the JSON response describing the new like state of the comment.
+        """
+        if liked:
             message = f"You have liked this comment: {self.comment.comments}"
         else:
-            like.delete()
             message = f"You have removed your like from this comment: {self.comment.comments}"
 
         response_data = {
@@ -481,8 +664,9 @@ class CommentLikeView(MustBeLogingCustomView):
 class ReplyCommentLike(MustBeLogingCustomView):
     """
     A view for allowing users to like or unlike a reply to a comment.
+    GET toggles the like, PUT likes and DELETE unlikes (both idempotent, safe to retry).
     """
-    http_method_names = ['get']
+    http_method_names = ['get', 'put', 'delete']
 
     def setup(self, request, *args, **kwargs):
         """
@@ -499,13 +683,29 @@ class ReplyCommentLike(MustBeLogingCustomView):
         """ Handles the GET request for liking or unliking a reply to a comment.
         Checks if the user has already liked the reply comment. If not, creates a new like. If yes, removes the like.
         """
-        like = CommentLike.objects.filter(comment=self.reply_comment, user=self.user)  # noqa
+        return self.like_response(toggle_row(CommentLike, comment=self.reply_comment, user=self.user))
+
+    def put(self, request, *args, **kwargs):
+        """
+        Handles the PUT request for liking a reply. Liking an already liked reply changes nothing.
+        """
+        set_row(CommentLike, True, comment=self.reply_comment, user=self.user)
+        return self.like_response(True)
 
-        if not like.exists():
-            like.create(comment=self.reply_comment, user=self.user)
+    def delete(self, request, *args, **kwargs):
+        """
+        Handles the DELETE request for unliking a reply. Unliking a reply that is not liked changes nothing.
+        """
+        set_row(CommentLike, False, comment=self.reply_comment, user=self.user)
+        return self.like_response(False)
+
+    def like_response(self, liked):
+        """
+        Builds the JSON response describing the new like state of the reply.
+        """
+        if liked:
             message = f"You have liked this reply: {self.reply_comment.comments}"
         else:
-            like.delete()
             message = f"You have removed your like from this reply: {self.reply_comment.comments}"
         response_data = {
             'message': message,
@@ -531,7 +731,7 @@ class DeletePostView(MustBeLogingCustomView):
         """Initialize the template_delete_post, next_page_show_post, post_instance, get_post."""
         self.template_delete_post = 'post/delete_post.html'  # noqa
         self.next_page_show_post = reverse_lazy('show_post', kwargs={'pk': kwargs['pk']})  # noqa
-        self.post_instance = get_object_or_404(Post, pk=kwargs['pk'])  # noqa
+        self.post_instance = get_object_or_404(Post.objects.select_related('owner'), pk=kwargs['pk'])  # noqa
         self.get_post = Post.objects.filter(pk=self.post_instance.pk)  # noqa
         return super().setup(request, *args, **kwargs)
 
@@ -542,7 +742,12 @@ class DeletePostView(MustBeLogingCustomView):
     def post(self, request, *args, **kwargs):
         """Handle POST request to delete the post."""
         if self.post_instance:
-            self.get_post.delete()
+            with transaction.atomic():
+                deleted = self.get_post.delete()  # soft delete, returns the number of posts hidden
+                adjust_counter(UserStats, self.post_instance.owner.user_id, 'post_count', -deleted)
+                PostHashtag.objects.filter(post=self.post_instance).delete()  # tag counts drop with the post
+                owner_user_id = self.post_instance.owner.user_id
+                transaction.on_commit(lambda: invalidate_post_searches(owner_user_id))
             messages.success(request, 'Post deleted successfully!')
             return redirect(self.next_page_show_post)
         else:
@@ -18,6 +18,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     # Local App
     "app.account.apps.AccountConfig",
     "app.core.apps.CoreConfig",
@@ -75,13 +76,104 @@ DATABASES = {
 
 # Configures the default cache backend to use Redis.
 # Specifies the location of the Redis server (in this case, localhost on port 6379).
+# Keys starting with LOCAL_KEY_PREFIXES are also kept in an in-process LRU (at most LOCAL_MAX_ENTRIES entries and
+# LOCAL_MAX_BYTES bytes, each for LOCAL_TIMEOUT seconds) invalidated across processes over Redis pub/sub, see
+# app.core.tiered_cache.
 CACHES = {
     "default": {
-        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "BACKEND": "app.core.tiered_cache.TieredRedisCache",
         "LOCATION": "redis://127.0.0.1:6379",
+        "OPTIONS": {
+            "LOCAL_KEY_PREFIXES": ("post_card:", "identity:"),
+            "LOCAL_MAX_ENTRIES": 10000,
+            "LOCAL_MAX_BYTES": 32 * 1024 * 1024,
+            "LOCAL_TIMEOUT": 5,
+        },
     }
 }
 
+# Configures the home timeline (fan-out-on-write into Redis sorted sets stored in the default cache).
+# FEED_TIMELINE_SIZE caps the number of post ids kept per user, FEED_TIMELINE_TTL evicts idle timelines (seconds),
+# FEED_FANOUT_BATCH_SIZE is the number of timelines written per Redis pipeline and FEED_PAGE_SIZE the posts per page.
+FEED_TIMELINE_SIZE = 800
+FEED_TIMELINE_TTL = 60 * 60 * 24 * 7
+FEED_FANOUT_BATCH_SIZE = 1000
+FEED_PAGE_SIZE = 20
+
+# Configures the hybrid push/pull feed.
+# Authors with more followers than FEED_FANOUT_FOLLOWER_THRESHOLD are not fanned out; their latest
+# FEED_AUTHOR_POSTS_SIZE posts are kept in a per-author list and merged into timelines at read time.
+FEED_FANOUT_FOLLOWER_THRESHOLD = 10000
+FEED_AUTHOR_POSTS_SIZE = 200
+
+# Configures the number of post cards rendered per page (and per "load more" request) on the posts and explorer
+# pages.
+POST_LIST_PAGE_SIZE = 12
+
+# Configures the number of top-level comments (and of replies) per page of the post detail page.
+COMMENT_PAGE_SIZE = 10
+
+# Configures the maximum nesting level of replies (each level adds 11 characters to Comment.path, a varchar(500)).
+COMMENT_MAX_DEPTH = 40
+
+# Configures the number of users per page of the lazy-loaded follower / following lists of the profile page.
+RELATION_LIST_PAGE_SIZE = 20
+
+# Configures the write-behind like buffer (toggles recorded in Redis, flushed by `manage.py flush_like_buffer`).
+# Only posts with at least LIKE_BUFFER_MIN_LIKES likes are buffered; LIKE_BUFFER_FLUSH_LOCK_TIMEOUT (seconds) bounds
+# how long a crashed flusher can keep the others out.
+LIKE_BUFFER_ENABLED = False
+LIKE_BUFFER_MIN_LIKES = 1000
+LIKE_BUFFER_FLUSH_LOCK_TIMEOUT = 60
+
+# Configures the search result cache (post ids of each search page, stored in the default cache).
+# Entries are fresh for SEARCH_CACHE_TIMEOUT seconds, then served stale for SEARCH_CACHE_STALE_TIMEOUT more seconds
+# while a single request recomputes them. Post writes invalidate them at once (generation counters).
+SEARCH_CACHE_TIMEOUT = 60
+SEARCH_CACHE_STALE_TIMEOUT = 30
+
+# Configures trending hashtags and posts (per-minute activity counts in Redis, see app.post.trending).
+# Activity of the last TRENDING_WINDOW_MINUTES minutes counts, each minute weighted TRENDING_DECAY times the next one;
+# the TRENDING_SIZE best members of each list are kept and TRENDING_PAGE_SIZE of them are shown on the explorer.
+TRENDING_WINDOW_MINUTES = 60
+TRENDING_DECAY = 0.95
+TRENDING_SIZE = 100
+TRENDING_PAGE_SIZE = 10
+
+# Configures the explorer ranking (see app.post.ranking): the weights of likes, comments and author followers in the
+# score, and EXPLORE_TIME_SCALE, the number of seconds of newness worth e times more engagement (12.5 hours).
+EXPLORE_LIKE_WEIGHT = 1
+EXPLORE_COMMENT_WEIGHT = 2
+EXPLORE_FOLLOWER_WEIGHT = 0.5
+EXPLORE_TIME_SCALE = 45000
+
+# Configures the cache of the explorer pages (post ids of each page, see app.post.ranking): pages are fresh for
+# EXPLORER_CACHE_TIMEOUT seconds, then served stale for EXPLORER_CACHE_STALE_TIMEOUT more seconds.
+EXPLORER_CACHE_TIMEOUT = 30
+EXPLORER_CACHE_STALE_TIMEOUT = 30
+
+# Configures the stampede protection of the explorer and search caches (see app.core.stampede): the request
+# recomputing an entry holds its lock for at most STAMPEDE_LOCK_TIMEOUT seconds; on a miss the other requests poll the
+# cache every STAMPEDE_WAIT_INTERVAL seconds for at most STAMPEDE_WAIT_TIMEOUT seconds. STAMPEDE_BETA scales the
+# probabilistic early refresh (0 disables it).
+STAMPEDE_LOCK_TIMEOUT = 10
+STAMPEDE_WAIT_TIMEOUT = 5
+STAMPEDE_WAIT_INTERVAL = 0.05
+STAMPEDE_BETA = 1.0
+
+# Configures the cache of the authenticated user and profile (see app.account.identity): a cached user is dropped
+# after IDENTITY_CACHE_TIMEOUT seconds even if no save invalidated it.
+IDENTITY_CACHE_TIMEOUT = 60
+
+# Configures the fragment cache of the rendered post cards (see app.post.fragments): a cached card is dropped after
+# POST_CARD_CACHE_TIMEOUT seconds even if its post did not change.
+POST_CARD_CACHE_TIMEOUT = 60 * 60
+
+# Configures the username / full name typeahead: at most AUTOCOMPLETE_LIMIT users per keystroke, and only the first
+# AUTOCOMPLETE_MAX_QUERY_LENGTH characters of the query are used as the prefix.
+AUTOCOMPLETE_LIMIT = 8
+AUTOCOMPLETE_MAX_QUERY_LENGTH = 30
+
 # Configures the default template engine to use Django's built-in template engine.
 CKEDITOR_CONFIGS = {
     'default': {
@@ -101,8 +193,11 @@ AUTH_PASSWORD_VALIDATORS = [
     {'NAME': 'django.contrib.auth.password_validation.NumericPasswordValidator', },
 ]
 AUTHENTICATION_BACKENDS = [
-    'django.contrib.auth.backends.ModelBackend',
+    'app.account.authenticate.CachedModelBackend',
     'app.account.authenticate.EmailAuthBackend',
+    # Only resolves the sessions logged in before CachedModelBackend replaced it (their stored backend path must stay
+    # listed); new logins are stored with the backends above.
+    'django.contrib.auth.backends.ModelBackend',
 ]
 
 # Internationalization